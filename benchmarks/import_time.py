@@ -0,0 +1,112 @@
+"""Import time benchmark for the wdl command line interface.
+
+Each wdl subcommand is run on a copy of the demo project in a fresh interpreter, and
+the heavy libraries it imported are reported along with the time it took. The benchmark
+fails (exit status 1) if a command imports a library it should not need, or if importing
+wdl.cli takes longer than the budget, so that a regression in startup time is caught.
+
+usage: python benchmarks/import_time.py [--budget SECONDS] [--repeat N]
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = Path(__file__).resolve().parent.parent
+DEMO = REPO / "demo"
+
+HEAVY: tuple[str, ...] = ("numpy", "scipy", "matplotlib")
+
+# (arguments, the heavy libraries the command may import)
+COMMANDS: list[tuple[list[str], tuple[str, ...]]] = [
+    (["find_gpp"], ()),
+    (["seq", "Demo.conf"], ()),
+    (["inc", "Demo.conf"], ()),
+    (["preprocess", "Demo.conf"], ()),
+    (["ini2acf", "Demo.cds"], ()),
+    # the commands below use the files that build leaves
+    (["build", "Demo", "--intermediates", "--no-cache", "--no-server"], ("numpy",)),
+    (["wavgen", "Demo_TMP"], ("numpy",)),
+    (["simulate", "Demo.acf", "GrabFrame"], ("numpy",)),
+    (["modegen", "Demo.modes", "Demo.acf"], ()),
+]
+
+# runs one command, then reports the heavy libraries that were imported on stderr
+_RUNNER = """
+import sys
+from wdl.cli import main
+sys.argv = ["wdl"] + sys.argv[1:]
+try:
+    status = main()
+finally:
+    print("imported:" + ",".join(m for m in {heavy!r} if m in sys.modules), file=sys.stderr)
+sys.exit(status)
+"""
+
+
+def _python(args: list[str], cwd: Path) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    return subprocess.run([sys.executable] + args, cwd=cwd, capture_output=True, text=True, env=env)
+
+
+def cli_import_time(cwd: Path, repeat: int) -> float:
+    """the best of repeat times to import wdl.cli, from python -X importtime, in seconds"""
+    best = None
+    for _ in range(repeat):
+        proc = _python(["-X", "importtime", "-c", "import wdl.cli"], cwd)
+        match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| wdl.cli$", proc.stderr, re.MULTILINE)
+        if match is None:
+            raise RuntimeError(f"could not import wdl.cli: {proc.stderr}")
+        cumulative = int(match.group(1)) * 1e-6
+        best = cumulative if best is None else min(best, cumulative)
+    return best
+
+
+def run_command(args: list[str], cwd: Path) -> tuple[float, set[str]]:
+    """run a wdl subcommand, returning the time it took and the heavy libraries it imported"""
+    start = time.perf_counter()
+    proc = _python(["-c", _RUNNER.format(heavy=HEAVY)] + args, cwd)
+    elapsed = time.perf_counter() - start
+    imported = re.findall(r"^imported:(.*)$", proc.stderr, re.MULTILINE)
+    if not imported:
+        raise RuntimeError(f"wdl {' '.join(args)} did not run: {proc.stderr}")
+    return elapsed, set(filter(None, imported[-1].split(",")))
+
+
+def main() -> int:
+    ap = ArgumentParser(description="benchmark the import time of the wdl command line interface")
+    ap.add_argument("--budget", type=float, default=0.15,
+                    help="the most time, in seconds, that importing wdl.cli may take")
+    ap.add_argument("--repeat", type=int, default=5, help="number of times to import wdl.cli")
+    args = ap.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(tmp) / "demo"
+        shutil.copytree(DEMO, project)
+
+        cli_time = cli_import_time(project, args.repeat)
+        print(f"{'import wdl.cli':<40} {cli_time:7.3f} s  (budget {args.budget:.3f} s)")
+        if cli_time > args.budget:
+            print("FAIL: importing wdl.cli is over budget")
+            failed = True
+
+        for cmdargs, allowed in COMMANDS:
+            elapsed, imported = run_command(cmdargs, project)
+            extra = imported - set(allowed)
+            print(f"{'wdl ' + ' '.join(cmdargs):<40} {elapsed:7.3f} s  imports: {', '.join(sorted(imported)) or '-'}")
+            if extra:
+                print(f"FAIL: wdl {cmdargs[0]} should not import {', '.join(sorted(extra))}")
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,17 @@
 """
 A Lexer (aka: Tokenizer, Lexical Analyzer) for the waveform development
-language. When we instantiate the Lexer class, we will pass the constructor a
-string containing the source text. The Lexer object will create a scanner
-object and pass the source text to it. Then the Lexer will get characters
-from the scanner, which will get them from the source text. The result will
-be a Lexer object that is ready to return the tokens in the source text.
+language. The Lexer is initialized with a string containing the source text.
+The source text is scanned in a single pass by one compiled master regular
+expression, which matches a whole token (or a run of whitespace, or a
+comment) per step instead of reading one character at a time. The result is
+a Lexer that is ready to return the tokens in the source text.
+
+All the state of a lexer lives in a WDLLexer object.  Tokens are kept in a
+buffer as they are read, with a cursor marking the next token to return.
+Re-initializing a WDLLexer with the same source text only rewinds the cursor,
+and the positions of the declarations (SEQUENCE, WAVEFORM, param, const) are
+recorded so the parser can seek straight to them.  The module functions
+initialize(), get(), etc. operate on one shared WDLLexer.
 """
 
 # Copyright (C) <2018> California Institute of Technology
@@ -35,19 +42,56 @@ if __package__ != "wdl":
     import warnings
     basen = os.path.basename(__file__)
     warnings.warn(f"detected running a script directly, consider using python -m wdl.{basen}")
-    import genericScanner as Scanner
     from genericToken import *
     from Symbols import *
     from genericCharacter import *
 else:
-    from . import genericScanner as Scanner
     from .genericToken import *
     from .Symbols import *
     from .genericCharacter import *
 
-character = ""
-c1 = ""
-c2 = ""
+import re
+import sys
+
+# ----------------------------------------------------------
+# The master pattern.  Each match skips any whitespace and
+# comments and then captures exactly one token.  The order of
+# the alternatives is the order in which the character-at-a-time
+# lexer tested them: identifiers, numbers (which may start with
+# '-', so "--" lexes as two numbers), strings, two-character
+# symbols and finally one-character symbols.  The "Bad" groups
+# catch unterminated comments and strings, and anything else
+# is unrecognized.
+# ----------------------------------------------------------
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?:[ \t\n]|/\*.*?\*/)*
+    (?:
+        (?P<BadComment>/\*)
+      | (?P<Identifier>[A-Za-z][A-Za-z0-9_]*)
+      | (?P<Number>[0-9\-][0-9.]*)
+      | (?P<String>"[^"]*"|'[^']*')
+      | (?P<BadString>["'])
+      | (?P<Symbol>{symbols})
+      | (?P<Unknown>.)
+      | (?P<Eof>\Z)
+    )
+    """.format(
+        symbols="|".join(
+            re.escape(s)
+            for s in TwoCharacterSymbols + OneCharacterSymbols + PreSpaceSymbols
+        )
+    ),
+    re.VERBOSE | re.DOTALL,
+)
+
+_KEYWORDS = frozenset(Keywords)
+
+# ----------------------------------------------------------
+# token types whose positions are recorded in the buffer index
+# so the parser can find declarations without re-lexing
+# ----------------------------------------------------------
+DECLARATIONS = ("SEQUENCE", "WAVEFORM", "PARAM", "CONST")
 
 
 class LexerError(Exception):
@@ -63,149 +107,209 @@ def dq(s):
 # -------------------------------------------------------------------
 #
 # -------------------------------------------------------------------
-def initialize(source_text):
-    """ """
-    # global scanner
-
-    # initialize the scanner with the source_text
-    Scanner.initialize(source_text)
-
-    # use the scanner to read the first character from the source_text
-    get_char()
-
-
-# -------------------------------------------------------------------
-#
-# -------------------------------------------------------------------
-def get():
+def tokenize(source_text):
     """
-    Construct and return the next token in the source_text.
+    Generate the tokens in source_text.  Whitespace and comments are
+    consumed but not returned.  After the last token the EOF token is
+    generated indefinitely.
     """
+    # an ENDMARK anywhere in the source ends it
+    end = source_text.find(ENDMARK)
+    if end < 0:
+        end = len(source_text)
+
+    source = SourceText(source_text)
+    match = _TOKEN_PATTERN.match
+    keywords = _KEYWORDS
+    intern = sys.intern
+    pos = 0
+
+    while True:
+        m = match(source_text, pos, end)
+        kind = m.lastgroup
+        start, pos = m.span(kind)
+
+        if kind == "Identifier":
+            cargo = intern(m.group(kind))
+            upper = cargo.upper()
+            yield Token(
+                source, start, pos, cargo, upper if upper in keywords else IDENTIFIER
+            )
+        elif kind == "Number":
+            yield Token(source, start, pos, intern(m.group(kind)), NUMBER)
+        elif kind == "String":
+            yield Token(source, start, pos, m.group(kind), STRING)
+        elif kind == "Symbol":
+            # for symbols, the token type is same as the cargo
+            cargo = intern(m.group(kind))
+            yield Token(source, start, pos, cargo, cargo)
+        elif kind == "Eof":
+            break
+        elif kind == "BadComment":
+            Token(source, start, pos, m.group(kind)).abort(
+                "Found end of file before end of comment"
+            )
+        elif kind == "BadString":
+            Token(source, start, pos, m.group(kind)).abort(
+                "Found end of file before end of string literal"
+            )
+        else:
+            # We have encountered something that we don't recognize.
+            cargo = m.group(kind)
+            Token(source, start, pos, cargo).abort(
+                "I found a character or symbol that I do not recognize: %s (%s)"
+                % (dq(cargo), hex(ord(cargo[0])))
+            )
+
+    token = Token(source, end, end, ENDMARK, EOF)
+    # like the character scanner, keep returning EOF once the end is reached
+    while True:
+        yield token
+
+
+# -----------------------------------------------------------------------
+#
+#               WDLLexer
+#
+# -----------------------------------------------------------------------
+class WDLLexer:
+    """
+    A WDLLexer object owns everything needed to return the tokens of one
+    source text at a time, so any number of them can be used side by side.
 
-    # --------------------------------------------------------------------------------
-    # read past and ignore any whitespace characters or any comments -- START
-    # --------------------------------------------------------------------------------
-    while c1 in WHITESPACE_CHARS or c2 == "/*":
-
-        # process whitespace
-        while c1 in WHITESPACE_CHARS:
-            token = Token(character)
-            token.type = WHITESPACE
-            get_char()
-
-            while c1 in WHITESPACE_CHARS:
-                token.cargo += c1
-                get_char()
-
-        # return token  # only if we want the Lexer to return whitespace
-
-        # process comments
-        while c2 == "/*":
-            # we found comment start
-            token = Token(character)
-            token.type = COMMENT
-            token.cargo = c2
-
-            get_char()  # read past the first  character of a 2-character token
-            get_char()  # read past the second character of a 2-character token
-
-            while not (c2 == "*/"):
-                if c1 == ENDMARK:
-                    token.abort("Found end of file before end of comment")
-                token.cargo += c1
-                get_char()
-
-            token.cargo += c2  # append the */ to the token cargo
-
-            get_char()  # read past the first  character of a 2-character token
-            get_char()  # read past the second character of a 2-character token
-
-        # return token  # only if we want the Lexer to return comments
-    # --------------------------------------------------------------------------------
-    # read past and ignore any whitespace characters or any comments -- END
-    # --------------------------------------------------------------------------------
-
-    # Create a new token.  The token will pick up
-    # its line and column information from the character.
-    token = Token(character)
+    Tokens are materialized into a buffer as they are first read and kept,
+    with a cursor marking the next token to return.  Initializing the lexer
+    again with the same source text rewinds the cursor instead of lexing it
+    again.
+    """
 
-    if c1 == ENDMARK:
-        token.type = EOF
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def __init__(self):
+        """
+        The constructor of the WDLLexer class
+        """
+        self.source_text = None
+        self._tokens = iter(())
+        self._buffer = []
+        self._cursor = 0
+        self._declarations = {}
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def initialize(self, source_text):
+        """
+        Prepare to return the tokens in source_text, from the beginning.
+        The tokens of the previous source text are reused if it is the same.
+        """
+        if source_text != self.source_text:
+            self.source_text = source_text
+            self._tokens = tokenize(source_text)
+            self._buffer = []
+            self._declarations = {kind: [] for kind in DECLARATIONS}
+        self._cursor = 0
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def _read(self):
+        """
+        Lex the next token into the buffer and return it.
+        Returns None once the EOF token is in the buffer.
+        """
+        buffer = self._buffer
+        if buffer and buffer[-1].type == EOF:
+            return None
+        try:
+            token = next(self._tokens)
+        except Exception:
+            # the source text could not be lexed; don't reuse it
+            self.source_text = None
+            raise
+        if token.type in self._declarations:
+            self._declarations[token.type].append(len(buffer))
+        buffer.append(token)
         return token
 
-    if c1 in IDENTIFIER_STARTCHARS:
-        token.type = IDENTIFIER
-        get_char()
-
-        while c1 in IDENTIFIER_CHARS:
-            token.cargo += c1
-            get_char()
-
-        if token.cargo.upper() in Keywords:
-            token.type = token.cargo.upper()
-        return token
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def get(self):
+        """
+        Return the next token in the source_text.
+        """
+        if self._cursor < len(self._buffer) or self._read() is not None:
+            token = self._buffer[self._cursor]
+            self._cursor += 1
+            return token
+        # keep returning EOF once the end is reached
+        return self._buffer[-1]
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def seek(self, position):
+        """
+        Move the cursor so that the next call to get() returns the token at
+        the given position in the buffer.
+        """
+        self._cursor = position
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def tell(self):
+        """
+        Return the buffer position of the token that the next call to get()
+        will return.
+        """
+        return self._cursor
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def declarations(self, *kinds):
+        """
+        Return the buffer positions of all tokens of the given DECLARATIONS
+        types (e.g. "SEQUENCE", "PARAM"), in source order.  The whole source
+        text is lexed if it has not been already.
+        """
+        while self._read() is not None:
+            pass
+        positions = []
+        for kind in kinds:
+            positions += self._declarations[kind.upper()]
+        return sorted(positions)
 
-    if c1 in NUMBER_STARTCHARS:
-        token.type = NUMBER
-        get_char()
 
-        while c1 in NUMBER_CHARS:
-            token.cargo += c1
-            get_char()
-        return token
+# -------------------------------------------------------------------
+# The module functions below use a single, shared WDLLexer.
+# -------------------------------------------------------------------
+_lexer = WDLLexer()
 
-    if c1 in STRING_STARTCHARS:
-        # remember the quote_char (single or double quote)
-        # so we can look for the same character to terminate the quote.
-        quote_char = c1
 
-        get_char()
+def initialize(source_text):
+    """ """
+    _lexer.initialize(source_text)
 
-        while c1 != quote_char:
-            if c1 == ENDMARK:
-                token.abort("Found end of file before end of string literal")
 
-            token.cargo += c1  # append quoted character to text
-            get_char()
+def get():
+    """ """
+    return _lexer.get()
 
-        token.cargo += c1  # append close quote to text
-        get_char()
-        token.type = STRING
-        return token
 
-    if c2 in TwoCharacterSymbols:
-        token.cargo = c2
-        token.type = token.cargo  # for symbols, the token type is same as the cargo
-        get_char()  # read past the first  character of a 2-character token
-        get_char()  # read past the second character of a 2-character token
-        return token
+def seek(position):
+    """ """
+    _lexer.seek(position)
 
-    if c1 in OneCharacterSymbols or c1 in PreSpaceSymbols:
-        token.type = token.cargo  # for symbols, the token type is same as the cargo
-        get_char()  # read past the symbol
-        return token
 
-    # else.... We have encountered something that we don't recognize.
-    print(OneCharacterSymbols)
-    print(TwoCharacterSymbols)
-    print(PreSpaceSymbols)
-    print(hex(ord(c1)))
-    token.abort("I found a character or symbol that I do not recognize: " + dq(c1))
+def tell():
+    """ """
+    return _lexer.tell()
 
 
-# -------------------------------------------------------------------
-#
-# -------------------------------------------------------------------
-def get_char():
-    """
-    get the next character
-    """
-    global c1, c2, character
-    character = Scanner.get()
-    c1 = character.cargo
-    # ---------------------------------------------------------------
-    # Every time we get a character from the scanner, we also
-    # lookahead to the next character and save the results in c2.
-    # This makes it easy to lookahead 2 characters.
-    # ---------------------------------------------------------------
-    c2 = c1 + Scanner.lookahead(1)
+def declarations(*kinds):
+    """ """
+    return _lexer.declarations(*kinds)
@@ -0,0 +1,38 @@
+"""
+Waveform Definition Language (WDL) tools for Archon controllers.
+
+    acf = wdl.compile("Demo.conf")
+
+compiles a project into an AcfDocument; see wdl.build.compile.
+
+    run = wdl.Simulator.read("Demo.acf").run("GrabFrame", {"exptime": 1})
+
+runs its timing script from a label; see wdl.simulate.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .acf import AcfDocument
+    from .build import compile
+    from .simulate import Simulator
+
+# the library API is imported when it is first used, so that the command
+# line interface does not pay for it
+__all__ = ["compile", "AcfDocument", "Simulator"]
+
+
+def __getattr__(name):
+    if name == "compile":
+        from .build import compile
+
+        return compile
+    if name == "AcfDocument":
+        from .acf import AcfDocument
+
+        return AcfDocument
+    if name == "Simulator":
+        from .simulate import Simulator
+
+        return Simulator
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
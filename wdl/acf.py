@@ -0,0 +1,286 @@
+"""
+A structured view of an Archon configuration file (ACF).
+
+An ACF is a sequence of [SECTION]s of KEY=VALUE lines.  The [CONFIG]
+section holds the settings, numbered lists such as PARAMETER0..PARAMETERn
+with their PARAMETERS count, the timing script in LINE0..LINEn, the
+module settings MODn\\KEY and the states STATEn\\KEY; [SYSTEM] describes
+the backplane and modules, and each [MODE_name] holds the keys of a mode.
+
+An AcfDocument keeps every line in order, so that its text is the ACF it
+was parsed from, and gives these parts by name.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import collections
+import re
+
+_SECTION = re.compile(r"^\[(.*)\]$")
+_INDEXED = re.compile(r"^(STATE|MOD)(\d+)\\(.+)$")
+_NUMBERED = re.compile(r"^([A-Z_]+)(\d+)$")
+
+
+# -----------------------------------------------------------------------------
+# @fn     unquote
+# @brief  the value of an ACF key without its double quotes
+# @param  value
+# @return str
+# -----------------------------------------------------------------------------
+def unquote(value):
+    """ """
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+# -----------------------------------------------------------------------------
+#
+#               AcfDocument
+#
+# -----------------------------------------------------------------------------
+class AcfDocument(object):
+    """
+    The sections of an ACF, each a list of [key, value] pairs in order.
+    Values are kept as they are written, quotes and all; the properties
+    that give the parts of the ACF by name remove the quotes.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(self, sections=None):
+        """
+        sections is a dict of section name to list of (key, value).
+        """
+        self.sections = collections.OrderedDict()
+        for name, pairs in (sections or {}).items():
+            self.sections[name] = [[key, value] for key, value in pairs]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    @classmethod
+    def parse(cls, text):
+        """
+        Return the AcfDocument of the text of an ACF.
+        """
+        document = cls()
+        pairs = document.sections.setdefault("CONFIG", [])
+        for line in text.splitlines():
+            m = _SECTION.match(line)
+            if m is not None:
+                pairs = document.sections.setdefault(m.group(1), [])
+                continue
+            if line == "":
+                continue
+            key, equals, value = line.partition("=")
+            if not equals:
+                raise ValueError("not a KEY=VALUE line in an ACF: %r" % line)
+            pairs.append([key, value])
+        return document
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    @classmethod
+    def read(cls, path):
+        """
+        Return the AcfDocument of the ACF at path.
+        """
+        with open(path, "r") as f:
+            return cls.parse(f.read())
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def text(self):
+        """
+        The text of the ACF.
+        """
+        lines = []
+        for name, pairs in self.sections.items():
+            lines.append("[%s]" % name)
+            lines.extend("%s=%s" % (key, value) for key, value in pairs)
+        return "\n".join(lines) + "\n"
+
+    def __str__(self):
+        return self.text()
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def write(self, path):
+        """
+        Write the ACF to path.
+        """
+        with open(path, "w") as f:
+            f.write(self.text())
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def get(self, key, section="CONFIG", default=None):
+        """
+        The value of key in section, as written.
+        """
+        for k, value in self.sections.get(section, []):
+            if k == key:
+                return value
+        return default
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def set(self, key, value, section="CONFIG"):
+        """
+        Set the value of key in section, adding the key at the end of the
+        section, and the section at the end of the ACF, if need be.
+        """
+        pairs = self.sections.setdefault(section, [])
+        for pair in pairs:
+            if pair[0] == key:
+                pair[1] = str(value)
+                return
+        pairs.append([key, str(value)])
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def numbered(self, name):
+        """
+        The values of the numbered keys name0, name1, ... of [CONFIG], as
+        many as its nameS key says.
+        """
+        count = self.get(name + "S")
+        if count is None:
+            return []
+        values = dict(self.sections["CONFIG"])
+        return [
+            unquote(values.get("%s%d" % (name, i), "")) for i in range(int(count))
+        ]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __assignments(self, name):
+        """
+        The numbered name=value keys, e.g. PARAMETERs, as a dict.
+        """
+        assignments = collections.OrderedDict()
+        for value in self.numbered(name):
+            key, _, value = value.partition("=")
+            assignments[key] = value
+        return assignments
+
+    @property
+    def parameters(self):
+        """dict of parameter name to initial value"""
+        return self.__assignments("PARAMETER")
+
+    @property
+    def constants(self):
+        """dict of constant name to value"""
+        return self.__assignments("CONSTANT")
+
+    @property
+    def lines(self):
+        """the lines of the timing script"""
+        return self.numbered("LINE")
+
+    @property
+    def taplines(self):
+        """the tap lines"""
+        return self.numbered("TAPLINE")
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __indexed(self, family):
+        """
+        The family\\KEY keys of [CONFIG] (STATE or MOD), as a dict of index
+        to dict of KEY to value.
+        """
+        indexed = collections.OrderedDict()
+        for key, value in self.sections.get("CONFIG", []):
+            m = _INDEXED.match(key)
+            if m is not None and m.group(1) == family:
+                keys = indexed.setdefault(int(m.group(2)), collections.OrderedDict())
+                keys[m.group(3)] = unquote(value)
+        return indexed
+
+    @property
+    def states(self):
+        """list of the states, each a dict of e.g. NAME, CONTROL, MOD2"""
+        states = self.__indexed("STATE")
+        return [states.get(i, {}) for i in range(int(self.get("STATES", default="0")))]
+
+    @property
+    def modules(self):
+        """dict of slot number to dict of module settings"""
+        return self.__indexed("MOD")
+
+    @property
+    def config(self):
+        """
+        dict of the [CONFIG] keys that are not part of a numbered list, a
+        state or a module
+        """
+        pairs = self.sections.get("CONFIG", [])
+        keys = {key for key, _ in pairs}
+        # the names of the numbered lists, e.g. LINE for LINE0.. and LINES
+        lists = set()
+        for key in keys:
+            m = _NUMBERED.match(key)
+            if m is not None and m.group(1) + "S" in keys:
+                lists.add(m.group(1))
+        config = collections.OrderedDict()
+        for key, value in pairs:
+            m = _NUMBERED.match(key)
+            if (
+                _INDEXED.match(key)
+                or key == "STATES"
+                or (m is not None and m.group(1) in lists)
+                or (key.endswith("S") and key[:-1] in lists)
+            ):
+                continue
+            config[key] = unquote(value)
+        return config
+
+    @property
+    def system(self):
+        """dict of the [SYSTEM] keys"""
+        return collections.OrderedDict(
+            (key, unquote(value)) for key, value in self.sections.get("SYSTEM", [])
+        )
+
+    @property
+    def modes(self):
+        """dict of mode name (e.g. DEFAULT) to dict of its keys"""
+        modes = collections.OrderedDict()
+        for name, pairs in self.sections.items():
+            if name.startswith("MODE_"):
+                modes[name[len("MODE_"):]] = collections.OrderedDict(
+                    (key, unquote(value)) for key, value in pairs
+                )
+        return modes
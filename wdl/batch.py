@@ -0,0 +1,172 @@
+"""
+Build many projects at once, in worker processes.
+
+A repository of ACFs often has a .conf for each detector, amplifier or
+mode variant, all including the same module, signal and waveform files.
+Each project is built on its own, as by ProjectBuild, but the builds are
+spread over a pool of worker processes that stay up for the whole batch.
+What the projects share is done once: a worker keeps the comment-stripped
+files it has read, and the stage cache, which all the workers share on
+disk, hands the parsed module file, the _TMP.wdl or the waveforms made for
+one project to every other project whose preprocessed inputs are the same.
+
+The output of each build is collected and reported in one piece when the
+build is done, followed by a summary of the time each took and of the
+failures.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import collections
+import io
+import logging
+import os
+import time
+import traceback
+
+from .build import PROJECT_ERRORS, ProjectBuild, captured_output
+from .cache import BuildCache
+
+logger = logging.getLogger(__name__)
+
+# the outcome of the build of one project: the path of its ACF, or None and
+# the error if it failed, the seconds it took and what it printed and logged
+Result = collections.namedtuple("Result", "name acf error seconds output")
+
+# the stage cache of this worker process, see __start_worker__
+__cache__ = None
+
+
+# -----------------------------------------------------------------------------
+# @fn     build_one
+# @brief  build one project of a batch, catching its failure
+# @param  name, of the project
+# @param  cache, a BuildCache or None
+# @param  options, the other keywords of ProjectBuild
+# @return Result
+# -----------------------------------------------------------------------------
+def build_one(name, intermediates=False, cache=None, **options):
+    """ """
+    output = io.StringIO()
+    start = time.perf_counter()
+    acffile = error = None
+    try:
+        with captured_output(output):
+            project = ProjectBuild(name, cache=cache, **options)
+            project.run()
+            acffile = project.write(intermediates)
+    except PROJECT_ERRORS + (OSError,) as e:
+        error = str(e)
+    except SystemExit as e:
+        # the parsers exit on a syntax error, after printing it
+        error = "stopped with status %s" % e.code
+    except Exception as e:
+        # a bug rather than a bad project: keep the traceback
+        error = str(e) or type(e).__name__
+        output.write(traceback.format_exc())
+    return Result(name, acffile, error, time.perf_counter() - start, output.getvalue())
+
+
+# -----------------------------------------------------------------------------
+# @fn     __start_worker__
+# @brief  set up a worker process of a batch
+# @param  cache_dir, of the stage cache, or None for no cache
+# @param  level, of the "wdl" loggers
+# -----------------------------------------------------------------------------
+def __start_worker__(cache_dir, use_cache, level):
+    """ """
+    global __cache__
+    # the build reports its own log records, so they go nowhere else
+    wdl_logger = logging.getLogger("wdl")
+    wdl_logger.setLevel(level)
+    wdl_logger.propagate = False
+    __cache__ = BuildCache(cache_dir) if use_cache else None
+    # import the stages, numpy and all, once per worker, and leave the cores
+    # to the other workers rather than to wavgen's own
+    from . import wavgen
+
+    wavgen.Workers = 1
+
+
+# -----------------------------------------------------------------------------
+# @fn     __build_in_worker__
+# @brief  build one project of a batch in a worker process
+# @return Result
+# -----------------------------------------------------------------------------
+def __build_in_worker__(name, intermediates, options):
+    """ """
+    return build_one(name, intermediates, __cache__, **options)
+
+
+# -----------------------------------------------------------------------------
+# @fn     build_all
+# @brief  build many projects, in worker processes
+# @param  names, of the projects
+# @param  jobs, the number of worker processes, 0 for one per CPU
+# @param  report, called with each Result as its build finishes
+# @param  options, the other keywords of ProjectBuild, e.g. include_dirs
+# @return list of Result, in the order of names
+# -----------------------------------------------------------------------------
+def build_all(
+    names,
+    jobs=0,
+    intermediates=False,
+    use_cache=True,
+    cache_dir=None,
+    report=None,
+    **options
+):
+    """
+    With one job, or one project, the projects are built one after the
+    other in this process.
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(names))
+    results = [None] * len(names)
+    if jobs <= 1:
+        cache = BuildCache(cache_dir) if use_cache else None
+        for ii, name in enumerate(names):
+            results[ii] = build_one(name, intermediates, cache, **options)
+            if report is not None:
+                report(results[ii])
+        return results
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    level = logging.getLogger("wdl").getEffectiveLevel()
+    with ProcessPoolExecutor(
+        jobs, initializer=__start_worker__, initargs=(cache_dir, use_cache, level)
+    ) as pool:
+        futures = {
+            pool.submit(__build_in_worker__, name, intermediates, options): ii
+            for ii, name in enumerate(names)
+        }
+        for future in as_completed(futures):
+            ii = futures[future]
+            try:
+                results[ii] = future.result()
+            except Exception as e:
+                # the worker died, e.g. killed for running out of memory
+                results[ii] = Result(names[ii], None, repr(e), 0.0, "")
+            if report is not None:
+                report(results[ii])
+    return results
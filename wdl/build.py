@@ -0,0 +1,686 @@
+"""
+Build a WDL project into an Archon ACF file in one interpreter.
+
+This runs the same stages as the Makefile,
+
+    .conf -> sequence include list -> preprocess -> WDL parser -> _TMP.wdl
+    .mod  -> preprocess -> module parser -> .modules, .system
+    _TMP.wdl -> wavgen -> .script, .states
+    .conf include list + .cds -> preprocess, + the above -> ini2acf -> .acf
+    .acf + .modes -> modegen, then the REV keyword from git
+
+but hands the text of each stage to the next in memory, with the macro
+preprocessor in process instead of gpp.  The intermediate files the
+Makefile leaves behind can still be written if they are wanted.  With a
+BuildCache, a stage whose inputs are unchanged since any earlier build,
+of this project or another, is read from the cache instead of being run.
+An incremental build keeps a dependency manifest of the files each stage
+read next to the project, and skips the stages none of whose inputs have
+changed since the last build, so that e.g. only modegen runs after an
+edit to the .modes file.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import contextlib
+import io
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+from .genericToken import LexerError
+from .ini2acf import generate_acf
+from .manifest import Manifest
+from .modegen import Modegen
+from .preprocessor import Preprocessor, PreprocessorError
+from .wdlParser import ParserError, WDLParser
+
+logger = logging.getLogger(__name__)
+
+# the .conf keywords that the Makefile's SCAN_* rules look for
+CONF_FILES = ("CDS_FILE", "MODULE_FILE", "MODE_FILE")
+
+# intermediate file suffixes, in the order the Makefile makes them
+INTERMEDIATES = ("wdl", "modules", "system", "script", "states")
+
+# the stages that an incremental build can skip, in order, with the names
+# of their outputs; each is made by the ProjectBuild method make_<stage>
+STAGES = (
+    ("wdl", ("wdl",)),
+    ("modules", ("modules", "system")),
+    ("waveforms", ("script", "states")),
+    ("acf", ("acf",)),
+)
+
+# the lines of a _TMP.wdl that name the files wavgen reads
+_WDL_FILES = re.compile(r"^(?:modulefile|signalfile)\s+([~\w./]+)\s*$", re.MULTILINE)
+
+
+class BuildError(Exception):
+    pass
+
+
+# the errors of a project that cannot be built, as opposed to those of a bug:
+# a missing or failed stage, and a syntax error in one of its files
+PROJECT_ERRORS = (BuildError, PreprocessorError, LexerError, ParserError)
+
+
+# -----------------------------------------------------------------------------
+# @fn     scan_conf
+# @brief  find the file names in a preprocessed .conf, like SCAN_* rules
+# @param  text, the preprocessed .conf
+# @return dict of keyword -> file name, for the keywords in CONF_FILES
+# -----------------------------------------------------------------------------
+def scan_conf(text):
+    """
+    Find KEYWORD = "filename" lines the way the Makefile's awk does: the
+    keyword is everything before the first "=", without blanks, and the
+    file name is between the first pair of double quotes after it.
+    """
+    found = {}
+    for line in text.splitlines():
+        key, equals, value = line.partition("=")
+        key = re.sub(r"[ \t]", "", key)
+        if equals and key in CONF_FILES and key not in found:
+            value = value.split("=")[0]
+            found[key] = value.split('"')[1] if '"' in value else value
+    return found
+
+
+# -----------------------------------------------------------------------------
+# @fn     git_revision
+# @brief  the REV of a project, as insert_hash finds it
+# @param  directory, of the project
+# @return the git hash, or the time if there are uncommitted changes
+# -----------------------------------------------------------------------------
+def git_revision(directory):
+    """ """
+
+    def git(*args):
+        return subprocess.run(
+            ("git",) + args, cwd=directory, capture_output=True, text=True
+        ).stdout.strip()
+
+    if git("status", "--porcelain") == "":
+        return git("rev-parse", "--verify", "HEAD")
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+# -----------------------------------------------------------------------------
+# @fn     insert_revision
+# @brief  insert the FITS REV keyword into the DEFAULT mode of an ACF
+# @param  acf, the text of the ACF
+# @param  rev
+# @return the text of the ACF
+# -----------------------------------------------------------------------------
+def insert_revision(acf, rev):
+    """ """
+    return re.sub(
+        r"^(\[MODE_DEFAULT\].*\n)",
+        lambda m: m.group(1) + "FITS:REV=%s/git hash or revision of ACF\n" % rev,
+        acf,
+        flags=re.MULTILINE,
+    )
+
+
+# -----------------------------------------------------------------------------
+# @fn     captured_output
+# @brief  collect what the stages of a build print and log
+# @param  output, a file to write it to
+# @return context manager
+# -----------------------------------------------------------------------------
+@contextlib.contextmanager
+def captured_output(output):
+    """
+    Send stdout, and the records of the "wdl" loggers, to output for the
+    duration, as for a build whose output goes back to whoever asked for it.
+    """
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    wdl_logger = logging.getLogger("wdl")
+    wdl_logger.addHandler(handler)
+    try:
+        with contextlib.redirect_stdout(output):
+            yield output
+    finally:
+        wdl_logger.removeHandler(handler)
+
+
+# -----------------------------------------------------------------------------
+#
+#               ProjectBuild
+#
+# -----------------------------------------------------------------------------
+class ProjectBuild(object):
+    """
+    The build of one project, named like the Makefile target: the project
+    is the file <name>.conf.  Each stage leaves its output text in an
+    attribute for the next: wdl, modules, system, script, states and acf.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(
+        self,
+        name,
+        include_dirs=(),
+        plots=False,
+        verbose=1,
+        cache=None,
+        incremental=False,
+        sources=None,
+        compress_loops=False,
+        minimize_states=False,
+    ):
+        """
+        name is the project, optionally with a directory and the .conf
+        suffix.  The project directory is searched for #include files
+        before include_dirs, as with the Makefile's -I$(CURDIR).  cache is
+        a BuildCache for the stage outputs, or None to run every stage.
+        An incremental build skips the stages whose inputs are unchanged
+        since the last incremental build of the project.  sources is a
+        dict of file name, relative to the project directory, to the text
+        to use for that file instead of reading it.  compress_loops folds
+        the repeats in the timing script into loops, and minimize_states
+        merges the states that differ only in levels that do not change,
+        see wavgen.
+        """
+        if name.endswith(".conf"):
+            name = name[: -len(".conf")]
+        self.directory = os.path.dirname(os.path.abspath(name))
+        self.name = os.path.basename(name)
+        self.include_dirs = [self.directory] + list(include_dirs)
+        self.plots = plots
+        self.verbose = verbose
+        self.cache = cache
+        self.incremental = incremental
+        self.compress_loops = compress_loops
+        self.minimize_states = minimize_states
+        self.manifest = None
+        self.sources = {}
+        for filename, text in (sources or {}).items():
+            self.sources[os.path.abspath(self.path(filename))] = text
+        if self.sources and incremental:
+            raise BuildError("an incremental build needs its sources in files")
+        # the cache keys of stages that may read the sources
+        self.__sources_key = "\n".join(
+            "%s\n%d\n%s" % (path, len(text), text)
+            for path, text in sorted(self.sources.items())
+        )
+
+        # the files read by the stage that is running, by read_conf, and by
+        # each stage, and the (path, text) of the outputs of each stage
+        self.reads = set()
+        self.conf_reads = set()
+        self.inputs = {}
+        self.outputs = {}
+        # stage -> seconds it took, and the stages that were up to date
+        self.timings = {}
+        self.up_to_date = set()
+
+        self.conf = None
+        self.files = {}
+        self.wdl = None
+        self.modules = None
+        self.system = None
+        self.script = None
+        self.states = None
+        self.acf = None
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def path(self, filename):
+        """
+        The path of a file named in the project, relative to its directory.
+        """
+        return os.path.join(self.directory, os.path.expanduser(filename))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def exists(self, path):
+        """
+        Whether a file of the project exists, in the sources or on disk.
+        """
+        return os.path.abspath(path) in self.sources or os.path.isfile(path)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def read(self, path):
+        """
+        The text of a file of the project, from the sources or from disk.
+        """
+        if os.path.abspath(path) in self.sources:
+            return self.sources[os.path.abspath(path)]
+        with open(path, "r") as f:
+            return f.read()
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def output_path(self, output):
+        """
+        The path of the file an output (e.g. "script") is written to.
+        """
+        if output == "acf":
+            return self.path(self.name + ".acf")
+        return self.path("%s_TMP.%s" % (self.name, output))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def cached(self, stage, inputs, make):
+        """
+        Return the dict of outputs of make() for a stage with a tuple of
+        input strings, from the cache if it has them.  make returns the
+        dict and the paths of the files it read that are not in inputs.
+        What make prints is kept with the outputs and printed again when
+        they are reused, so that the diagnostics of a stage are not lost.
+        """
+        if self.cache is None:
+            return make()[0]
+        key = self.cache.key(stage, *inputs, self.__sources_key)
+        entry = self.cache.get(key)
+        if entry is None:
+            output = io.StringIO()
+            try:
+                with captured_output(output):
+                    outputs, depends = make()
+            finally:
+                sys.stdout.write(output.getvalue())
+            self.cache.put(key, outputs, depends, output.getvalue())
+        else:
+            logger.debug("%s: %s is unchanged", self.name, stage)
+            outputs, output = entry
+            sys.stdout.write(output)
+        return outputs
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def preprocess(self, text):
+        """
+        Preprocess text, with the macros of this text only, as one gpp run.
+        """
+
+        def make():
+            preprocessor = Preprocessor(self.include_dirs, sources=self.sources)
+            processed = preprocessor.process(text, self.directory)
+            outputs = {"text": processed, "files": preprocessor.searched}
+            return outputs, preprocessor.searched
+
+        inputs = (text, self.directory) + tuple(self.include_dirs)
+        outputs = self.cached("preprocess", inputs, make)
+        self.reads.update(outputs["files"])
+        return outputs["text"]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def project_file(self, keyword):
+        """
+        The path of the file named by keyword (e.g. "MODULE_FILE") in the
+        .conf, which must exist.
+        """
+        if keyword not in self.files:
+            raise BuildError("no %s in %s.conf" % (keyword, self.name))
+        path = self.path(self.files[keyword])
+        if not self.exists(path):
+            raise BuildError("%s %s does not exist" % (keyword, path))
+        return path
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def read_conf(self):
+        """
+        Read the .conf, and find the CDS, module and mode files in it.
+        """
+        conf = self.path(self.name + ".conf")
+        if not self.exists(conf):
+            raise BuildError("%s does not exist" % conf)
+        self.conf = self.read(conf)
+        self.reads = {conf}
+        self.files = scan_conf(self.preprocess(self.conf))
+        # every stage depends on the files that the .conf names
+        self.conf_reads = self.reads
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def make_wdl(self):
+        """
+        Assemble and parse the sequence, waveform and signal files.
+        """
+        logger.info("making %s_TMP.wdl from %s.conf", self.name, self.name)
+        source = self.preprocess(WDLParser().make_include_sequence(self.conf))
+
+        def make():
+            parser = WDLParser()
+            parser.get_subroutines(source)
+            parser.get_params(source)
+            parser.get_consts(source)
+            # the WDL parser driver print()s its output
+            return {"wdl": parser.parse(source) + "\n"}, ()
+
+        self.wdl = self.cached("wdl", (source,), make)["wdl"]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def make_modules(self):
+        """
+        Parse the module file into the .modules and .system sections.
+        """
+        path = self.project_file("MODULE_FILE")
+        logger.info("making .modules and .system from %s", path)
+        self.reads.add(path)
+        source = self.preprocess(self.read(path))
+
+        def make():
+            parser = WDLParser()
+            modules = "[CONFIG]\n" + parser.parse_modules(source)
+            system = "[SYSTEM]\n" + parser.parse_system()
+            return {"modules": modules, "system": system}, ()
+
+        outputs = self.cached("modules", (source,), make)
+        self.modules = outputs["modules"]
+        self.system = outputs["system"]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def make_waveforms(self):
+        """
+        Generate the script and states from the WDL.
+        """
+        logger.info("making .script and .states from %s_TMP.wdl", self.name)
+        depends = [self.path(f) for f in _WDL_FILES.findall(self.wdl)]
+        self.reads.update(depends + [self.output_path("wdl")])
+
+        def make():
+            # wavgen needs numpy, which a build from the cache can do without
+            from . import wavgen
+
+            script, states = io.StringIO(), io.StringIO()
+            wavgen.reset()
+            wavgen.GenerateFigs = self.plots
+            wavgen.CompressLoops = self.compress_loops
+            wavgen.MinimizeStates = self.minimize_states
+            wavgen.loadWDL(
+                self.name + "_TMP.wdl",
+                (script, states),
+                verbose=self.verbose,
+                text=self.wdl,
+                curdir=self.directory,
+                sources=self.sources,
+            )
+            if script.getvalue() == "":
+                raise BuildError("waveform generation failed")
+            return {"script": script.getvalue(), "states": states.getvalue()}, depends
+
+        if self.plots:
+            # the plots are made along the way, so nothing can be skipped
+            outputs = make()[0]
+        else:
+            inputs = (
+                self.wdl,
+                self.directory,
+                str(self.compress_loops),
+                str(self.minimize_states),
+            )
+            outputs = self.cached("waveforms", inputs, make)
+        self.script = outputs["script"]
+        self.states = outputs["states"]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def make_acf(self):
+        """
+        Assemble the ACF, without its modes.
+        """
+        logger.info("assembling %s.acf", self.name)
+        cdsfile = self.project_file("CDS_FILE")
+        self.reads.add(cdsfile)
+        self.reads.update(
+            self.output_path(output)
+            for output in ("script", "modules", "states", "system")
+        )
+        cds = self.read(cdsfile)
+        includes = WDLParser().make_include(self.conf)
+        ini = "".join(
+            [
+                self.preprocess(includes + cds),
+                self.script,
+                self.modules,
+                self.states,
+                self.system,
+            ]
+        )
+
+        def make():
+            return {"acf": generate_acf(ini, treat_str_as_content=True)}, ()
+
+        self.acf = self.cached("acf", (ini,), make)["acf"]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def make_modes(self):
+        """
+        Append the modes to the ACF, and insert the REV keyword.
+        """
+        acffile = self.output_path("acf")
+        modefile = self.project_file("MODE_FILE")
+        logger.info("adding the modes in %s", modefile)
+        self.reads.add(modefile)
+
+        def make():
+            modetext = self.sources.get(os.path.abspath(modefile))
+            modes = Modegen(modefile, acffile, self.acf, modetext).modes()
+            return {"modes": modes}, (modefile,)
+
+        modes = self.cached("modes", (self.acf, modefile, acffile), make)["modes"]
+        if modes is None:
+            print("** Something is wrong -- check error messages from initialization.")
+            print("WARNING: no modes written to %s." % acffile)
+        else:
+            self.acf += modes
+
+        if os.path.isdir(self.path(".git")):
+            logger.info("inserting REV keyword")
+            self.acf = insert_revision(self.acf, git_revision(self.directory))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def manifest_path(self):
+        """
+        The path of the dependency manifest of an incremental build.
+        """
+        return self.path(self.name + ".deps.json")
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def run(self):
+        """
+        Run all the stages, and return the text of the ACF.  An incremental
+        build reads the outputs of the stages that are up to date back from
+        the files the last build left.
+        """
+        if self.cache is not None:
+            hits, misses = self.cache.hits, self.cache.misses
+        self.timings = {}
+        self.up_to_date = set()
+        start = time.perf_counter()
+        self.read_conf()
+        if self.incremental:
+            options = {
+                "include_dirs": self.include_dirs,
+                "plots": self.plots,
+                "compress_loops": self.compress_loops,
+                "minimize_states": self.minimize_states,
+            }
+            self.manifest = Manifest.load(self.manifest_path(), options)
+        self.timings["conf"] = time.perf_counter() - start
+
+        # path -> text of the outputs made so far, which later stages read
+        made = {}
+        for stage, outputs in STAGES:
+            start = time.perf_counter()
+            texts = None
+            # with plots, the waveforms must be generated to plot them
+            if self.manifest is not None and not (self.plots and stage == "waveforms"):
+                texts = self.manifest.outputs(stage, made)
+            if texts is None:
+                self.reads = set(self.conf_reads)
+                getattr(self, "make_" + stage)()
+                self.inputs[stage] = self.reads
+            else:
+                logger.info("%s: %s is up to date", self.name, stage)
+                self.up_to_date.add(stage)
+                for output in outputs:
+                    setattr(self, output, texts[output])
+                self.inputs[stage] = self.manifest.inputs(stage)
+            self.outputs[stage] = {
+                output: (self.output_path(output), getattr(self, output))
+                for output in outputs
+            }
+            made.update(self.outputs[stage].values())
+            self.timings[stage] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.reads = set(self.conf_reads)
+        self.make_modes()
+        self.inputs["modes"] = self.reads
+        self.outputs["modes"] = {}
+        self.timings["modes"] = time.perf_counter() - start
+
+        if self.cache is not None:
+            logger.info(
+                "%s: %d stages from the cache, %d run",
+                self.name,
+                self.cache.hits - hits,
+                self.cache.misses - misses,
+            )
+            self.cache.evict()
+        return self.acf
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def write(self, intermediates=False):
+        """
+        Write the ACF into the project directory, and the _TMP files that
+        the Makefile leaves if intermediates is True.  An incremental build
+        always writes them, with its manifest and a .d file of make rules.
+        Returns the path of the ACF.
+        """
+        if intermediates or self.incremental:
+            for suffix in INTERMEDIATES:
+                with open(self.path("%s_TMP.%s" % (self.name, suffix)), "w") as f:
+                    f.write(getattr(self, suffix))
+        acffile = self.output_path("acf")
+        with open(acffile, "w") as f:
+            f.write(self.acf)
+
+        if self.incremental:
+            for stage, inputs in self.inputs.items():
+                self.manifest.record(stage, inputs, self.outputs[stage])
+            self.manifest.save(self.manifest_path())
+            with open(self.path(self.name + ".d"), "w") as f:
+                f.write(self.manifest.make_rules(self.name + ".acf", self.directory))
+        return acffile
+
+
+# -----------------------------------------------------------------------------
+# @fn     build
+# @brief  build a project and write its ACF
+# @param  name, of the project (its .conf without the suffix)
+# @param  cache, a BuildCache or None
+# @param  incremental, True to skip the stages that are up to date
+# @param  compress_loops, True to fold the repeats in the script into loops
+# @param  minimize_states, True to merge the states that differ in no level
+# @return the path of the ACF
+# -----------------------------------------------------------------------------
+def build(
+    name,
+    include_dirs=(),
+    plots=False,
+    intermediates=False,
+    verbose=1,
+    cache=None,
+    incremental=False,
+    compress_loops=False,
+    minimize_states=False,
+):
+    """ """
+    project = ProjectBuild(
+        name,
+        include_dirs,
+        plots,
+        verbose,
+        cache,
+        incremental,
+        compress_loops=compress_loops,
+        minimize_states=minimize_states,
+    )
+    project.run()
+    return project.write(intermediates)
+
+
+# -----------------------------------------------------------------------------
+# @fn     compile
+# @brief  compile a project into an ACF document, without writing any files
+# @param  conf, the path of the project's .conf
+# @param  sources, dict of file name -> text to use instead of the files
+# @return AcfDocument
+# -----------------------------------------------------------------------------
+def compile(conf, sources=None, include_dirs=(), cache=None, verbose=0):
+    """
+    Compile a project and return its ACF as an AcfDocument.  Nothing is
+    written, and a file is read only if it is not in sources, whose names
+    are relative to the directory of conf, so a whole project can be given
+    in memory:
+
+        acf = wdl.compile("Demo.conf", sources={"Demo.conf": ..., ...})
+
+    or only the files that differ from those on disk, as for a variant of
+    a project with other modes:
+
+        acf = wdl.compile("demo/Demo.conf", sources={"Demo.modes": modes})
+    """
+    from .acf import AcfDocument
+
+    project = ProjectBuild(
+        os.fspath(conf), include_dirs, verbose=verbose, cache=cache, sources=sources
+    )
+    return AcfDocument.parse(project.run())
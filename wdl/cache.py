@@ -0,0 +1,293 @@
+"""
+An on-disk cache of the outputs of build stages.
+
+Each entry holds the text outputs of one stage, keyed by a hash of the
+stage's exact inputs and the version of the tool that made them, so a
+stage whose inputs have not changed is read back instead of being run
+again.  Files a stage reads that are not known until it runs, such as
+#include files, are listed in a manifest under the key of the other
+inputs, and the outputs are kept under a key that adds the contents of
+those files.  The size of the cache is bounded by evicting the least
+recently used entries.
+
+The cache lives in $WDL_CACHE_DIR, or else wdl/ in $XDG_CACHE_HOME
+(~/.cache by default), and is safe to delete at any time.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# bump to invalidate every entry written by an older layout
+CACHE_FORMAT = 2
+
+# default bound on the total size of the entries, in bytes
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+__tool_version__ = None
+
+
+# -----------------------------------------------------------------------------
+# @fn     default_directory
+# @brief  the directory of the cache when none is given
+# @return path
+# -----------------------------------------------------------------------------
+def default_directory():
+    """ """
+    if os.environ.get("WDL_CACHE_DIR"):
+        return os.path.expanduser(os.environ["WDL_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+    return os.path.join(os.path.expanduser(base), "wdl")
+
+
+# -----------------------------------------------------------------------------
+# @fn     tool_version
+# @brief  a digest of the wdl package's modules
+# @return hex digest
+# -----------------------------------------------------------------------------
+def tool_version():
+    """
+    The version of the tool, for the cache keys.  It is a digest of the
+    package's own modules rather than its release number, so that any
+    change to the code, installed or in a checkout, makes new keys.
+    """
+    global __tool_version__
+    if __tool_version__ is None:
+        digest = hashlib.sha256(b"%d" % CACHE_FORMAT)
+        package = os.path.dirname(os.path.abspath(__file__))
+        for directory, dirs, files in sorted(os.walk(package)):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if name.endswith((".py", ".pl")):
+                    path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(path, package).encode())
+                    with open(path, "rb") as f:
+                        digest.update(hashlib.sha256(f.read()).digest())
+        __tool_version__ = digest.hexdigest()
+    return __tool_version__
+
+
+# -----------------------------------------------------------------------------
+# @fn     file_digest
+# @brief  the digest of the contents of a file
+# @param  path
+# @return hex digest, or None if there is no such file
+# -----------------------------------------------------------------------------
+def file_digest(path):
+    """ """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+
+
+# -----------------------------------------------------------------------------
+#
+#               BuildCache
+#
+# -----------------------------------------------------------------------------
+class BuildCache(object):
+    """
+    A directory of cache entries, one JSON file per key holding either a
+    dict of output name to text, or the manifest of the files the outputs
+    of a key depend on.  An entry's modification time is when it was last
+    used.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        """
+        directory defaults to default_directory().  max_size bounds the
+        total size of the entries, in bytes.
+        """
+        self.directory = directory or default_directory()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def key(self, stage, *inputs):
+        """
+        The key of the outputs of stage for inputs, which are strings.
+        """
+        digest = hashlib.sha256(tool_version().encode())
+        for part in (stage,) + inputs:
+            data = str(part).encode()
+            # the length keeps ("ab", "c") and ("a", "bc") apart
+            digest.update(b"%d:" % len(data))
+            digest.update(data)
+        return digest.hexdigest()
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __read(self, key):
+        path = self.__path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __outputs_key(self, key, depends):
+        """
+        The key of the outputs of key, given the files in its manifest.
+        """
+        contents = []
+        for path in depends:
+            contents += [path, file_digest(path) or ""]
+        return self.key("outputs", key, *contents)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def get(self, key):
+        """
+        Return the dict of outputs stored under key and what was printed
+        making them, or None if there are none for the present contents of
+        the files they depend on.
+        """
+        entry = self.__read(key)
+        if entry is not None and "depends" in entry:
+            entry = self.__read(self.__outputs_key(key, entry["depends"]))
+        if entry is None or "outputs" not in entry:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["outputs"], entry.get("output", "")
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def put(self, key, outputs, depends=(), output=""):
+        """
+        Store the dict of outputs under key, with the text that was printed
+        making them, to print again when they are reused.  depends are the
+        paths of files
+        whose contents the outputs also depend on, including files that were
+        looked for and not found.  The cache is best effort: a failure to
+        write is logged and otherwise ignored.
+        """
+        if depends:
+            depends = list(depends)
+            self.__write(key, {"depends": depends})
+            key = self.__outputs_key(key, depends)
+        self.__write(key, {"outputs": outputs, "output": output})
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __write(self, key, entry):
+        path = self.__path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write then rename, so a reader never sees half an entry
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("could not write cache entry %s: %s", path, e)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def entries(self):
+        """
+        Return a list of (last use, size, path) of the entries.
+        """
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+        for directory, dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, stat.st_size, path))
+        return found
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size is no
+        more than max_size.  Returns the number of entries removed.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("evicted %d entries from the cache", removed)
+        return removed
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
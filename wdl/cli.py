@@ -5,7 +5,10 @@ from .commands.legacy_drivers import (
     SeqParserDriver, ModParserDriver, IncParserDriver,
     WdlParserDriver, WavgenDriver, ModegenDriver, Ini2acfDriver)
 
-from .commands.preprocess import FindGPP, PreprocessGPP
+from .commands.preprocess import FindGPP, PreprocessGPP, Preprocess
+from .commands.build import BuildDriver
+from .commands.serve import ServeDriver
+from .commands.simulate import SimulateDriver
 
 import logging
 
@@ -21,7 +24,8 @@ def main():
     #NOTE: could  have done a fancy autoreg thing here but there's only a few and this is likely
     #clearer until there are lots more IMO
     command_classes: list[type] = [SeqParserDriver, ModParserDriver, IncParserDriver, WdlParserDriver,
-                                   WavgenDriver, ModegenDriver, Ini2acfDriver, FindGPP, PreprocessGPP]
+                                   WavgenDriver, ModegenDriver, Ini2acfDriver, FindGPP, PreprocessGPP,
+                                   Preprocess, BuildDriver, ServeDriver, SimulateDriver]
 
     for cls in command_classes:
         cls.setup_subparser(subparsers)
@@ -0,0 +1,175 @@
+from .driverbase import WDLDriver
+from argparse import ArgumentParser
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BuildDriver(WDLDriver):
+    CMD_NAME: str = "build"
+    CMD_DESCRIPTION: str = "build the ACF file of WDL projects, like the Makefile does, in one process or in -j of them"
+
+    @classmethod
+    def setup_subparser(cls, subparsers) -> ArgumentParser:
+        parser = super().setup_subparser(subparsers, fname_arg_setup=False)
+        parser.add_argument("names", nargs="+", metavar="name",
+                            help="the projects to build, i.e. their .conf files, with or without the suffix")
+        parser.add_argument("-j", "--jobs", type=int, nargs="?", const=0, default=1,
+                            help="build the projects in this many worker processes, or one per CPU if no number "
+                                 "is given, and summarize the builds (default: 1)")
+        parser.add_argument("-I", dest="include_dirs", action="append", default=[],
+                            help="directory to search for #include files after the project directory, can be repeated")
+        parser.add_argument("--plots", action="store_true", help="generate plots to go with waveforms")
+        parser.add_argument("--intermediates", action="store_true",
+                            help="also write the _TMP.wdl, .script, .states, .modules and .system files")
+        parser.add_argument("--incremental", action="store_true",
+                            help="skip the stages whose inputs are unchanged since the last incremental build, "
+                                 "and write the intermediates, a <name>.deps.json manifest and <name>.d make rules")
+        parser.add_argument("--watch", action="store_true",
+                            help="build incrementally, then rebuild whenever a file the build read changes, until ^C")
+        parser.add_argument("--compress-loops", action="store_true",
+                            help="fold repeated lines of the timing script into repeated states and loop waveforms, "
+                                 "to fit a script into fewer lines; the timing is unchanged")
+        parser.add_argument("--minimize-states", action="store_true",
+                            help="merge the states that differ only in channels set to the level they already "
+                                 "have, to fit more waveforms into the states; the levels are unchanged")
+        parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+                            help="run every stage instead of reusing the outputs of earlier builds")
+        parser.add_argument("--cache-dir", default=None,
+                            help="directory of the build cache (default: $WDL_CACHE_DIR or ~/.cache/wdl)")
+        parser.add_argument("--no-server", dest="use_server", action="store_false",
+                            help="build in this process even if a `wdl serve` server is running")
+        parser.add_argument("--socket", default=None, help="socket of the `wdl serve` server to forward the build to")
+        return parser
+
+    def __init__(self, names: list[str], include_dirs: list[str], plots: bool, intermediates: bool,
+                 incremental: bool = False, use_cache: bool = True, cache_dir: str | None = None,
+                 use_server: bool = True, socket: str | None = None, watch: bool = False, jobs: int = 1,
+                 compress_loops: bool = False, minimize_states: bool = False, **kwargs):
+        self._names = names
+        self._jobs = jobs
+        # more than one project, or any -j, is a batch
+        self._batch = len(names) > 1 or jobs != 1
+        self._include_dirs = include_dirs
+        self._plots = plots
+        self._intermediates = intermediates
+        self._incremental = incremental
+        self._compress_loops = compress_loops
+        self._minimize_states = minimize_states
+        self._watch = watch
+        self._use_cache = use_cache
+        self._cache_dir = cache_dir
+        # the server has no display to plot on, and watching is done here
+        self._use_server = use_server and not plots and not watch and not self._batch
+        self._socket = socket
+
+    def _forward(self) -> int | None:
+        """build on a running server, returning the exit status, or None if there is no server"""
+        from wdl.server import call, ServerError
+        from wdl.cache import tool_version
+        try:
+            server = call("ping", path=self._socket, timeout=1.0)
+        except (OSError, ValueError, ServerError):
+            if self._socket is not None:
+                logger.warning("no server on %s, building here", self._socket)
+            return None
+        if server.get("version") != tool_version():
+            # a server started before the code changed would build with the old code
+            logger.warning("the server (pid %s) runs another version of wdl, stopping it and building here",
+                           server.get("pid"))
+            try:
+                call("shutdown", path=self._socket, timeout=1.0)
+            except (OSError, ValueError, ServerError):
+                pass
+            return None
+        params = {
+            "name": os.path.abspath(self._names[0]),
+            "include_dirs": [os.path.abspath(d) for d in self._include_dirs],
+            "intermediates": self._intermediates,
+            "incremental": self._incremental,
+            "compress_loops": self._compress_loops,
+            "minimize_states": self._minimize_states,
+            "use_cache": self._use_cache,
+            "cache_dir": os.path.abspath(os.path.expanduser(self._cache_dir)) if self._cache_dir else None,
+        }
+        try:
+            result = call("build", params, self._socket)
+        except OSError:
+            if self._socket is not None:
+                logger.warning("no server on %s, building here", self._socket)
+            return None
+        except ServerError as e:
+            sys.stdout.write((e.data or {}).get("output", ""))
+            logger.error(str(e))
+            return 1
+        sys.stdout.write(result["output"])
+        logger.info("wrote %s", result["acf"])
+        return 0
+
+    def _build_batch(self) -> int:
+        """build every project, in worker processes, and summarize the builds"""
+        from wdl.batch import build_all
+
+        def report(result):
+            sys.stdout.write(result.output)
+            if result.error is None:
+                logger.info("wrote %s", result.acf)
+            else:
+                logger.error("build of %s failed: %s", result.name, result.error)
+            sys.stdout.flush()
+
+        start = time.perf_counter()
+        results = build_all(self._names, self._jobs, self._intermediates, self._use_cache, self._cache_dir, report,
+                            include_dirs=self._include_dirs, incremental=self._incremental,
+                            compress_loops=self._compress_loops, minimize_states=self._minimize_states)
+        failed = [result for result in results if result.error is not None]
+        width = max(len(result.name) for result in results)
+        print("built %d of %d projects in %.2f s:" % (len(results) - len(failed), len(results),
+                                                       time.perf_counter() - start))
+        for result in results:
+            # the last line of a parser's error is the error, the others show where it is
+            status = "ok" if result.error is None else "FAILED: " + result.error.strip().splitlines()[-1]
+            print("  %-*s %8.2f s  %s" % (width, result.name, result.seconds, status))
+        return 1 if failed else 0
+
+    def __call__(self, cli_mode: bool) -> int:
+        if self._batch:
+            if self._plots or self._watch:
+                logger.error("--plots and --watch build one project, not a batch of them")
+                return 1
+            return self._build_batch()
+
+        if self._use_server:
+            status = self._forward()
+            if status is not None:
+                return status
+
+        from wdl.build import ProjectBuild, PROJECT_ERRORS
+        from wdl.cache import BuildCache
+        cache = BuildCache(self._cache_dir) if self._use_cache else None
+
+        if self._watch:
+            from wdl.watch import Watcher
+            if self._plots:
+                logger.warning("--watch does not make plots")
+            Watcher(self._names[0], self._intermediates, include_dirs=self._include_dirs, cache=cache,
+                    compress_loops=self._compress_loops, minimize_states=self._minimize_states).run()
+            return 0
+        project = ProjectBuild(self._names[0], self._include_dirs, self._plots, cache=cache,
+                               incremental=self._incremental, compress_loops=self._compress_loops,
+                               minimize_states=self._minimize_states)
+        try:
+            project.run()
+        except PROJECT_ERRORS as e:
+            logger.error("build of %s failed: %s", project.name, e)
+            return 1
+        acffile = project.write(self._intermediates)
+        logger.info("wrote %s", acffile)
+
+        if self._plots:
+            import matplotlib.pyplot as plt
+            plt.show(block=True)
+        return 0
@@ -6,17 +6,9 @@ from sys import stdout
 import os
 from .driverbase import WDLDriver
 
-from wdl.ini2acf import generate_acf
-
-
-# horrible legacy code imports here, TODO: gradually chip away at it
-import wdl.wavgen as wavgen
-import wdl.modegen as modegen
-from wdl.wdlParser import make_include_sequence, parse_modules, parse_system, make_include
-import wdl.wdlParser as Parser
-
-# TODO: separate out plotting, no need for this
-import matplotlib.pyplot as plt
+# NOTE: the implementation of each command (the legacy code, numpy, matplotlib...) is
+# imported by the command when it runs, so that every command doesn't pay for the imports
+# of all of them at startup
 
 
 logger = logging.getLogger(__name__)
@@ -27,8 +19,9 @@ class SeqParserDriver(WDLDriver):
     CMD_DESCRIPTION: str = "parse a .conf file and make an include list from it"
 
     def __call__(self, cli_mode: bool) -> int:
+        from wdl.wdlParser import WDLParser
         logger.info("making include sequence")
-        make_include_sequence(self._text)
+        stdout.write(WDLParser().make_include_sequence(self._text))
         return 0
 
 
@@ -54,13 +47,15 @@ class ModParserDriver(WDLDriver):
             self._text: str = f.read()
 
     def __call__(self, cli_mode: bool) -> int:
+        from wdl.wdlParser import WDLParser
+        parser = WDLParser()
         logger.debug("writing output to .modules file...")
-        self._write_output("CONFIG", "modules", parse_modules(self._text))
+        self._write_output("CONFIG", "modules", parser.parse_modules(self._text))
 
-        #Presumably the reason parse_system() here needs no keywords is some hideous global state
-        # awfulness. DO NOT MOVE THIS LINE ABOVE THE PREVIOUS ONE, therefore
+        # parse_system() returns the .system text that parse_modules() assembled
+        # in the same parser, so it has to come second
         logger.debug("writing output to .system file...")
-        self._write_output("SYSTEM", "system", parse_system())
+        self._write_output("SYSTEM", "system", parser.parse_system())
         return 0
 
     def _write_output(self, archonkw: str, fileext: str, output: str) -> int:
@@ -75,7 +70,8 @@ class IncParserDriver(WDLDriver):
     CMD_DESCRIPTION: str = "parse an include file"
 
     def __call__(self, cli_mode: bool) -> int:
-        make_include(self._text)
+        from wdl.wdlParser import WDLParser
+        stdout.write(WDLParser().make_include(self._text))
         return 0
 
 class WdlParserDriver(WDLDriver):
@@ -83,14 +79,14 @@ class WdlParserDriver(WDLDriver):
     CMD_DESCRIPTION: str = "parse the subroutines from a WDL input file"
 
     def __call__(self, cli_mode: bool) -> int:
+        from wdl.wdlParser import WDLParser
         logger.info("parsing WDL file...")
 
-        # TODO:blergh
-        global subroutines 
-        subroutines = Parser.get_subroutines(self._text)
-        Parser.get_params(self._text)
-        Parser.get_consts(self._text)
-        output: str = Parser.parse(self._text)
+        parser = WDLParser()
+        parser.get_subroutines(self._text)
+        parser.get_params(self._text)
+        parser.get_consts(self._text)
+        output: str = parser.parse(self._text)
 
         #apparently this one just prints it out, to stdout I guess?
         stdout.write(output)
@@ -115,6 +111,8 @@ class WavgenDriver(WDLDriver):
         self._plots: bool = plots
 
     def __call__(self, cli_mode: bool) -> int:
+        import wdl.wavgen as wavgen
+
         # global variable because OF COURSE IT IS
         wavgen.GenerateFigs = self._plots
         wavgen.loadWDL(f"{self._fname}.wdl", self._fname)
@@ -124,6 +122,7 @@ class WavgenDriver(WDLDriver):
         # so here we only actually do that if it was asked for...
         # Again, all the plots are done with implicit global state rather than using the MPL object interface...
         if self._plots:
+            import matplotlib.pyplot as plt
             plt.show(block=True)
 
         return 0
@@ -146,6 +145,7 @@ class ModegenDriver(WDLDriver):
         self._acffile = acffile
 
     def __call__(self, cli_mode: bool, append: bool=True) -> int:
+        import wdl.modegen as modegen
         mobj = modegen.Modegen(self._modefile, self._acffile)
         mobj.write(append)
         return 0
@@ -165,6 +165,7 @@ class Ini2acfDriver(WDLDriver):
         self._outfile = stdout if outfile is None else outfile
 
     def __call__(self, cli_mode: bool) -> int:
+        from wdl.ini2acf import generate_acf
         outtxt: str = generate_acf(self._text, treat_str_as_content=True)
         with self._file_or_stdout(self._outfile) as f:
             logger.debug(f"outtxt is: {outtxt}")
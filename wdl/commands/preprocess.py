@@ -8,6 +8,8 @@ from typing import Optional
 import logging
 import subprocess
 
+from wdl.preprocessor import Preprocessor
+
 logger = logging.getLogger(__name__)
 
 #TODO: something cleverer on windows, if that
@@ -27,12 +29,12 @@ class FindGPP(WDLDriver):
         #For now, just find system gpp, in future we can check bundled as well
         self._gpppath = _find_gpp_program()
 
-    def __call__(self) -> int:
+    def __call__(self, cli_mode: bool) -> int:
         if self._gpppath is not None:
             stdout.write(f"{self._gpppath}{os.linesep}")
             return 0
         else:
-            warn("did not find GPP...")
+            warnings.warn("did not find GPP...")
             stdout.write(f"{os.linesep}")
             return 1
 
@@ -59,3 +61,24 @@ class PreprocessGPP(WDLDriver):
 
         procresult = subprocess.run(self._gpppath, self._gppargs)
         return procresult.return_code
+
+class Preprocess(WDLDriver):
+    CMD_NAME: str = "preprocess"
+    CMD_DESCRIPTION: str = "expand the GPP macros in a file without running gpp"
+
+    @classmethod
+    def setup_subparser(cls, subparsers) -> ArgumentParser:
+        parser = super().setup_subparser(subparsers)
+        parser.add_argument("-I", dest="include_dirs", action="append", default=[],
+                            help="directory to search for #include files, can be repeated")
+        return parser
+
+    def __init__(self, fname: str, include_dirs: list[str], **kwargs):
+        super().__init__(fname)
+        #like gpp reading stdin, includes are relative to the working directory
+        self._curdir = "." if fname == "-" else (os.path.dirname(fname) or ".")
+        self._include_dirs = include_dirs
+
+    def __call__(self, cli_mode: bool) -> int:
+        stdout.write(Preprocessor(self._include_dirs).process(self._text, self._curdir))
+        return 0
@@ -0,0 +1,43 @@
+from .driverbase import WDLDriver
+from argparse import ArgumentParser
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+class ServeDriver(WDLDriver):
+    CMD_NAME: str = "serve"
+    CMD_DESCRIPTION: str = "run a build server that `wdl build` forwards to, to save start up time on every build"
+
+    @classmethod
+    def setup_subparser(cls, subparsers) -> ArgumentParser:
+        parser = super().setup_subparser(subparsers, fname_arg_setup=False)
+        parser.add_argument("--socket", default=None,
+                            help="Unix domain socket to serve on (default: $WDL_SOCKET, or wdl-<uid>.sock in "
+                                 "$XDG_RUNTIME_DIR or the temporary directory)")
+        parser.add_argument("--stdio", action="store_true",
+                            help="answer JSON-RPC requests on stdin and stdout instead of a socket")
+        parser.add_argument("--cache-dir", default=None,
+                            help="directory of the build cache (default: $WDL_CACHE_DIR or ~/.cache/wdl)")
+        return parser
+
+    def __init__(self, socket: str | None, stdio: bool, cache_dir: str | None, **kwargs):
+        self._socket = socket
+        self._stdio = stdio
+        self._cache_dir = cache_dir
+
+    def __call__(self, cli_mode: bool) -> int:
+        from wdl.server import BuildServer, ServerError
+        server = BuildServer(self._cache_dir)
+        if self._stdio:
+            server.serve_stream(sys.stdin, sys.stdout)
+            return 0
+        try:
+            server.serve_socket(self._socket)
+        except ServerError as e:
+            logger.error(str(e))
+            return 1
+        except KeyboardInterrupt:
+            pass
+        return 0
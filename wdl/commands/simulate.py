@@ -0,0 +1,59 @@
+from .driverbase import WDLDriver
+from argparse import ArgumentParser
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SimulateDriver(WDLDriver):
+    CMD_NAME: str = "simulate"
+    CMD_DESCRIPTION: str = "run the timing script of an ACF from a label, without a controller, and report its time"
+
+    @classmethod
+    def setup_subparser(cls, subparsers) -> ArgumentParser:
+        parser = super().setup_subparser(subparsers, fname_arg_setup=False)
+        parser.add_argument("acf", help="the ACF file")
+        parser.add_argument("label", help="the label of the script to run, e.g. a sequence")
+        parser.add_argument("-p", "--param", dest="params", action="append", default=[], metavar="NAME=VALUE",
+                            help="run with this parameter value instead of the one in the ACF, can be repeated")
+        parser.add_argument("--limit", type=int, default=None,
+                            help="stop after this many periods, e.g. for a script that loops with GOTO")
+        parser.add_argument("--timeline", action="store_true",
+                            help="print the states entered and the periods each is held")
+        return parser
+
+    def __init__(self, acf: str, label: str, params: list[str], limit: int | None = None, timeline: bool = False,
+                 **kwargs):
+        self._acf = acf
+        self._label = label
+        self._params = params
+        self._limit = limit
+        self._timeline = timeline
+
+    def __call__(self, cli_mode: bool) -> int:
+        from wdl.simulate import Simulator, SimulationError, PERIOD_NS
+        parameters = {}
+        for param in self._params:
+            name, equals, value = param.partition("=")
+            if not equals or not value.strip().lstrip("-").isdigit():
+                logger.error("a parameter is given as NAME=VALUE, not %s", param)
+                return 1
+            parameters[name.strip()] = int(value)
+        try:
+            simulator = Simulator.read(self._acf)
+            run = simulator.run(self._label, parameters, self._limit, self._timeline)
+        except (SimulationError, OSError, ValueError) as e:
+            logger.error("cannot simulate %s: %s", self._label, e)
+            return 1
+
+        if self._timeline:
+            for state, count in zip(run.states, run.counts):
+                print("%-12s %d" % (simulator.state_names[state], count))
+        print("%s: %d periods, %.9f s, ended by %s" % (self._label, run.periods, run.periods * PERIOD_NS * 1e-9,
+                                                        run.end))
+        # the parameters the script changed, e.g. counted down with --
+        start = dict(simulator.parameters, **parameters)
+        for name, value in run.parameters.items():
+            if start[name] != value:
+                print("  %s=%d" % (name, value))
+        return 0
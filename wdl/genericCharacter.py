@@ -50,6 +50,8 @@ class Character:
     line in source_text where the error occurred.
     """
 
+    __slots__ = ("cargo", "source_index", "line_index", "col_index", "source_text")
+
     # -------------------------------------------------------------------
     #
     # -------------------------------------------------------------------
@@ -34,86 +34,109 @@ if __package__ != "wdl":
     import warnings
     basen = os.path.splitext(os.path.basename(__file__))[0]
     warnings.warn(f"detected running a script directly, consider using python -m wdl.{basen}")
-    import genericScanner as Scanner
     from genericCharacter import *
 else:
     from .genericCharacter import *
 
-"""
-A Scanner object reads through the source_text
-and returns one character at a time.
-"""
-source_text = ""
-last_index = -1
-source_index = -1
-line_index = -1
-col_index = -1
 
-
-# -------------------------------------------------------------------
+# -----------------------------------------------------------------------
 #
-# -------------------------------------------------------------------
-def initialize(source_text_arg):
-    """ """
-    global source_text, last_index, source_index, line_index, col_index
-    source_text = source_text_arg
-    last_index = len(source_text) - 1
-    source_index = -1
-    line_index = 0
-    col_index = -1
-
-
-# -------------------------------------------------------------------
+#               Scanner
 #
-# -------------------------------------------------------------------
-def get():
+# -----------------------------------------------------------------------
+class Scanner:
     """
-    Return the next character in source_text.
+    A Scanner object reads through the source_text
+    and returns one character at a time.
     """
-    global last_index, source_index, line_index, col_index
 
-    source_index += 1  # increment the index in source_text
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def __init__(self, source_text=""):
+        """ """
+        self.initialize(source_text)
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def initialize(self, source_text):
+        """ """
+        self.source_text = source_text
+        self.last_index = len(source_text) - 1
+        self.source_index = -1
+        self.line_index = 0
+        self.col_index = -1
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def get(self):
+        """
+        Return the next character in source_text.
+        """
+        self.source_index += 1  # increment the index in source_text
+
+        # maintain the line count
+        if self.source_index > 0:
+            if self.source_text[self.source_index - 1] == "\n":
+                # -------------------------------------------------------
+                # The previous character in source_text was a newline
+                # character.  So... we're starting a new line.
+                # Increment line_index and reset col_index.
+                # -------------------------------------------------------
+                self.line_index += 1
+                self.col_index = -1
+
+        self.col_index += 1
+
+        if self.source_index > self.last_index:
+            # We've read past the end of source_text.
+            # Return the ENDMARK character.
+            c = ENDMARK
+        else:
+            c = self.source_text[self.source_index]
+        return Character(
+            c, self.line_index, self.col_index, self.source_index, self.source_text
+        )
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def lookahead(self, offset=1):
+        """
+        Return a string (not a Character object) containing the character
+        at position:
+                source_index + offset
+        Note that we do NOT move our current position in the source_text.
+        That is,  we do NOT change the value of source_index.
+        """
+        index = self.source_index + offset
+
+        if index > self.last_index:
+            # We've read past the end of source_text.
+            # Return the ENDMARK character.
+            return ENDMARK
+        else:
+            return self.source_text[index]
+
 
-    # maintain the line count
-    if source_index > 0:
-        if source_text[source_index - 1] == "\n":
-            # -------------------------------------------------------
-            # The previous character in source_text was a newline
-            # character.  So... we're starting a new line.
-            # Increment line_index and reset col_index.
-            # -------------------------------------------------------
-            line_index += 1
-            col_index = -1
+# -------------------------------------------------------------------
+# The module functions below use a single, shared Scanner.
+# -------------------------------------------------------------------
+_scanner = Scanner()
 
-    col_index += 1
 
-    if source_index > last_index:
-        # We've read past the end of source_text.
-        # Return the ENDMARK character.
-        char = Character(ENDMARK, line_index, col_index, source_index, source_text)
-    else:
-        c = source_text[source_index]
-        char = Character(c, line_index, col_index, source_index, source_text)
+def initialize(source_text_arg):
+    """ """
+    _scanner.initialize(source_text_arg)
 
-    return char
+
+def get():
+    """ """
+    return _scanner.get()
 
 
-# -------------------------------------------------------------------
-#
-# -------------------------------------------------------------------
 def lookahead(offset=1):
-    """
-    Return a string (not a Character object) containing the character
-    at position:
-            source_index + offset
-    Note that we do NOT move our current position in the source_text.
-    That is,  we do NOT change the value of source_index.
-    """
-    index = source_index + offset
-
-    if index > last_index:
-        # We've read past the end of source_text.
-        # Return the ENDMARK character.
-        return ENDMARK
-    else:
-        return source_text[index]
+    """ """
+    return _scanner.lookahead(offset)
@@ -27,13 +27,76 @@ in the source text.
 #     David Hale <dhale@caltech.edu> or
 #     Stephen Kaye <skaye@caltech.edu>
 
-# from genericScanner import *
+import re
+from bisect import bisect_left
+
+_NEWLINE = re.compile("\n")
 
 
 class LexerError(Exception):
     pass
 
 
+# -----------------------------------------------------------------------
+#
+#               SourceText
+#
+# -----------------------------------------------------------------------
+class SourceText:
+    """
+    A SourceText object holds the text being lexed.  It is shared by all
+    the tokens of the text, which use it to find their line and column when
+    (and only when) asked.  The offsets of the newline characters are
+    indexed the first time a position is looked up.
+    """
+
+    __slots__ = ("text", "_newlines")
+
+    # -------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------
+    def __init__(self, text):
+        """
+        The constructor of the SourceText class
+        """
+        self.text = text
+        self._newlines = None
+
+    @property
+    def newlines(self):
+        """
+        sorted offsets of the newline characters in the text
+        """
+        if self._newlines is None:
+            self._newlines = [m.start() for m in _NEWLINE.finditer(self.text)]
+        return self._newlines
+
+    # -------------------------------------------------------------------
+    #  return the (line_index, col_index) of an offset into the text
+    # -------------------------------------------------------------------
+    def position(self, offset):
+        """
+        line_index is the number of newlines before the offset and
+        col_index the distance from the start of that line.
+        """
+        newlines = self.newlines
+        line_index = bisect_left(newlines, offset)
+        if line_index:
+            return line_index, offset - newlines[line_index - 1] - 1
+        return line_index, offset
+
+    # -------------------------------------------------------------------
+    #  return the text of one line, without its newline
+    # -------------------------------------------------------------------
+    def line(self, line_index):
+        """ """
+        newlines = self.newlines
+        start = newlines[line_index - 1] + 1 if line_index else 0
+        if line_index < len(newlines):
+            return self.text[start : newlines[line_index]]
+        return self.text[start:]
+
+
 # -----------------------------------------------------------------------
 #
 #               Token
@@ -45,32 +108,38 @@ class Token:
     It holds:
     - the text of the token... self.cargo
     - the type of token that it is... self.type
-    - the line number and column index where the token starts... self.show(True)
+    - the offsets of the token in the source text... self.start, self.end
+    - (a reference to) the SourceText it came from... self.source
+    The line number and column index where the token starts are worked
+    out from the source on demand... self.show(True)
     """
 
+    __slots__ = ("type", "cargo", "start", "end", "source")
+
     # -------------------------------------------------------------------
     #
     # -------------------------------------------------------------------
-    def __init__(self, start_char):
+    def __init__(self, source, start, end, cargo, type=None):
         """
         The constructor of the Token class
         """
-        self.cargo = start_char.cargo
-
-        # ----------------------------------------------------------
-        # The token picks up information
-        # about its location in the source_text
-        # ----------------------------------------------------------
-        self.source_text = start_char.source_text
-        self.line_index = start_char.line_index
-        self.col_index = start_char.col_index
-
-        # ----------------------------------------------------------
-        # We won't know what kind of token we have until we have
-        # finished processing all the characters in the token.
-        # So when we start, the token.type is None (aka null).
-        # ----------------------------------------------------------
-        self.type = None
+        self.source = source
+        self.start = start
+        self.end = end
+        self.cargo = cargo
+        self.type = type
+
+    @property
+    def source_text(self):
+        return self.source.text
+
+    @property
+    def line_index(self):
+        return self.source.position(self.start)[0]
+
+    @property
+    def col_index(self):
+        return self.source.position(self.start)[1]
 
     # -------------------------------------------------------------------
     #  return a displayable string representation of the token
@@ -89,7 +158,8 @@ class Token:
             space = ""
 
         if show_line_numbers:
-            s = str(self.line_index).rjust(6) + str(self.col_index).rjust(4) + "  "
+            line_index, col_index = self.source.position(self.start)
+            s = str(line_index).rjust(6) + str(col_index).rjust(4) + "  "
         else:
             s = ""
 
@@ -114,17 +184,17 @@ class Token:
     # -------------------------------------------------------------------
     def abort(self, msg):
         """ """
-        lines = self.source_text.split("\n")
-        source_line = lines[self.line_index]
+        line_index, col_index = self.source.position(self.start)
+        source_line = self.source.line(line_index)
         raise LexerError(
             "\nIn line "
-            + str(self.line_index + 1)
+            + str(line_index + 1)
             + " near column "
-            + str(self.col_index + 1)
+            + str(col_index + 1)
             + ":\n\n"
             + source_line.replace("\t", " ")
             + "\n"
-            + " " * self.col_index
+            + " " * col_index
             + "^\n\n"
             + msg
         )
@@ -48,7 +48,7 @@ sys.tracebacklimit = 0
 def main(input_source_text):
     """ """
     # global token
-    Parser.make_include(input_source_text)
+    sys.stdout.write(Parser.make_include(input_source_text))
 
 
 # -----------------------------------------------------------------------------
@@ -2,46 +2,23 @@
 
 from io import TextIOWrapper
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Optional
+import re
 import sys
 from argparse import ArgumentParser
-from os import linesep
 
-def _extract_section_name(line: str) -> Optional[tuple[str, bool]]:
-    if '[' not in line:
-        return None
-    else:
-        secname: str = line.split("[")[1].split("]")[0]
-        if '#' not in secname:
-            return secname, False
-        return secname.strip('#'), True
-
-
-def _section_replace_filter(inp: str) -> Generator[tuple[str, list[str]], None, None]:
-    #The original script uses a regex here to get the tag names but we'll just do it a
-    #way that even a physicist can understand here
-    thissection: Optional[str] = None
-    thisprocess: Optional[bool] = None
-    seclines: list[str] = []
-    for line in inp.splitlines():
-        if (tpl :=_extract_section_name(line)) is not None:
-            secname, process = tpl
-            # This is a new section. If we are already processing one, yield it out and start the next
-            # Otherwise, start processing the lines
-            if thissection is not None:
-                yield thissection, seclines, thisprocess
-            thissection, thisprocess = secname, process
-            seclines.clear()
-        else:
-            #this is a continuation of the previous section, just append the lines
-            seclines.append(line)
-    yield thissection, seclines, thisprocess
+# a [TAG] or [TAG#] section header, as matched by ini2acf.pl
+_SECTION_RE = re.compile(r"^\[(.*?)(#?)\]")
+
 
 def generate_acf(inifile: str | Path | TextIOWrapper,
                  treat_str_as_content: bool=False) -> str:
     """the way this seems to work is the WDL legacy tools spit out files that have an ini section that is labelled e.g.
     [PARAMETER#]... with the # character in it. Here, we are (I think) supposed to just go through the items in that section
-    and number them"""
+    and number them.
+
+    The output is line for line what ini2acf.pl writes, so an ACF made in process is the same as one made by the
+    Makefile"""
 
 
     #note my first thought here was to use the built in INI parsing "configparser" module,
@@ -56,24 +33,49 @@ def generate_acf(inifile: str | Path | TextIOWrapper,
     else:
         #This is an already open file like opject
         inp: str = inifile.read()
-    outp: list[str] = []
 
     #need to add [CONFIG] at the top
-    outp.append(f"[CONFIG]{linesep}")
-
-    for secname, seclines, process in _section_replace_filter(inp):
-        if process:
-            for ind, line in enumerate(seclines):
-                #strip whitespace and remove any trailing comment
-                line = line.split("#")[0].strip()
-                newline: str = f'{secname}{ind}="{line}"'
-                outp.append(newline)
-            # A line telling us how many we had
-            outp.append(f'{secname}S={ind+1}')
-        else:
-            outp.append(f"[{secname}]")
-            outp.extend(seclines)
-    return f"{linesep.join(outp)}{linesep}"
+    outp: list[str] = ["[CONFIG]"]
+    tags_seen: set[str] = {"CONFIG"}
+    tag: Optional[str] = None
+    enumerate_tag: bool = False
+    count: int = 0
+
+    for line in inp.splitlines():
+        if (match := _SECTION_RE.match(line)) is not None:
+            # a new section, so report how many lines the numbered one had
+            if enumerate_tag:
+                outp.append(f"{tag}S={count}")
+            tag = match.group(1)
+            if match.group(2):
+                # numbered sections don't have a header of their own
+                enumerate_tag = True
+                count = 0
+                tags_seen.add(tag)
+                continue
+            enumerate_tag = False
+            # only the first header of a section is kept
+            if tag in tags_seen:
+                continue
+            tags_seen.add(tag)
+
+        #strip whitespace and remove any trailing comment
+        line = line.split("#")[0].rstrip()
+        if enumerate_tag:
+            #enclose lines with whitespace, ',' ';' or '=' in double quotes
+            if re.search(r"[\s,;=]", line):
+                outp.append(f'{tag}{count}="{line}"')
+                count += 1
+            elif line:
+                outp.append(f"{tag}{count}={line}")
+                count += 1
+        elif line:
+            outp.append(line)
+
+    # A line telling us how many we had
+    if enumerate_tag:
+        outp.append(f"{tag}S={count}")
+    return "".join(f"{line}\n" for line in outp)
 
 def main():
     ap = ArgumentParser(prog="ini2acf",
@@ -0,0 +1,251 @@
+"""
+The dependency manifest of a project build.
+
+For each stage of a build, the manifest records every file the stage read,
+the .conf, the files it names and the whole closure of their #includes,
+with its modification time, size and digest, and the outputs the stage
+left in the intermediate files.  A later build can then skip any stage
+whose inputs and outputs are unchanged and read its outputs back instead.
+Modification times only save reading a file: a file that was touched but
+not changed still matches on its digest.
+
+The same dependencies can be written as make rules, like the .d files of
+a C compiler, for Makefiles that build ACFs.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import hashlib
+import json
+import logging
+import os
+
+from .cache import tool_version
+
+logger = logging.getLogger(__name__)
+
+# bump when the layout of the manifest changes
+MANIFEST_FORMAT = 1
+
+
+# -----------------------------------------------------------------------------
+# @fn     text_digest
+# @brief  the digest of a text, as the digest of the file it is written to
+# @param  text
+# @return hex digest
+# -----------------------------------------------------------------------------
+def text_digest(text):
+    """ """
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# @fn     file_state
+# @brief  the modification time, size and digest of a file
+# @param  path
+# @return dict, or None if there is no such file
+# -----------------------------------------------------------------------------
+def file_state(path):
+    """ """
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+
+
+# -----------------------------------------------------------------------------
+# @fn     unchanged
+# @brief  whether a file is still in a recorded state
+# @param  path
+# @param  state, as returned by file_state
+# @return bool
+# -----------------------------------------------------------------------------
+def unchanged(path, state):
+    """
+    Compare the modification time and size first, and the digest only if
+    they differ, so that unchanged files need not be read.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return state is None
+    if state is None:
+        return False
+    if stat.st_mtime_ns == state["mtime_ns"] and stat.st_size == state["size"]:
+        return True
+    now = file_state(path)
+    return now is not None and now["sha256"] == state["sha256"]
+
+
+# -----------------------------------------------------------------------------
+#
+#               Manifest
+#
+# -----------------------------------------------------------------------------
+class Manifest(object):
+    """
+    The stages of one build, each with the states of its input files and
+    the digests of its outputs, in a JSON file.  options are the build
+    options that change the outputs; a manifest written with others, or by
+    another version of the tool, is ignored.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(self, options=None):
+        """ """
+        self.options = dict(options or {})
+        # stage -> {"inputs": {path: state}, "outputs": {name: output}}
+        # where an output is {"path":, "length":, "sha256":}
+        self.stages = {}
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    @classmethod
+    def load(cls, path, options=None):
+        """
+        Read the manifest at path, or return an empty one if there is none
+        that can be used.
+        """
+        manifest = cls(options)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if (
+            data.get("format") != MANIFEST_FORMAT
+            or data.get("version") != tool_version()
+            or data.get("options") != manifest.options
+        ):
+            logger.info("%s is out of date, rebuilding everything", path)
+            return manifest
+        manifest.stages = data.get("stages", {})
+        return manifest
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def save(self, path):
+        """
+        Write the manifest to path.
+        """
+        data = {
+            "format": MANIFEST_FORMAT,
+            "version": tool_version(),
+            "options": self.options,
+            "stages": self.stages,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+            f.write("\n")
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def record(self, stage, inputs, outputs):
+        """
+        Record a stage that read the files in inputs and made outputs, a
+        dict of name to (path, text): the text is all of the file at path,
+        or the beginning of it.  Call this after the outputs are written.
+        """
+        self.stages[stage] = {
+            "inputs": {path: file_state(path) for path in sorted(inputs)},
+            "outputs": {
+                name: {"path": path, "length": len(text), "sha256": text_digest(text)}
+                for name, (path, text) in outputs.items()
+            },
+        }
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def inputs(self, stage):
+        """
+        The paths of the files a recorded stage read.
+        """
+        return list(self.stages.get(stage, {}).get("inputs", {}))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def outputs(self, stage, made=None):
+        """
+        Return the dict of name to text of the outputs of a recorded stage,
+        or None if the stage must run again: it was not recorded, one of
+        its inputs has changed, or one of its outputs is not as it was
+        left.  made is a dict of path to text of the files that this build
+        has made so far, which are inputs of later stages but are not
+        written until the end.
+        """
+        made = made or {}
+        entry = self.stages.get(stage)
+        if entry is None:
+            return None
+        for path, state in entry["inputs"].items():
+            if path in made:
+                if state is None or text_digest(made[path]) != state["sha256"]:
+                    return None
+            elif not unchanged(path, state):
+                logger.debug("%s: %s has changed", stage, path)
+                return None
+        texts = {}
+        for name, output in entry["outputs"].items():
+            try:
+                with open(output["path"], "r", newline="") as f:
+                    text = f.read(output["length"])
+            except OSError:
+                return None
+            if text_digest(text) != output["sha256"]:
+                return None
+            texts[name] = text
+        return texts
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def make_rules(self, target, directory="."):
+        """
+        Return make rules for target on every input of every stage that
+        exists, with an empty rule for each so that make does not fail when
+        one is deleted, as with gcc -MP.  Paths are relative to directory.
+        """
+        outputs = set()
+        for entry in self.stages.values():
+            outputs.update(output["path"] for output in entry["outputs"].values())
+        depends = set()
+        for entry in self.stages.values():
+            depends.update(
+                path
+                for path, state in entry["inputs"].items()
+                if state is not None and path not in outputs
+            )
+        depends = [os.path.relpath(path, directory) for path in sorted(depends)]
+        rules = [target + ":" + "".join(" \\\n  " + path for path in depends)]
+        rules += ["", *(path + ":" for path in depends)]
+        return "\n".join(rules) + "\n"
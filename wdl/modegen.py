@@ -1,21 +1,26 @@
+import io
 import os
 import re
-import numpy as np
 import sys
 
 class Modegen:
     """Process the modes file after the ACF has been made."""
 
-    def __init__(self, modefile, acffile):
+    def __init__(self, modefile, acffile, acftext=None, modetext=None):
+        """acftext, if given, is the text of the ACF, which then need not
+        have been written to acffile yet, and likewise modetext is the
+        text of the modes file"""
 
         self.__OK2write = True
 
         self.modefile = os.path.expanduser(modefile)
         self.acffile = os.path.expanduser(acffile)
+        self.acftext = acftext
+        self.modetext = modetext
 
-        if not os.path.isfile(self.modefile):
+        if modetext is None and not os.path.isfile(self.modefile):
             print("MODE FILE NOT FOUND: %s" % self.modefile)
-        if not os.path.isfile(self.acffile):
+        if acftext is None and not os.path.isfile(self.acffile):
             print("ACF FILE NOT FOUND: %s" % self.acffile)
 
         self.modeKVpair = {}  # mode KEY=VALUE pairs
@@ -46,7 +51,11 @@ class Modegen:
 
     def __read_inputfile(self):
         """read the input file"""
-        with open(self.modefile) as FILE:
+        if self.modetext is None:
+            FILE = open(self.modefile)
+        else:
+            FILE = io.StringIO(self.modetext)
+        with FILE:
             for line in FILE:
                 # look for headers
                 match = re.search(r"^\[(.*?)\]", line)
@@ -98,44 +107,48 @@ class Modegen:
     def __assign_defaults_from_acf(self):
         """populate self.union with values from the acf file"""
 
-        allkeys = np.sort(list(self.union))
-        with open(self.acffile) as ACF:
-            for line in ACF:
-                # skip [MODE_X] statments
-                if re.search(r"^\w+:\w", line):
-                    continue
-                # look for key=value pairs in ACF
-                match = re.search("^(.+)=(.+?)\n", line)
-                if match:
-                    ACFKEY = "ACF:" + match.group(1)
-                    ACFVAL = match.group(2)
-                    temp = ACFKEY.split('"')
-                    if re.search("PARAMETER", temp[0]):
-                        ACFKEY = "ACF:" + temp[-1]
-
-                    if ACFKEY in allkeys:
-                        self.union[ACFKEY] = ACFVAL
-                    else:
-                        # Parse the '%d' that typically shows up
-                        # in 'ACF:PARAMETER'-keys
-                        for unionkey in allkeys:  # do the reverse check
-                            if re.search("%d", unionkey):
-                                # make regex from printf %d ONLY IF
-                                # it appears in the key
-                                unionregex = re.sub("%d", r"(\d+)", unionkey)
-                                kmatch = re.search(unionregex, ACFKEY)
-                                if kmatch:
-                                    try:
-                                        newkey = unionkey % int(kmatch.group(1))
-                                    except:
-                                        print("error")
-                                    # Tracer()()
-                                    self.union.update({newkey: ACFVAL})
-                                    # default for unionkey is set now with
-                                    # the proper index, so we can now
-                                    # discard unionkey
-                                    self.union.pop(unionkey)
-                                    break
+        allkeys = sorted(self.union)
+        if self.acftext is None:
+            with open(self.acffile) as ACF:
+                acflines = ACF.readlines()
+        else:
+            acflines = self.acftext.splitlines(keepends=True)
+        for line in acflines:
+            # skip [MODE_X] statments
+            if re.search(r"^\w+:\w", line):
+                continue
+            # look for key=value pairs in ACF
+            match = re.search("^(.+)=(.+?)\n", line)
+            if match:
+                ACFKEY = "ACF:" + match.group(1)
+                ACFVAL = match.group(2)
+                temp = ACFKEY.split('"')
+                if re.search("PARAMETER", temp[0]):
+                    ACFKEY = "ACF:" + temp[-1]
+
+                if ACFKEY in allkeys:
+                    self.union[ACFKEY] = ACFVAL
+                else:
+                    # Parse the '%d' that typically shows up
+                    # in 'ACF:PARAMETER'-keys
+                    for unionkey in allkeys:  # do the reverse check
+                        if re.search("%d", unionkey):
+                            # make regex from printf %d ONLY IF
+                            # it appears in the key
+                            unionregex = re.sub("%d", r"(\d+)", unionkey)
+                            kmatch = re.search(unionregex, ACFKEY)
+                            if kmatch:
+                                try:
+                                    newkey = unionkey % int(kmatch.group(1))
+                                except:
+                                    print("error")
+                                # Tracer()()
+                                self.union.update({newkey: ACFVAL})
+                                # default for unionkey is set now with
+                                # the proper index, so we can now
+                                # discard unionkey
+                                self.union.pop(unionkey)
+                                break
 
         # the DEFAULT MODE in the input is special -- it assigns
         # non ACF defaults to the union
@@ -175,40 +188,49 @@ class Modegen:
                             )
                             break
 
-    def write(self, append=None):
-        """write the mode sections to standard out"""
+    def modes(self):
+        """return the mode sections as text, or None if they cannot be
+        generated"""
         if not self.__OK2write:
-            print(
-                "** Something is wrong -- check error messages from " "initialization."
-            )
-            if append:
-                print("WARNING: no modes written to %s." % self.acffile)
-            return False
-
-        allkeys = np.sort(list(self.union))
+            return None
 
-        if append:
-            sys.stdout = open(self.acffile, "a")
+        allkeys = sorted(self.union)
 
+        lines = []
         for mode in self.modeKVpair:
             # loop over all modes declared
-            print("[%s]" % mode)
+            lines.append("[%s]" % mode)
             modekeys = list(self.modeKVpair[mode])
             # first, print the K=V entries for this mode.
             for key in allkeys:
                 if key in modekeys:
-                    print("%s=%s" % (key, self.modeKVpair[mode][key]))
+                    lines.append("%s=%s" % (key, self.modeKVpair[mode][key]))
                 else:
-                    print("%s=%s" % (key, self.union[key]))
+                    lines.append("%s=%s" % (key, self.union[key]))
             # print the non K=V entries for this mode.
             for line in self.modelist[mode]:
-                print(line)
+                lines.append(line)
             # propagate any non K=V in MODE_DEFAULT with
             # neither thought nor regard
             if mode != "MODE_DEFAULT":
                 for line in self.modelist["MODE_DEFAULT"]:
-                    print(line)
+                    lines.append(line)
+        return "".join(line + "\n" for line in lines)
+
+    def write(self, append=None):
+        """write the mode sections to standard out"""
+        text = self.modes()
+        if text is None:
+            print(
+                "** Something is wrong -- check error messages from " "initialization."
+            )
+            if append:
+                print("WARNING: no modes written to %s." % self.acffile)
+            return False
+
         if append:
-            sys.stdout.close()
-            sys.stdout = sys.__stdout__
+            with open(self.acffile, "a") as f:
+                f.write(text)
             print("Modes appended to %s" % self.acffile)
+        else:
+            sys.stdout.write(text)
@@ -57,7 +57,6 @@ else:
     from . import modegen
 
 
-import matplotlib.pyplot as plt
 import sys
 
 sys.dont_write_bytecode = True
@@ -94,7 +93,10 @@ def main(source, toplot):
         wavgen.GenerateFigs = True
 
     wavgen.loadWDL(input_file, output)
-    plt.show(block=True)
+    if wavgen.GenerateFigs:
+        import matplotlib.pyplot as plt
+
+        plt.show(block=True)
 
 
 # -----------------------------------------------------------------------------
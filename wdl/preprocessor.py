@@ -0,0 +1,497 @@
+"""
+An in-process macro preprocessor, compatible with the subset of GPP that WDL
+projects use, so the text of a project can be handed straight to the Lexer
+without running the external gpp program.
+
+The preprocessor behaves like GPP in its default mode with the comment modes
+of the Makefile's GFLAGS, +c "/*" "*/" +c "//" "\\n" +c "\\\\\\n" "":
+comments are removed (the newline that ends a // comment is kept) and a
+backslash-newline joins two lines.  The meta-macros understood are
+
+    #define name body          #define name(a, b) body with a and b
+    #defeval name body         (body is expanded when it is defined)
+    #undef name
+    #include file              (searched next to the including file, then
+                                in the include directories)
+    #if expr   #ifdef name   #ifndef name   #elif expr   #else   #endif
+    #eval expr                 (integer arithmetic, anywhere in a line)
+    #error text   #warning text
+
+Macros are expanded in the text between the meta-macro lines a block at a
+time, so the arguments of a call may span lines.  The comment-stripped text
+of each file read is kept in memory, keyed on its modification time, so the
+same include file is read once per process.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import os
+import re
+import sys
+
+# the GFLAGS comment modes: /* */ and // comments, and backslash-newline
+_COMMENT = re.compile(r"/\*.*?(?:\*/|\Z)|//[^\n]*|\\\n", re.DOTALL)
+
+# a meta-macro at the start of a line
+_DIRECTIVE = re.compile(r"\s*#(\w+)\s*(.*)$", re.DOTALL)
+
+# a word, or a meta-macro within a line
+_NAME = re.compile(r"#(\w+)|\w+")
+
+_WORD = re.compile(r"\w+")
+
+_PARENS = re.compile(r"[(),]")
+
+_DEFINE = re.compile(r"(\w+)(?:\(([^)]*)\))?\s*(.*)$", re.DOTALL)
+
+_DEFINED = re.compile(r"\bdefined\s*(?:\(\s*(\w+)\s*\)|(\w+))")
+
+_CONDITIONALS = frozenset(["if", "ifdef", "ifndef", "elif", "else", "endif"])
+
+_DIRECTIVES = _CONDITIONALS | frozenset(
+    ["define", "defeval", "undef", "include", "error", "warning"]
+)
+
+# -----------------------------------------------------------------------------
+# #eval arithmetic, with the C operators and precedence
+# -----------------------------------------------------------------------------
+_OPERAND = re.compile(r"\s*(?:(\d+)|([-+!~(]))")
+
+_OPERATOR = re.compile(r"\s*(\|\||&&|==|!=|<=|>=|<<|>>|[-+*/%<>&^|)])")
+
+
+def _divide(a, b):
+    """integer division, truncating toward zero like C"""
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+def _remainder(a, b):
+    """remainder of the division above"""
+    return a - b * _divide(a, b)
+
+
+_BINARY = {
+    "||": (1, lambda a, b: int(bool(a or b))),
+    "&&": (2, lambda a, b: int(bool(a and b))),
+    "|": (3, lambda a, b: a | b),
+    "^": (4, lambda a, b: a ^ b),
+    "&": (5, lambda a, b: a & b),
+    "==": (6, lambda a, b: int(a == b)),
+    "!=": (6, lambda a, b: int(a != b)),
+    "<": (7, lambda a, b: int(a < b)),
+    "<=": (7, lambda a, b: int(a <= b)),
+    ">": (7, lambda a, b: int(a > b)),
+    ">=": (7, lambda a, b: int(a >= b)),
+    "<<": (8, lambda a, b: a << b),
+    ">>": (8, lambda a, b: a >> b),
+    "+": (9, lambda a, b: a + b),
+    "-": (9, lambda a, b: a - b),
+    "*": (10, lambda a, b: a * b),
+    "/": (10, _divide),
+    "%": (10, _remainder),
+}
+
+_UNARY = {
+    "-": lambda a: -a,
+    "+": lambda a: a,
+    "!": lambda a: int(not a),
+    "~": lambda a: ~a,
+}
+
+
+class PreprocessorError(Exception):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# @fn     evaluate
+# @brief  evaluate the integer expression of an #eval or #if
+# @param  text
+# @return int
+# -----------------------------------------------------------------------------
+def evaluate(text):
+    """
+    Evaluate the integer arithmetic in text, as GPP's #eval does.
+    Raises PreprocessorError if text is not an integer expression.
+    """
+
+    def operand(pos):
+        m = _OPERAND.match(text, pos)
+        if m is None:
+            raise PreprocessorError("cannot evaluate " + repr(text.strip()))
+        if m.group(1) is not None:
+            return int(m.group(1)), m.end()
+        if m.group(2) == "(":
+            value, pos = binary(m.end(), 0)
+            m = _OPERATOR.match(text, pos)
+            if m is None or m.group(1) != ")":
+                raise PreprocessorError("missing ')' in " + repr(text.strip()))
+            return value, m.end()
+        value, pos = operand(m.end())
+        return _UNARY[m.group(2)](value), pos
+
+    def binary(pos, minimum):
+        value, pos = operand(pos)
+        while True:
+            m = _OPERATOR.match(text, pos)
+            if m is None or m.group(1) not in _BINARY:
+                return value, pos
+            precedence, function = _BINARY[m.group(1)]
+            if precedence <= minimum:
+                return value, pos
+            right, pos = binary(m.end(), precedence)
+            try:
+                value = function(value, right)
+            except ArithmeticError as e:
+                raise PreprocessorError(
+                    "cannot evaluate " + repr(text.strip()) + ": " + str(e)
+                )
+
+    value, pos = binary(0, 0)
+    if text[pos:].strip():
+        raise PreprocessorError("cannot evaluate " + repr(text.strip()))
+    return value
+
+
+# -----------------------------------------------------------------------------
+# @fn     strip_comments
+# @brief  remove the GFLAGS comments from text
+# @param  text
+# @return text
+# -----------------------------------------------------------------------------
+def strip_comments(text):
+    """ """
+    return _COMMENT.sub("", text)
+
+
+__sources__ = {}
+
+
+# -----------------------------------------------------------------------------
+# @fn     read_source
+# @brief  read a file with its comments removed, cached on modification time
+# @param  path
+# @return text
+# -----------------------------------------------------------------------------
+def read_source(path):
+    """ """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = __sources__.get(path)
+    if cached is None or cached[0] != key:
+        with open(path, "r") as f:
+            cached = (key, strip_comments(f.read()))
+        __sources__[path] = cached
+    return cached[1]
+
+
+# -----------------------------------------------------------------------------
+#
+#               Preprocessor
+#
+# -----------------------------------------------------------------------------
+class Preprocessor(object):
+    """
+    A Preprocessor holds the macros defined so far, so any number of texts
+    can be processed in turn with the definitions of the earlier ones, as
+    when several files are catenated into one gpp run.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(self, include_dirs=(), macros=None, sources=None):
+        """
+        include_dirs are searched, in order, for #include files that are not
+        next to the file that includes them.  macros is an optional dict of
+        name to body of macros that are defined before any text is processed.
+        sources is an optional dict of absolute path to text of files that
+        are #included from memory instead of from disk.
+        """
+        self.include_dirs = list(include_dirs)
+        self.sources = dict(sources or {})
+        # every path looked at for an #include, found or not, in order
+        self.searched = []
+        # name -> (tuple of parameter names or None, body)
+        self.macros = {}
+        for name, body in (macros or {}).items():
+            self.define(name, body)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def define(self, name, body="", params=None):
+        """
+        Define a macro.  params is a sequence of parameter names for a macro
+        that is called with arguments, or None.
+        """
+        self.macros[name] = (None if params is None else tuple(params), str(body))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def process(self, text, curdir="."):
+        """
+        Return the preprocessed text.  #include files are looked for in
+        curdir before the include directories.
+        """
+        return self.__run(strip_comments(text), curdir, "<input>")
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def process_file(self, path):
+        """
+        Return the preprocessed text of the file at path.
+        """
+        if os.path.abspath(path) in self.sources:
+            text = strip_comments(self.sources[os.path.abspath(path)])
+        else:
+            text = read_source(path)
+        return self.__run(text, os.path.dirname(path) or ".", path)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __run(self, text, curdir, name):
+        """
+        Process comment-stripped text, line by line for the meta-macros and
+        a block at a time for the macro expansions in between.
+        """
+        out = []
+        block = []
+        # one entry for each open #if: (enclosing block active, branch taken)
+        stack = []
+        active = True
+        lines = text.split("\n")
+        last = len(lines) - 1
+
+        for number, line in enumerate(lines):
+            m = _DIRECTIVE.match(line) if "#" in line else None
+            if m is None or m.group(1) not in _DIRECTIVES:
+                if active:
+                    block.append(line if number == last else line + "\n")
+                continue
+
+            directive, rest = m.group(1), m.group(2)
+            where = "%s:%d: " % (name, number + 1)
+            if block:
+                out.append(self.expand("".join(block)))
+                block = []
+
+            if directive in _CONDITIONALS:
+                if directive in ("if", "ifdef", "ifndef"):
+                    taken = active and self.__condition(directive, rest, where)
+                    stack.append((active, taken))
+                    active = taken
+                    continue
+                if not stack:
+                    raise PreprocessorError(where + "#%s without #if" % directive)
+                enclosing, taken = stack[-1]
+                if directive == "elif":
+                    active = enclosing and not taken
+                    active = active and self.__condition(directive, rest, where)
+                    stack[-1] = (enclosing, taken or active)
+                elif directive == "else":
+                    active = enclosing and not taken
+                    stack[-1] = (enclosing, True)
+                else:
+                    active = enclosing
+                    stack.pop()
+                continue
+
+            if not active:
+                continue
+
+            if directive in ("define", "defeval"):
+                d = _DEFINE.match(rest)
+                if d is None:
+                    raise PreprocessorError(where + "bad #" + directive)
+                params = d.group(2)
+                if params is not None:
+                    params = [p.strip() for p in params.split(",")]
+                body = d.group(3).strip()
+                if directive == "defeval":
+                    body = self.expand(body)
+                self.define(d.group(1), body, params)
+            elif directive == "undef":
+                for undef in rest.split()[:1]:
+                    self.macros.pop(undef, None)
+            elif directive == "include":
+                path = self.__find_include(rest.strip().strip('"').strip("<>"), curdir)
+                if path is None:
+                    raise PreprocessorError(where + "cannot find include file " + rest)
+                # the text of the file takes the place of the #include line,
+                # which keeps its own newline
+                out.append(self.process_file(path))
+                out.append("\n" if number < last else "")
+            elif directive == "error":
+                raise PreprocessorError(where + "#error " + self.expand(rest).strip())
+            else:
+                print(where + "#warning " + self.expand(rest).strip(), file=sys.stderr)
+
+        if stack:
+            raise PreprocessorError(name + ": #if without #endif")
+        if block:
+            out.append(self.expand("".join(block)))
+        return "".join(out)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __condition(self, directive, rest, where):
+        """
+        Evaluate the condition of an #if, #ifdef, #ifndef or #elif.
+        """
+        if directive in ("ifdef", "ifndef"):
+            names = rest.split()
+            if not names:
+                raise PreprocessorError(where + "#%s needs a macro name" % directive)
+            return (names[0] in self.macros) == (directive == "ifdef")
+        rest = _DEFINED.sub(
+            lambda m: "1" if (m.group(1) or m.group(2)) in self.macros else "0", rest
+        )
+        try:
+            return bool(evaluate(self.expand(rest)))
+        except PreprocessorError as e:
+            raise PreprocessorError(where + "#" + directive + ": " + str(e))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __find_include(self, filename, curdir):
+        """
+        Return the path of an #include file, or None.
+        """
+        for directory in [curdir] + self.include_dirs:
+            path = os.path.join(directory, filename)
+            self.searched.append(os.path.abspath(path))
+            if os.path.abspath(path) in self.sources or os.path.isfile(path):
+                return path
+        return None
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def expand(self, text, active=frozenset()):
+        """
+        Expand the macros in text.  The macros named in active are being
+        expanded already, and are left alone so a macro cannot recurse.
+        """
+        out = []
+        pos = 0
+        macros = self.macros
+        while True:
+            m = _NAME.search(text, pos)
+            if m is None:
+                out.append(text[pos:])
+                return "".join(out)
+            out.append(text[pos : m.start()])
+            pos = m.end()
+            meta = m.group(1)
+
+            if meta is not None:
+                if meta == "eval":
+                    # the argument runs to the end of the line
+                    end = text.find("\n", pos)
+                    if end < 0:
+                        end = len(text)
+                    expression = self.expand(text[pos:end], active)
+                    try:
+                        out.append(str(evaluate(expression)))
+                    except PreprocessorError:
+                        out.append(expression.strip())
+                    pos = end
+                elif meta in _DIRECTIVES:
+                    raise PreprocessorError(
+                        "#%s must be at the start of a line" % meta
+                    )
+                else:
+                    out.append("#")
+                    pos = m.start(1)
+                continue
+
+            name = m.group()
+            macro = macros.get(name)
+            if macro is None or name in active:
+                out.append(name)
+                continue
+            params, body = macro
+            if params is None:
+                out.append(self.expand(body, active | {name}))
+                continue
+            if not text.startswith("(", pos):
+                # without arguments it is not a call
+                out.append(name)
+                continue
+
+            args, pos = self.__arguments(text, pos + 1, name)
+            values = dict(zip(params, [self.expand(a, active) for a in args]))
+            body = _WORD.sub(lambda w: values.get(w.group(), w.group()), body)
+            out.append(self.expand(body, active | {name}))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __arguments(self, text, pos, name):
+        """
+        Split the arguments of a macro call at the commas that are not in
+        nested parentheses.  pos is just after the opening parenthesis.
+        Returns the list of arguments and the position after the closing
+        parenthesis.
+        """
+        args = []
+        depth = 0
+        start = pos
+        while True:
+            m = _PARENS.search(text, pos)
+            if m is None:
+                raise PreprocessorError("unterminated arguments of macro " + name)
+            pos = m.end()
+            c = m.group()
+            if c == "(":
+                depth += 1
+            elif c == ",":
+                if depth == 0:
+                    args.append(text[start : m.start()])
+                    start = pos
+            elif depth:
+                depth -= 1
+            else:
+                args.append(text[start : m.start()])
+                return args, pos
+
+
+# -----------------------------------------------------------------------------
+# @fn     preprocess
+# @brief  preprocess text with a new Preprocessor
+# @param  text
+# @param  include_dirs
+# @param  curdir
+# @return text
+# -----------------------------------------------------------------------------
+def preprocess(text, include_dirs=(), curdir="."):
+    """ """
+    return Preprocessor(include_dirs).process(text, curdir)
@@ -60,7 +60,7 @@ sys.tracebacklimit = 0
 # -----------------------------------------------------------------------------
 def main(input_source_text):
     """ """
-    Parser.make_include_sequence(input_source_text)
+    sys.stdout.write(Parser.make_include_sequence(input_source_text))
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,339 @@
+"""
+A long-lived build server, and the client that talks to it.
+
+Every run of the wdl command pays for starting Python, importing numpy and
+reading and preprocessing every file of the project again.  The server
+does that once: it stays up with its modules imported, the comment-
+stripped sources read by the preprocessor and the stage cache warm, and
+builds projects on request.
+
+Requests are JSON-RPC 2.0, one JSON object per line, over a Unix domain
+socket or stdin and stdout.  The methods are
+
+    ping                            -> {"pid": ..., "version": ...}
+    build {"name": ..., ...}        -> {"acf": path, "output": text}
+    shutdown                        -> null
+
+where the parameters of build are those of wdl.build.build, except plots,
+and the output is what the build printed or logged.  A failed build is an
+error whose data holds the output.  Paths are used as given, so a client
+should send absolute ones.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+# a build that failed
+BUILD_FAILED = 1
+
+# the parameters of a build request, and their defaults
+BUILD_PARAMS = {
+    "name": None,
+    "include_dirs": [],
+    "intermediates": False,
+    "incremental": False,
+    "use_cache": True,
+    "cache_dir": None,
+    "compress_loops": False,
+    "minimize_states": False,
+}
+
+
+class ServerError(Exception):
+    """
+    An error response from the server, with its JSON-RPC code and data.
+    """
+
+    def __init__(self, message, code=BUILD_FAILED, data=None):
+        Exception.__init__(self, message)
+        self.code = code
+        self.data = data
+
+
+# -----------------------------------------------------------------------------
+# @fn     default_socket
+# @brief  the path of the socket when none is given
+# @return path
+# -----------------------------------------------------------------------------
+def default_socket():
+    """
+    $WDL_SOCKET, or else a socket of this user's in $XDG_RUNTIME_DIR or
+    the temporary directory.
+    """
+    if os.environ.get("WDL_SOCKET"):
+        return os.path.expanduser(os.environ["WDL_SOCKET"])
+    directory = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(directory, "wdl-%d.sock" % os.getuid())
+
+
+# -----------------------------------------------------------------------------
+#
+#               BuildServer
+#
+# -----------------------------------------------------------------------------
+class BuildServer(object):
+    """
+    Answers requests, one at a time: the build stages keep module-level
+    state, so builds cannot overlap.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(self, cache_dir=None):
+        """
+        cache_dir is the directory of the stage cache for builds that do
+        not name their own.
+        """
+        self.cache_dir = cache_dir
+        self.caches = {}
+        self.running = False
+        # import the stages now, numpy and all, not on the first request
+        from . import build, wavgen  # noqa: F401
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def cache(self, directory):
+        """
+        The BuildCache in directory, kept across requests.
+        """
+        from .cache import BuildCache
+
+        directory = directory or self.cache_dir
+        if directory not in self.caches:
+            self.caches[directory] = BuildCache(directory)
+        return self.caches[directory]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def build(self, params):
+        """
+        Build a project, and return the path of its ACF and the output.
+        """
+        from .build import PROJECT_ERRORS, ProjectBuild, captured_output
+
+        unknown = set(params) - set(BUILD_PARAMS)
+        if unknown or not params.get("name"):
+            raise ServerError(
+                "build needs a name, and takes only %s" % ", ".join(BUILD_PARAMS),
+                INVALID_PARAMS,
+            )
+        args = dict(BUILD_PARAMS, **params)
+        cache = self.cache(args["cache_dir"]) if args["use_cache"] else None
+
+        # what the stages print and log goes back to the client
+        output = io.StringIO()
+        try:
+            with captured_output(output):
+                project = ProjectBuild(
+                    args["name"],
+                    args["include_dirs"],
+                    cache=cache,
+                    incremental=args["incremental"],
+                    compress_loops=args["compress_loops"],
+                    minimize_states=args["minimize_states"],
+                )
+                project.run()
+                acffile = project.write(args["intermediates"])
+        except PROJECT_ERRORS + (OSError,) as e:
+            raise ServerError(
+                "build of %s failed: %s" % (args["name"], e),
+                data={"output": output.getvalue()},
+            )
+        except Exception as e:
+            # a bug rather than a bad project: keep the traceback here
+            logger.exception("build of %s failed", args["name"])
+            raise ServerError(
+                "build of %s failed: %s" % (args["name"], e),
+                data={"output": output.getvalue()},
+            )
+        return {"acf": acffile, "output": output.getvalue()}
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def handle(self, line):
+        """
+        Answer one line of JSON-RPC.  Returns the response, or None for a
+        notification.
+        """
+        from .cache import tool_version
+
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return self.__error(None, ServerError(str(e), PARSE_ERROR))
+        if not isinstance(request, dict) or "method" not in request:
+            return self.__error(None, ServerError("not a request", INVALID_REQUEST))
+        ident = request.get("id")
+        method = request["method"]
+        params = request.get("params") or {}
+        try:
+            if method == "ping":
+                result = {"pid": os.getpid(), "version": tool_version()}
+            elif method == "build":
+                result = self.build(params)
+            elif method == "shutdown":
+                self.running = False
+                result = None
+            else:
+                raise ServerError("no method %s" % method, METHOD_NOT_FOUND)
+        except ServerError as e:
+            return self.__error(ident, e)
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": ident, "result": result}
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __error(self, ident, error):
+        response = {"code": error.code, "message": str(error)}
+        if error.data is not None:
+            response["data"] = error.data
+        return {"jsonrpc": "2.0", "id": ident, "error": response}
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def serve_stream(self, infile, outfile):
+        """
+        Answer the requests read from infile, a line each, on outfile,
+        until the end of infile or a shutdown.
+        """
+        self.running = True
+        for line in infile:
+            if not line.strip():
+                continue
+            response = self.handle(line)
+            if response is not None:
+                outfile.write(json.dumps(response) + "\n")
+                outfile.flush()
+            if not self.running:
+                break
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def serve_socket(self, path=None):
+        """
+        Answer requests on a Unix domain socket at path until a shutdown.
+        """
+        path = path or default_socket()
+        if os.path.exists(path):
+            if running(path):
+                raise ServerError("a server is already running on %s" % path)
+            # left behind by a server that did not shut down
+            os.remove(path)
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                reader = io.TextIOWrapper(self.rfile, encoding="utf-8")
+                writer = io.TextIOWrapper(
+                    self.wfile, encoding="utf-8", write_through=True
+                )
+                server.serve_stream(reader, writer)
+
+        # only this user may connect
+        umask = os.umask(0o077)
+        try:
+            unix_server = socketserver.UnixStreamServer(path, Handler)
+        finally:
+            os.umask(umask)
+        logger.info("serving builds on %s", path)
+        self.running = True
+        try:
+            with unix_server:
+                while self.running:
+                    unix_server.handle_request()
+        finally:
+            os.remove(path)
+        logger.info("server on %s shut down", path)
+
+
+# -----------------------------------------------------------------------------
+# @fn     call
+# @brief  make one request of a running server
+# @param  method
+# @param  params, a dict
+# @param  path, of the socket
+# @return the result
+# -----------------------------------------------------------------------------
+def call(method, params=None, path=None, timeout=None):
+    """
+    Raises OSError if no server is running on path, and ServerError if the
+    server answers with an error.
+    """
+    request = {"jsonrpc": "2.0", "id": 1, "method": method}
+    if params is not None:
+        request["params"] = params
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or default_socket())
+        with sock.makefile("rw", encoding="utf-8") as stream:
+            stream.write(json.dumps(request) + "\n")
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise ServerError("the server closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        error = response["error"]
+        raise ServerError(error["message"], error["code"], error.get("data"))
+    return response["result"]
+
+
+# -----------------------------------------------------------------------------
+# @fn     running
+# @brief  whether a server is answering on a socket
+# @param  path, of the socket
+# @return bool
+# -----------------------------------------------------------------------------
+def running(path=None):
+    """ """
+    path = path or default_socket()
+    if not os.path.exists(path):
+        return False
+    try:
+        call("ping", path=path, timeout=1.0)
+    except (OSError, ValueError, ServerError):
+        return False
+    return True
@@ -0,0 +1,398 @@
+"""
+Run the timing script of an ACF without a controller.
+
+The script is read from the LINEn keys of an ACF as wavgen writes them:
+labels, and lines that enter a state and then do one of
+
+    STATE000(299)               hold a state, here for 299 periods
+    CALL Sec(5), CALL Sec(exptime)
+    if Expose CALL GrabFrame    (or if !Expose ...)
+    Expose--, Expose++
+    GOTO Main
+    RETURN Sec
+
+A line takes a period for its state, the periods of a held state, one
+for a parameter decrement or increment and the periods of the calls, as
+wavgen counts them.  The time of a label whose lines do not depend on the
+parameters, and the states it goes through, are worked out once, so that
+a readout of millions of periods is a few multiplications; the rest is
+run line by line with an explicit call stack.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import collections
+import re
+
+import numpy as np
+
+from .acf import AcfDocument
+
+PERIOD_NS = 10  # the Archon timing core runs at 100 MHz
+MAX_DEPTH = 1000  # the most nested calls, to stop a runaway recursion
+
+_LABEL = re.compile(r"^(\w+):$")
+_LINE = re.compile(r"^(\w+);\s*(.*)$")
+_HOLD = re.compile(r"^(\w+)(?:\((\d+)\))?$")
+_IF = re.compile(r"^if\s+(!?)(\w+)\s+(.+)$", re.IGNORECASE)
+_CALL = re.compile(r"^CALL\s+(\w+)(?:\((\w+)\))?$")
+_GOTO = re.compile(r"^GOTO\s+(\w+)$")
+_RETURN = re.compile(r"^RETURN(?:\s+\w+)?$")
+_STEP = re.compile(r"^(\w+)(--|\+\+)$")
+
+# the outcome of a run: the periods it took, the states it entered and the
+# periods each was held, as arrays, with the runs of one state joined, the
+# parameters at the end, and how it ended: "RETURN", "GOTO <label>" where
+# the script starts over as it was, or "limit"
+Run = collections.namedtuple("Run", "periods states counts parameters end")
+
+
+class SimulationError(Exception):
+    """
+    A script that cannot be run, or a run that asks for what is not in it.
+    """
+
+
+# -----------------------------------------------------------------------------
+# @fn     join_runs
+# @brief  join the consecutive runs of one state
+# @param  states, counts, arrays of the state of each run and its periods
+# @return (states, counts)
+# -----------------------------------------------------------------------------
+def join_runs(states, counts):
+    """ """
+    keep = counts > 0
+    (states, counts) = (states[keep], counts[keep])
+    if len(states) == 0:
+        return (states, counts)
+    starts = np.flatnonzero(np.hstack(([True], states[1:] != states[:-1])))
+    return (states[starts], np.add.reduceat(counts, starts))
+
+
+# -----------------------------------------------------------------------------
+#
+#               Simulator
+#
+# -----------------------------------------------------------------------------
+class Simulator(object):
+    """
+    The timing script of an ACF, ready to run.  Each line is kept as a
+    tuple of operations: ("STATE", state, periods), ("CALL", label, count),
+    where count is a number or a parameter name, ("GOTO", label),
+    ("RETURN",), ("STEP", parameter, +1 or -1) and ("IF", negate,
+    parameter, operation).
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(self, document):
+        """
+        document is the AcfDocument of the ACF.
+        """
+        self.state_names = [state.get("NAME", "") for state in document.states]
+        self.parameters = collections.OrderedDict(
+            (name, int(value)) for name, value in document.parameters.items()
+        )
+        ids = {name: ii for ii, name in enumerate(self.state_names)}
+        self.labels = {}
+        self.lines = []
+        for text in document.lines:
+            text = text.split("#")[0].strip()
+            m = _LABEL.match(text)
+            if m is not None:
+                self.labels[m.group(1)] = len(self.lines)
+                continue
+            self.lines.append(self.__parse(text, ids))
+        for line in self.lines:
+            for op in line:
+                op = op[3] if op[0] == "IF" else op
+                if op[0] in ("CALL", "GOTO") and op[1] not in self.labels:
+                    raise SimulationError("no label %s in the script" % op[1])
+        self.__fixed = {}  # label -> periods, or None if it depends on parameters
+        self.__runs = {}  # label -> (states, counts) of a fixed label
+        for label in self.labels:
+            self.__resolve(label)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    @classmethod
+    def read(cls, path):
+        """
+        Return the Simulator of the ACF at path.
+        """
+        return cls(AcfDocument.read(path))
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __parse(self, text, ids):
+        """
+        The operations of the script line text.
+        """
+
+        def state(name):
+            if name not in ids:
+                raise SimulationError("no state %s in: %s" % (name, text))
+            return ids[name]
+
+        def command(rest):
+            m = _IF.match(rest)
+            if m is not None:
+                return ("IF", m.group(1) == "!", m.group(2), command(m.group(3)))
+            m = _CALL.match(rest)
+            if m is not None:
+                count = m.group(2) or "1"
+                return ("CALL", m.group(1), int(count) if count.isdigit() else count)
+            m = _GOTO.match(rest)
+            if m is not None:
+                return ("GOTO", m.group(1))
+            if _RETURN.match(rest):
+                return ("RETURN",)
+            m = _STEP.match(rest)
+            if m is not None:
+                return ("STEP", m.group(1), 1 if m.group(2) == "++" else -1)
+            m = _HOLD.match(rest)
+            if m is not None and m.group(1) in ids:
+                return ("STATE", state(m.group(1)), int(m.group(2) or 1))
+            raise SimulationError("cannot read the script line: %s" % text)
+
+        m = _LINE.match(text)
+        if m is None:
+            raise SimulationError("cannot read the script line: %s" % text)
+        line = [("STATE", state(m.group(1)), 1)]
+        if m.group(2) != "":
+            line.append(command(m.group(2)))
+        return tuple(line)
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __body(self, label):
+        """
+        The lines run from label to its RETURN, or None if they depend on
+        the parameters or GOTO elsewhere.
+        """
+        body = []
+        pc = self.labels[label]
+        while True:
+            if pc >= len(self.lines):
+                raise SimulationError("%s runs past the end of the script" % label)
+            line = self.lines[pc]
+            for op in line:
+                if op[0] in ("IF", "STEP", "GOTO"):
+                    return None
+                if op[0] == "CALL" and not isinstance(op[2], int):
+                    return None
+            body.append(line)
+            if line[-1][0] == "RETURN":
+                return body
+            pc += 1
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __resolve(self, label):
+        """
+        Work out the periods and the runs of states of label, and of the
+        labels it calls first, if they do not depend on the parameters.
+        """
+        stack = [label]
+        while stack:
+            name = stack[-1]
+            if name in self.__fixed:
+                stack.pop()
+                continue
+            body = self.__body(name)
+            callees = []
+            if body is not None:
+                callees = [op[1] for line in body for op in line if op[0] == "CALL"]
+            todo = [callee for callee in callees if callee not in self.__fixed]
+            if body is None or any(callee in stack for callee in todo):
+                # a label that calls itself never returns the same way twice
+                self.__fixed[name] = None
+                stack.pop()
+            elif todo:
+                stack.append(todo[0])
+            elif any(self.__fixed[callee] is None for callee in callees):
+                self.__fixed[name] = None
+                stack.pop()
+            else:
+                (states, counts) = ([], [])
+                for line in body:
+                    for op in line:
+                        if op[0] == "STATE":
+                            states.append(np.array([op[1]]))
+                            counts.append(np.array([op[2]]))
+                        elif op[0] == "CALL":
+                            runs = self.__runs[op[1]]
+                            states.append(np.tile(runs[0], op[2]))
+                            counts.append(np.tile(runs[1], op[2]))
+                runs = join_runs(np.hstack(states), np.hstack(counts))
+                self.__runs[name] = runs
+                self.__fixed[name] = int(np.sum(runs[1]))
+                stack.pop()
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def periods(self, label):
+        """
+        The periods label takes, or None if that depends on the parameters.
+        """
+        if label not in self.labels:
+            raise SimulationError("no label %s in the script" % label)
+        return self.__fixed[label]
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def run(self, label, parameters=None, limit=None, timeline=True):
+        """
+        Run the script from label until it returns, or until a GOTO would
+        start it over in the state it was in before, or for limit periods.
+        parameters is a dict of the parameters to set first; the others have
+        the values in the ACF.  Returns a Run, with empty states and counts
+        unless timeline.
+        """
+        if label not in self.labels:
+            raise SimulationError("no label %s in the script" % label)
+        values = collections.OrderedDict(self.parameters)
+        for name, value in (parameters or {}).items():
+            if name not in values:
+                raise SimulationError("no parameter %s in the ACF" % name)
+            values[name] = int(value)
+
+        def parameter(name):
+            if name not in values:
+                raise SimulationError("no parameter %s in the ACF" % name)
+            return values[name]
+
+        # the runs of states so far, the last few as lists
+        (chunks, states, counts) = ([], [], [])
+        periods = 0
+        # each frame is [next line, first line, repeats left] of a call
+        start = self.labels[label]
+        stack = [[start, start, 0]]
+        seen = {((tuple(stack[0]),), tuple(values.values()))}
+        end = "RETURN"
+        while stack:
+            if limit is not None and periods >= limit:
+                end = "limit"
+                break
+            frame = stack[-1]
+            if frame[0] >= len(self.lines):
+                raise SimulationError("%s runs past the end of the script" % label)
+            line = self.lines[frame[0]]
+            frame[0] += 1
+            for op in line:
+                if op[0] == "IF":
+                    if (parameter(op[2]) != 0) == op[1]:
+                        continue
+                    op = op[3]
+                kind = op[0]
+                if kind == "STATE":
+                    periods += op[2]
+                    states.append(op[1])
+                    counts.append(op[2])
+                elif kind == "STEP":
+                    values[op[1]] = parameter(op[1]) + op[2]
+                    # the line holds its state for a period more
+                    periods += 1
+                    states.append(line[0][1])
+                    counts.append(1)
+                elif kind == "CALL":
+                    count = op[2] if isinstance(op[2], int) else parameter(op[2])
+                    if count <= 0:
+                        continue
+                    if self.__fixed[op[1]] is not None:
+                        periods += count * self.__fixed[op[1]]
+                        if timeline:
+                            chunks.append((np.array(states), np.array(counts)))
+                            (states, counts) = ([], [])
+                            runs = self.__runs[op[1]]
+                            chunks.append(
+                                (np.tile(runs[0], count), np.tile(runs[1], count))
+                            )
+                    else:
+                        if len(stack) >= MAX_DEPTH:
+                            raise SimulationError(
+                                "calls nested more than %d deep" % MAX_DEPTH
+                            )
+                        first = self.labels[op[1]]
+                        stack.append([first, first, count - 1])
+                elif kind == "GOTO":
+                    frame[0] = self.labels[op[1]]
+                    # the script is deterministic: back where it was, it
+                    # would go round this loop for ever
+                    key = (
+                        tuple(tuple(f) for f in stack),
+                        tuple(values.values()),
+                    )
+                    if key in seen:
+                        end = "GOTO %s" % op[1]
+                        stack = []
+                    seen.add(key)
+                elif kind == "RETURN":
+                    if frame[2] > 0:
+                        frame[2] -= 1
+                        frame[0] = frame[1]
+                    else:
+                        stack.pop()
+            if not timeline:
+                (states, counts) = ([], [])
+
+        if timeline:
+            chunks.append((np.array(states), np.array(counts)))
+            run_states = np.hstack([chunk[0] for chunk in chunks]).astype(int)
+            run_counts = np.hstack([chunk[1] for chunk in chunks]).astype(np.int64)
+            (run_states, run_counts) = join_runs(run_states, run_counts)
+        else:
+            (run_states, run_counts) = (np.zeros(0, int), np.zeros(0, np.int64))
+        if limit is not None and periods > limit:
+            # the last call went past the limit
+            end = "limit"
+            periods = limit
+            if timeline:
+                total = np.cumsum(run_counts)
+                last = np.searchsorted(total, limit)
+                run_states = run_states[: last + 1]
+                run_counts = run_counts[: last + 1]
+                run_counts[-1] -= total[last] - limit
+        return Run(periods, run_states, run_counts, dict(values), end)
+
+
+# -----------------------------------------------------------------------------
+# @fn     simulate
+# @brief  run the timing script of an ACF from a label
+# @param  acf, an AcfDocument or the path of an ACF
+# @param  label, where to start
+# @param  parameters, dict of parameter values to run with
+# @return Run
+# -----------------------------------------------------------------------------
+def simulate(acf, label, parameters=None, limit=None, timeline=True):
+    """ """
+    if not isinstance(acf, AcfDocument):
+        acf = AcfDocument.read(acf)
+    return Simulator(acf).run(label, parameters, limit, timeline)
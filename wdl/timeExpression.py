@@ -0,0 +1,259 @@
+"""
+Evaluator for the time expressions that start each line of a WAVEFORM.
+
+The parser hands over the run of token texts in front of the ":" with the
+time labels (and the last evaluated time, for ".+") left as variable slots.
+The run is compiled once into a small expression tree, with every sub-
+expression that does not depend on a variable folded to a constant, so that
+the repeated expansions of GPP #defines such as *(clockfreq/1000000) cost
+nothing after the first line that uses them.  Compiled expressions are
+memoized on the token run.
+
+The arithmetic is Python arithmetic on the text that the tokens spell out:
+numbers, unary and binary + -, * / // % and ** with Python's precedence,
+and parentheses.  Nothing else is accepted, unlike eval().
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import operator
+import re
+from functools import lru_cache
+
+# marks a variable slot in the text of a time expression
+VARIABLE = "$"
+
+_TOKEN = re.compile(
+    r"""
+    (?P<number>[0-9]+\.?[0-9]*|\.[0-9]+)
+  | (?P<variable>\$)
+  | (?P<operator>\*\*|//|[-+*/%()])
+  | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_BINARY = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": operator.pow,
+}
+
+_UNARY = {
+    "+": operator.pos,
+    "-": operator.neg,
+}
+
+
+class TimeExpressionError(Exception):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# @fn     evaluate
+# @brief  evaluate a waveform time expression
+# @param  terms, tuple of token texts, None marks a variable slot
+# @param  values, the values of the variable slots, in order
+# @return the time, as an int (truncated like int())
+# -----------------------------------------------------------------------------
+def evaluate(terms, values=()):
+    """
+    Evaluate the time expression spelled out by the token texts in 'terms',
+    where each None is a variable slot whose value is taken, in order, from
+    'values'.  The result is truncated to an int.
+    """
+    expression = None
+    if all(type(value) is int and value >= 0 for value in values):
+        expression = _compile_terms(terms)
+    if expression is None:
+        # A variable whose text would not stand alone as a number (a negative
+        # value, or one written right next to a number) changes how the text
+        # reads, so evaluate the text itself, as eval() would have.
+        values = iter(values)
+        text = "".join(str(next(values)) if term is None else term for term in terms)
+        expression = compile_text(text)
+        values = ()
+    try:
+        return int(expression(values))
+    except (ArithmeticError, ValueError) as e:
+        raise TimeExpressionError("cannot evaluate time expression: " + str(e))
+
+
+# -----------------------------------------------------------------------------
+# @fn     _compile_terms
+# @brief  compile a run of token texts with variable slots
+# @param  terms
+# @return expression, or None if a variable is not a self-contained operand
+# -----------------------------------------------------------------------------
+@lru_cache(maxsize=4096)
+def _compile_terms(terms):
+    """ """
+    text = "".join(VARIABLE if term is None else term for term in terms)
+    for match in re.finditer(re.escape(VARIABLE), text):
+        before = text[match.start() - 1 : match.start()]
+        after = text[match.end() : match.end() + 1]
+        if (before and before in "0123456789." + VARIABLE) or (
+            after and after in "0123456789." + VARIABLE
+        ):
+            return None
+    return compile_text(text)
+
+
+# -----------------------------------------------------------------------------
+# @fn     compile_text
+# @brief  compile the text of a time expression
+# @param  text
+# @return expression, a function of the tuple of variable values
+# -----------------------------------------------------------------------------
+@lru_cache(maxsize=4096)
+def compile_text(text):
+    """
+    Compile the text of a time expression (with VARIABLE marking variable
+    slots) into a function of the tuple of variable values.
+    """
+    return _Compiler(text).compile()
+
+
+# -----------------------------------------------------------------------------
+#
+#               _Compiler
+#
+# -----------------------------------------------------------------------------
+class _Compiler:
+    """
+    Recursive descent compiler following Python's grammar for arithmetic:
+
+        expr   : term (('+' | '-') term)*
+        term   : factor (('*' | '/' | '//' | '%') factor)*
+        factor : ('+' | '-') factor | power
+        power  : atom ['**' factor]
+        atom   : number | variable | '(' expr ')'
+
+    Each rule returns a node, either ("const", value) or ("var", function of
+    the variable values).  Nodes made only of constants are folded.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        for match in _TOKEN.finditer(text):
+            kind = match.lastgroup
+            if kind == "other":
+                self.fail("unexpected " + repr(match.group()))
+            self.tokens.append((kind, match.group()))
+        self.position = 0
+        self.variables = 0
+
+    def fail(self, msg):
+        raise TimeExpressionError(
+            "cannot evaluate time expression " + repr(self.text) + ": " + msg
+        )
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def compile(self):
+        node = self.expr()
+        if self.position < len(self.tokens):
+            self.fail("unexpected " + repr(self.peek()[1]))
+        kind, value = node
+        if kind == "const":
+            return lambda values: value
+        return value
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in (("operator", "+"), ("operator", "-")):
+            node = self.binary(self.next()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek()[0] == "operator" and self.peek()[1] in ("*", "/", "//", "%"):
+            node = self.binary(self.next()[1], node, self.factor())
+        return node
+
+    def factor(self):
+        if self.peek() in (("operator", "+"), ("operator", "-")):
+            function = _UNARY[self.next()[1]]
+            kind, operand = self.factor()
+            if kind == "const":
+                return ("const", self.fold(function, operand))
+            return ("var", lambda values: function(operand(values)))
+        return self.power()
+
+    def power(self):
+        node = self.atom()
+        if self.peek() == ("operator", "**"):
+            self.next()
+            node = self.binary("**", node, self.factor())
+        return node
+
+    def atom(self):
+        kind, text = self.next()
+        if kind == "number":
+            if "." in text:
+                return ("const", float(text))
+            if len(text) > 1 and text[0] == "0" and text.strip("0"):
+                self.fail("leading zeros in " + repr(text))
+            return ("const", int(text))
+        if kind == "variable":
+            index = self.variables
+            self.variables += 1
+            return ("var", operator.itemgetter(index))
+        if (kind, text) == ("operator", "("):
+            node = self.expr()
+            if self.next() != ("operator", ")"):
+                self.fail("missing ')'")
+            return node
+        if kind is None:
+            self.fail("unexpected end")
+        self.fail("unexpected " + repr(text))
+
+    def binary(self, symbol, left, right):
+        function = _BINARY[symbol]
+        (lkind, lvalue), (rkind, rvalue) = left, right
+        if lkind == "const" and rkind == "const":
+            return ("const", self.fold(function, lvalue, rvalue))
+        if lkind == "const":
+            return ("var", lambda values: function(lvalue, rvalue(values)))
+        if rkind == "const":
+            return ("var", lambda values: function(lvalue(values), rvalue))
+        return ("var", lambda values: function(lvalue(values), rvalue(values)))
+
+    def fold(self, function, *operands):
+        try:
+            return function(*operands)
+        except (ArithmeticError, ValueError) as e:
+            self.fail(str(e))
@@ -0,0 +1,193 @@
+"""
+Rebuild a project whenever one of its sources changes.
+
+The files watched are those the last build read: the .conf and every file
+in the closure of its includes, as recorded in the dependency manifest of
+an incremental build, so only the stages that read a changed file run
+again.  Files are polled with os.stat, which needs no inotify or other
+service; a burst of saves is waited out before the rebuild starts.
+"""
+
+# Copyright (C) <2018> California Institute of Technology
+# Software written by: <Dave Hale and Peter Mao>
+#
+#     This program is part of the Waveform Definition Language (WDL) developed
+#     for ZTF.  This program is free software: you can redistribute it and/or
+#     modify it under the terms of the GNU General Public License as published
+#     by the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     Please see the GNU General Public License at:
+#     <http://www.gnu.org/licenses/>.
+#
+#     Report any bugs or suggested improvements to:
+#
+#     David Hale <dhale@caltech.edu> or
+#     Stephen Kaye <skaye@caltech.edu>
+
+import os
+import re
+import time
+
+from .build import ProjectBuild
+
+# seconds between polls, and that the files must be still before a rebuild
+POLL_INTERVAL = 0.5
+DEBOUNCE = 0.3
+
+
+# -----------------------------------------------------------------------------
+# @fn     snapshot
+# @brief  the modification times and sizes of files
+# @param  paths
+# @return dict of path -> (mtime_ns, size), or None for a missing file
+# -----------------------------------------------------------------------------
+def snapshot(paths):
+    """ """
+    states = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            states[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            states[path] = None
+    return states
+
+
+# -----------------------------------------------------------------------------
+# @fn     acf_counts
+# @brief  the number of states and of script lines in an ACF
+# @param  acf, the text of the ACF
+# @return (states, lines), either None if the ACF does not have it
+# -----------------------------------------------------------------------------
+def acf_counts(acf):
+    """ """
+    counts = []
+    for key in ("STATES", "LINES"):
+        m = re.search(r"^%s=(\d+)$" % key, acf, re.MULTILINE)
+        counts.append(int(m.group(1)) if m else None)
+    return tuple(counts)
+
+
+# -----------------------------------------------------------------------------
+#
+#               Watcher
+#
+# -----------------------------------------------------------------------------
+class Watcher(object):
+    """
+    Builds a project incrementally, then waits for a source to change and
+    builds it again, until interrupted.  The arguments of ProjectBuild are
+    given as keywords.
+    """
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def __init__(
+        self,
+        name,
+        intermediates=False,
+        interval=POLL_INTERVAL,
+        debounce=DEBOUNCE,
+        **kwargs
+    ):
+        """ """
+        self.name = name
+        self.intermediates = intermediates
+        self.interval = interval
+        self.debounce = debounce
+        self.kwargs = dict(kwargs, incremental=True)
+        self.watched = set()
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def build(self):
+        """
+        Build once and report on it.  Returns True if the build succeeded.
+        """
+        project = ProjectBuild(self.name, **self.kwargs)
+        start = time.perf_counter()
+        try:
+            project.run()
+            acffile = project.write(self.intermediates)
+        except Exception as e:
+            # keep watching: the next save may fix it
+            print("%s build failed: %s" % (time.strftime("%H:%M:%S"), e))
+            ok = False
+        else:
+            states, lines = acf_counts(project.acf)
+            print(
+                "%s wrote %s in %.1f ms: %s states, %s script lines"
+                % (
+                    time.strftime("%H:%M:%S"),
+                    acffile,
+                    1000 * (time.perf_counter() - start),
+                    states,
+                    lines,
+                )
+            )
+            ok = True
+        for stage, seconds in project.timings.items():
+            note = "  up to date" if stage in project.up_to_date else ""
+            print("    %-10s %8.1f ms%s" % (stage, 1000 * seconds, note))
+
+        # watch what this build read, and what the last one read for the
+        # stages that failed before they got that far
+        outputs = set()
+        for made in project.outputs.values():
+            outputs.update(path for path, _ in made.values())
+        watched = {project.path(project.name + ".conf")}
+        watched.update(project.conf_reads)
+        for inputs in project.inputs.values():
+            watched.update(inputs)
+        if not ok:
+            watched.update(self.watched)
+        self.watched = watched - outputs
+        return ok
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def wait(self):
+        """
+        Wait for a watched file to change and stay unchanged for debounce
+        seconds.  Returns the paths that changed.
+        """
+        before = snapshot(self.watched)
+        while True:
+            time.sleep(self.interval)
+            now = snapshot(self.watched)
+            if now != before:
+                break
+        # wait out a burst of saves
+        while True:
+            time.sleep(self.debounce)
+            settled = snapshot(self.watched)
+            if settled == now:
+                break
+            now = settled
+        return sorted(path for path in now if now[path] != before[path])
+
+    # -------------------------------------------------------------------------
+    #
+    # -------------------------------------------------------------------------
+    def run(self):
+        """
+        Build, and build again on every change, until interrupted.
+        """
+        try:
+            self.build()
+            while True:
+                print("watching %d files, ^C to stop" % len(self.watched))
+                changed = self.wait()
+                print("changed: " + ", ".join(os.path.basename(p) for p in changed))
+                self.build()
+        except KeyboardInterrupt:
+            pass
@@ -23,12 +23,13 @@
 import numpy as np
 
 # import matplotlib.mlab as mlab
-import matplotlib.pyplot as plt
-import scipy.sparse as sparse  # need 0.18.1
+# matplotlib.pyplot is imported by the plotting functions, when they are used
 import re
 import sys
 import os
 import collections
+import io
+from array import array
 
 # from IPython.core.debugger import Tracer
 # from IPython.core.magic import register_line_magic
@@ -58,6 +59,8 @@ __chan_per_board__ = {
     "lvbd": 38,
 }  # 8 DIO's + 30 bias (like hvbd)
 UniqueStateArr = np.array([])
+__stateTable__ = None  # hash index of UniqueStateArr, see StateTable
+__layout__ = None  # slot/column lookup tables, see BoardLayout
 Catalog = []  # list of all TimingSegment objects
 Parameters = collections.OrderedDict()  # all the parameters
 Constants = collections.OrderedDict()  # all the constants
@@ -69,19 +72,84 @@ __constLevels__ = {}
 __SignalByName__ = {}
 __SignalByIndx__ = {}
 __seq_ID__ = 0
+# path -> text of mod and signal files given to loadWDL() in memory
+__sources__ = {}
 __TStypes__ = ("", "waveform", "sequence")
 GenerateFigs = False  # set to True to plot waveforms when loadWDL is called.
 __padmax__ = 25  # padding for comments in script
-
-
-def loadWDL(infile, outfile="/dev/null", verbose=1):
+# processes to find the states of the timing segments in, None for one per
+# CPU, and the number of events it takes for them to be worth starting
+Workers = None
+__parallel_events__ = 200000
+# set to True to fold repeats in the scripts into loops, see compress_script
+CompressLoops = False
+__loop_body_max__ = 64  # the most lines in the body of a loop
+__loops__ = {}  # body -> loop waveform, see compress_script
+__resolved__ = False  # True once the Catalog is resolved, see __resolve_timing__
+# set to True to merge the states that differ only where they leave a
+# channel at the level it already has, see __minimize_states__
+MinimizeStates = False
+
+
+def reset():
+    """forget the slots, timing segments, states, parameters, constants and
+    signals of the last loadWDL(), so another WDL file can be loaded"""
+    global UniqueStateArr
+    global __stateTable__
+    global __layout__
+    global __seq_ID__
+    global __padmax__
+    global __resolved__
+    for boardType in slot:
+        slot[boardType].clear()
+    slot["back"].append(0)
+    UniqueStateArr = np.array([])
+    __stateTable__ = None
+    __layout__ = None
+    Catalog.clear()
+    Parameters.clear()
+    Constants.clear()
+    __constLevels__.clear()
+    __SignalByName__.clear()
+    __SignalByIndx__.clear()
+    __sources__.clear()
+    __loops__.clear()
+    __seq_ID__ = 0
+    __padmax__ = 25
+    __resolved__ = False
+
+
+def __exists__(path):
+    """whether a mod or signal file exists, in memory or on disk"""
+    return path in __sources__ or os.path.isfile(path)
+
+
+def __open__(path):
+    """open a mod or signal file, in memory or on disk"""
+    if path in __sources__:
+        return io.StringIO(__sources__[path])
+    return open(path, "r")
+
+
+def loadWDL(
+    infile, outfile="/dev/null", verbose=1, text=None, curdir=None, sources=None
+):
     """Load a WDL compiled waveform, write ACF state and script files.
     Automatically generates plots for non-static signals in waveforms.
-    Use 'stdout' or sys.stdout to dump to terminal."""
+    Use 'stdout' or sys.stdout to dump to terminal, or give a (script,
+    states) pair of file names or handles.  If text is given, it is the
+    WDL source and infile only names it.  Relative mod and signal file
+    names are found in curdir (default: the working directory).  sources
+    is a dict of absolute path to text of mod or signal files to use
+    instead of the files on disk."""
     global slot
     global __chan_per_board__
     global Parameters
     global Constants
+    global __resolved__
+
+    # the segments loaded here are resolved anew
+    __resolved__ = False
 
     # user command and arguments for feedback
     usercommands = []
@@ -91,18 +159,29 @@ def loadWDL(infile, outfile="/dev/null", verbose=1):
     ModFile = "/home/user/wdl/demo.mod"
     __SignalFile__ = ""
 
+    def abspath(filename):
+        filename = os.path.expanduser(filename)
+        return os.path.abspath(os.path.join(curdir or os.getcwd(), filename))
+
+    __sources__.clear()
+    __sources__.update(sources or {})
+
     # read through file to find the mod file
-    infile = os.path.abspath(os.path.expanduser(infile))
+    infile = abspath(infile)
+    if text is None:
+        with open(infile, "r") as f:
+            text = f.read()
+    # read the lines as open() would, with universal newlines
+    lines = list(io.StringIO(text, newline=None))
     wdl_file_did_not_specify_mod_file = True
-    with open(infile, "r") as f:
-        for line in f:
-            # look for mod file
-            match = re.search(r"^modulefile\s+([~\w./]+)\s*$", line)
-            if match is not None:
-                ModFile = os.path.abspath(os.path.expanduser(match.group(1)))
-                wdl_file_did_not_specify_mod_file = False
-                break
-    if not os.path.isfile(ModFile):
+    for line in lines:
+        # look for mod file
+        match = re.search(r"^modulefile\s+([~\w./]+)\s*$", line)
+        if match is not None:
+            ModFile = abspath(match.group(1))
+            wdl_file_did_not_specify_mod_file = False
+            break
+    if not __exists__(ModFile):
         print("MOD file specified does not exist (%s)" % ModFile)
         print("Using existing slot definitions")
     else:
@@ -114,119 +193,109 @@ def loadWDL(infile, outfile="/dev/null", verbose=1):
         __loadMod__(ModFile)
 
     # global slot is now well-defined, read in the file again for WDL content.
-    with open(infile, "r") as f:
-        for line in f:
-            line = re.sub(r"#.*$", "", line)  # strip comments
-            line = re.sub(r"^\s*$", "", line)  # clear empty lines
-            if line == "":
-                continue
-            # look for mod file
-            match = re.search(r"^modulefile\s+([~\w./]+)\s*$", line)
-            if match is not None:
-                continue
-            # look for signal file
-            match = re.search(r"^signalfile\s+([~\w./]+)\s*$", line)
-            if match is not None:
-                __SignalFile__ = os.path.abspath(os.path.expanduser(match.group(1)))
-                if not os.path.isfile(__SignalFile__):
-                    print("Signal file specified does not exist (%s)" % __SignalFile__)
-                continue
-            # look for parameters
-            match = re.search(r"^parameter\s+(\w+)=(\d+)\s*$", line)
-            if match is not None:
-                pname = match.group(1)
-                pval = int(match.group(2))
-                Parameters.update({pname: pval})
-                continue
-            # look for constants
-            match = re.search(r"^constant\s+(\w+)\s*=\s*([+-]?\d+(?:\.\d*)?)\s*$", line)
-            if match is not None:
-                cname = match.group(1)
-                cval = float(match.group(2))
-                Constants.update({cname: cval})
-                continue
-            # look for a label
-            match = re.search(
-                r"^(sequence|waveform)" r"\s+(\w+)(\.(\w+)\((.*)\))?:\s*$", line
-            )
-            if match is not None:
-                # SEQUENCE HEADER:  acf label found, generate sequence object
-                TStype = match.group(1)
-                acfLabel = match.group(2)
-                pycmd = match.group(4)
-                pyargs = match.group(5)
-                if TStype == "sequence":
-                    thisTS = TimingSegment(acfLabel, TStype)
-                    ctr = 0
-                elif TStype == "waveform":
-                    thisTS = TimingSegment(acfLabel, TStype, endline=-1)
-                else:
-                    print("INVALID TimingSegment type: %s" % TStype)
-                    print(">> %s" % line)
-                if pycmd is not None:
-                    usercommands.append([eval("thisTS.%s" % pycmd), pyargs])
-            else:  # SEQUENCE BODY: line not matching code segment label/header
-                if TStype == "sequence":
-                    thisTS.sequenceDef.append([ctr, line[:-1]])
-                    ctr += 1
-                elif TStype == "waveform":
-                    match = re.search(
-                        r"(\d+)\s+(\d+)\s+(\d+)\s+([+-]?[\d.]+|[A-Za-z_]\w*)", line
-                    )
-                    if match is not None:
-                        # body of a waveform
-                        time = int(match.group(1))
-                        nslot = int(match.group(2))
-                        chan = int(match.group(3))  # this is the slot channel
-                        rawlevel = match.group(4)
-                        if re.match(r"^[+-]?[\d.]+$", rawlevel):
-                            value = float(rawlevel)
-                        else:
-                            # a const name used as the SET...TO level: give
-                            # it a unique placeholder (see __constLevels__)
-                            if rawlevel not in __constLevels__:
-                                placeholder = -1.0e18 - len(__constLevels__)
-                                __constLevels__[rawlevel] = placeholder
-                                __constLevels__[placeholder] = rawlevel
-                            value = __constLevels__[rawlevel]
-                        # get the key for the slot
-                        foundBoardType = False
-                        for board_type in slot:
-                            if nslot in slot[board_type]:
-                                foundBoardType = True
-                                if chan >= __chan_per_board__[board_type]:
-                                    print(
-                                        "*** INVALID channel (%d) for %s "
-                                        "(slot %d) in %s ***"
-                                        % (chan, board_type, nslot, f.name)
-                                    )
-                                    continue
-                                TSchan = (
-                                    __chan_per_board__[board_type]
-                                    * np.where(np.array(slot[board_type]) == nslot)[0][
-                                        0
-                                    ]
-                                    + chan
-                                )
-                                # uncomment below to debug waveform read-in
-                                # print '%s[%d]
-                                # <-- (%d,%g)'%(board_type,TSchan,time,value)
-                                thisTS.events[board_type][TSchan].append(
-                                    np.array((time, value))
-                                )
-                        if not foundBoardType:
-                            print(
-                                "*** [loadWDL error] Board type for slot "
-                                "%s unkown ***" % nslot
-                            )
+    layout = __board_layout__()
+    for line in lines:
+        line = re.sub(r"#.*$", "", line)  # strip comments
+        line = re.sub(r"^\s*$", "", line)  # clear empty lines
+        if line == "":
+            continue
+        # look for mod file
+        match = re.search(r"^modulefile\s+([~\w./]+)\s*$", line)
+        if match is not None:
+            continue
+        # look for signal file
+        match = re.search(r"^signalfile\s+([~\w./]+)\s*$", line)
+        if match is not None:
+            __SignalFile__ = abspath(match.group(1))
+            if not __exists__(__SignalFile__):
+                print("Signal file specified does not exist (%s)" % __SignalFile__)
+            continue
+        # look for parameters
+        match = re.search(r"^parameter\s+(\w+)=(\d+)\s*$", line)
+        if match is not None:
+            pname = match.group(1)
+            pval = int(match.group(2))
+            Parameters.update({pname: pval})
+            continue
+        # look for constants
+        match = re.search(r"^constant\s+(\w+)\s*=\s*([+-]?\d+(?:\.\d*)?)\s*$", line)
+        if match is not None:
+            cname = match.group(1)
+            cval = float(match.group(2))
+            Constants.update({cname: cval})
+            continue
+        # look for a label
+        match = re.search(
+            r"^(sequence|waveform)" r"\s+(\w+)(\.(\w+)\((.*)\))?:\s*$", line
+        )
+        if match is not None:
+            # SEQUENCE HEADER:  acf label found, generate sequence object
+            TStype = match.group(1)
+            acfLabel = match.group(2)
+            pycmd = match.group(4)
+            pyargs = match.group(5)
+            if TStype == "sequence":
+                thisTS = TimingSegment(acfLabel, TStype)
+                ctr = 0
+            elif TStype == "waveform":
+                thisTS = TimingSegment(acfLabel, TStype, endline=-1)
+            else:
+                print("INVALID TimingSegment type: %s" % TStype)
+                print(">> %s" % line)
+            if pycmd is not None:
+                usercommands.append([eval("thisTS.%s" % pycmd), pyargs])
+        else:  # SEQUENCE BODY: line not matching code segment label/header
+            if TStype == "sequence":
+                thisTS.sequenceDef.append([ctr, line[:-1]])
+                ctr += 1
+            elif TStype == "waveform":
+                match = re.search(
+                    r"(\d+)\s+(\d+)\s+(\d+)\s+([+-]?[\d.]+|[A-Za-z_]\w*)", line
+                )
+                if match is not None:
+                    # body of a waveform
+                    time = int(match.group(1))
+                    nslot = int(match.group(2))
+                    chan = int(match.group(3))  # this is the slot channel
+                    rawlevel = match.group(4)
+                    if re.match(r"^[+-]?[\d.]+$", rawlevel):
+                        value = float(rawlevel)
                     else:
-                        # handle the end line of a waveform.
-                        match = re.search(r"(\d+)\s+(\w+)", line)
-                        thisTS.nperiods = int(match.group(1))
-                        if thisTS.nperiods == 0:
-                            print(
-                                "WARNING: nperiods for %s %s is 0" % (TStype, acfLabel)
-                            )
+                        # a const name used as the SET...TO level: give
+                        # it a unique placeholder (see __constLevels__)
+                        if rawlevel not in __constLevels__:
+                            placeholder = -1.0e18 - len(__constLevels__)
+                            __constLevels__[rawlevel] = placeholder
+                            __constLevels__[placeholder] = rawlevel
+                        value = __constLevels__[rawlevel]
+                    # get the key for the slot
+                    board_type = layout.board_type(nslot)
+                    if board_type is None:
+                        print(
+                            "*** [loadWDL error] Board type for slot "
+                            "%s unkown ***" % nslot
+                        )
+                    elif chan >= __chan_per_board__[board_type]:
+                        print(
+                            "*** INVALID channel (%d) for %s "
+                            "(slot %d) in %s ***"
+                            % (chan, board_type, nslot, infile)
+                        )
+                    else:
+                        # uncomment below to debug waveform read-in
+                        # print('%s[%d:%d] <-- (%d,%g)'
+                        #       % (board_type, nslot, chan, time, value))
+                        thisTS.events.append(
+                            time, layout.level_index(nslot, chan), value
+                        )
+                else:
+                    # handle the end line of a waveform.
+                    match = re.search(r"(\d+)\s+(\w+)", line)
+                    thisTS.nperiods = int(match.group(1))
+                    if thisTS.nperiods == 0:
+                        print(
+                            "WARNING: nperiods for %s %s is 0" % (TStype, acfLabel)
+                        )
     if verbose > 0:
         print("Loading signal mnemonics from %s" % __SignalFile__)
     __loadSignals__(__SignalFile__)
@@ -241,6 +310,10 @@ def loadWDL(infile, outfile="/dev/null", verbose=1):
     elif outfile == "stdout" or outfile == sys.stdout:
         ok = script()
         state()
+    elif type(outfile) is tuple:
+        scriptfile, statesfile = outfile
+        ok = script(scriptfile)
+        state(statesfile)
     else:
         ok = script(outfile + ".script")
         if ok:
@@ -279,7 +352,7 @@ def __loadMod__(ModFile):  # subroutine of loadWDL()
     }
     # slotnum = []
     # btype = []
-    with open(ModFile, "r") as f:
+    with __open__(ModFile) as f:
         for line in f:
             match = re.search(r"^\s*SLOT\s+(\d+)\s+(\w+)\s{", line)
             if match is not None:
@@ -301,61 +374,48 @@ def __loadMod__(ModFile):  # subroutine of loadWDL()
                         "*** Unrecognized board type (%s) in %s"
                         % (thisBoardLabel, ModFile)
                     )
+    global __layout__
+    __layout__ = BoardLayout(slot, __chan_per_board__)
     return
 
+def __board_layout__():
+    """returns the BoardLayout of the current slot definitions.  It is built
+    by __loadMod__() and only rebuilt if slot has been changed since."""
+    global __layout__
+    if __layout__ is None or not __layout__.describes(slot, __chan_per_board__):
+        __layout__ = BoardLayout(slot, __chan_per_board__)
+    return __layout__
+
 # subroutine of __loadSignals__()
 def __get_level_index_from_chan_slot__(slotnum, channel):
     """given slot and channel,
     returns corresponding the level|change column index"""
-    global slot
-    global __boardTypes__
-    # isDrvr = False
+    layout = __board_layout__()
     # 1. determine board type from slot
-    for boardname in slot:
-        if slotnum in slot[boardname]:
-            # 1. check that channel is valid for board type.
-            if channel >= __chan_per_board__[boardname]:
-                print(
-                    "*** INVALID channel (%d) specified for slot "
-                    "(%d,%s) ***" % (channel, slotnum, boardname)
-                )
-                return -1
-            # 2. determine index in global slot for board type (0 for
-            # the first board of that type, etc.)
-            indx_slot = np.where(np.array(slot[boardname]) == slotnum)[0][0]
-            # 3. calculate the base index (boardname index * slot index)
-            signalPartitions = np.cumsum(
-                [
-                    0,
-                    # !driver-speed-keep
-                    __chan_per_board__["drvr"] * len(slot["drvr"]),
-                    __chan_per_board__["lvds"] * len(slot["lvds"]),
-                    __chan_per_board__["htr"] * len(slot["htr"]),
-                    __chan_per_board__["xvbd"] * len(slot["xvbd"]),
-                    __chan_per_board__["adc"] * len(slot["adc"]),
-                    __chan_per_board__["back"] * len(slot["back"]),
-                    __chan_per_board__["hvbd"] * len(slot["hvbd"]),
-                    __chan_per_board__["lvbd"] * len(slot["lvbd"]),
-                ]
-            )
-            indx_LVL_boardname = np.where(np.array(__boardTypes__) == boardname)[0][0]
-            indx_base = (
-                signalPartitions[indx_LVL_boardname]
-                + indx_slot * __chan_per_board__[boardname]
-            )
-            # 4. add the channel offset
-            return indx_base + channel
+    boardname = layout.board_type(slotnum)
+    if boardname is None:
+        print("*** No board in slot %d ***" % slotnum)
+        return -1
+    # 2. check that channel is valid for board type.
+    if channel >= __chan_per_board__[boardname]:
+        print(
+            "*** INVALID channel (%d) specified for slot "
+            "(%d,%s) ***" % (channel, slotnum, boardname)
+        )
+        return -1
+    # 3. base index of the board plus the channel offset
+    return layout.level_index(slotnum, channel)
 
 def __loadSignals__(__SignalFile__):  # subroutine of loadWDL()
     """load the signals file"""
-    global __boardTypes__
     # global __SignalbyName__
     # global __SignalbyIndx__
+    layout = __board_layout__()
 
-    if not os.path.isfile(__SignalFile__):
+    if not __exists__(__SignalFile__):
         print("Signal file specified does not exist (%s)..." % __SignalFile__)
         return False
-    with open(__SignalFile__, "r") as f:
+    with __open__(__SignalFile__) as f:
         for line in f:
             # look for signal file
             match = re.search(r"^#define (\w+)\s+(\d+)\s+:\s+(\d+)", line)
@@ -363,13 +423,14 @@ def __loadSignals__(__SignalFile__):  # subroutine of loadWDL()
                 signame = match.group(1)
                 sigslot = int(match.group(2))
                 sigchan = int(match.group(3)) - 1
-                if sigslot in slot["drvr"]:
+                isDrvr = layout.board_type(sigslot) == "drvr"
+                if isDrvr:
                     sigchan *= 2
                 LVLindx = __get_level_index_from_chan_slot__(sigslot, sigchan)
                 if LVLindx >= 0:
                     __SignalByIndx__.update({LVLindx: signame})
                     __SignalByName__.update({signame: LVLindx})
-                    if sigslot in slot["drvr"]:
+                    if isDrvr:
                         FASTindx = LVLindx + 1
                         fastname = signame + "_fast"
                         __SignalByIndx__.update({FASTindx: fastname})
@@ -382,39 +443,16 @@ def __loadSignals__(__SignalFile__):  # subroutine of loadWDL()
 def __get_slot_chan_from_level_index__(levelColumnIndex):
     """Given the column index in the level subset (even columns) of the
     UniqueStateArr, return the slot and channel number."""
-    global slot
-    global __boardTypes__
-
-    # Cumulative sum of signal partitions based on board types
-    signalPartitions = np.cumsum(
-        [
-            0,
-            __chan_per_board__["drvr"] * len(slot["drvr"]),  # !driver-speed-keep
-            __chan_per_board__["lvds"] * len(slot["lvds"]),
-            __chan_per_board__["htr"] * len(slot["htr"]),
-            __chan_per_board__["xvbd"] * len(slot["xvbd"]),
-            __chan_per_board__["adc"] * len(slot["adc"]),
-            __chan_per_board__["back"] * len(slot["back"]),
-            __chan_per_board__["hvbd"] * len(slot["hvbd"]),
-            __chan_per_board__["lvbd"] * len(slot["lvbd"]),
-        ]
-    )
-
-    # Find the board index (bn) corresponding to the given levelColumnIndex
-    # We need to ensure bn is a scalar, so use [-1] to get the last valid index
-    bn = np.where(levelColumnIndex >= signalPartitions)[-1][-1]
-
-    # Get the board name using the board index (bn)
-    boardname = __boardTypes__[bn]
-
-    # Compute the raw index within the board partition
-    rawindex = levelColumnIndex - signalPartitions[bn]
+    return __board_layout__().slot_chan(levelColumnIndex)
 
-    # Calculate the channel and slot within the board
-    thisChan = np.mod(rawindex, __chan_per_board__[boardname])
-    thisSlot = slot[boardname][rawindex // __chan_per_board__[boardname]]
 
-    return thisSlot, thisChan, boardname
+def __catalog_index__():
+    """returns a dictionary from the name of each timing segment in Catalog
+    to its index"""
+    index = {}
+    for jj in range(len(Catalog)):
+        index.setdefault(Catalog[jj].name, jj)
+    return index
 
 
 def __index_of__(Name):  # access Catalog elements by name instead of index
@@ -425,6 +463,613 @@ def __index_of__(Name):  # access Catalog elements by name instead of index
     return np.where(CatalogNames == Name)[0][0]
 
 
+class BoardLayout(object):
+    """Lookup tables between the slots of the backplane and the level columns
+    of the state arrays (the even columns of UniqueStateArr, see
+    __make_states).  The level columns are partitioned by board type in
+    __boardTypes__ order, then by board in slot order, then by channel.
+
+    Built from slot and __chan_per_board__, so that finding the column of a
+    slot and channel, or the slot and channel of a column, is an array
+    lookup instead of a search through slot."""
+
+    def __init__(self, slot, chan_per_board):
+        self.key = self.__key(slot, chan_per_board)
+        self.chan_per_board = dict(chan_per_board)
+        nchans = [chan_per_board[bt] * len(slot[bt]) for bt in __boardTypes__]
+        # first level column of each board type, then the number of columns
+        self.partitions = np.cumsum([0] + nchans)
+        self.nchan = int(self.partitions[-1])
+
+        # slot number -> board type index (-1 for empty), board ordinal within
+        # its type and first level column.  The first board type listing a
+        # slot wins, like the search through slot did.
+        nslots = 1 + max([0] + [max(slot[bt]) for bt in __boardTypes__ if slot[bt]])
+        self.slot_board = np.full(nslots, -1, dtype=int)
+        self.slot_ordinal = np.zeros(nslots, dtype=int)
+        self.slot_base = np.zeros(nslots, dtype=int)
+        # level column -> slot number, channel and board type index
+        self.column_slot = np.zeros(self.nchan, dtype=int)
+        self.column_chan = np.zeros(self.nchan, dtype=int)
+        self.column_board = np.zeros(self.nchan, dtype=int)
+        self.__boards = {}
+        for bn, bt in enumerate(__boardTypes__):
+            self.__boards[bt] = []
+            for ordinal, slotnum in enumerate(slot[bt]):
+                base = self.partitions[bn] + ordinal * chan_per_board[bt]
+                self.__boards[bt].append((slotnum, int(base)))
+                if self.slot_board[slotnum] < 0:
+                    self.slot_board[slotnum] = bn
+                    self.slot_ordinal[slotnum] = ordinal
+                    self.slot_base[slotnum] = base
+                columns = slice(base, base + chan_per_board[bt])
+                self.column_slot[columns] = slotnum
+                self.column_chan[columns] = np.arange(chan_per_board[bt])
+                self.column_board[columns] = bn
+
+    @staticmethod
+    def __key(slot, chan_per_board):
+        return tuple(
+            (bt, tuple(slot[bt]), chan_per_board[bt]) for bt in __boardTypes__
+        )
+
+    def describes(self, slot, chan_per_board):
+        """True if this layout was built from these slot definitions"""
+        return self.key == self.__key(slot, chan_per_board)
+
+    def partition(self, board_type):
+        """first level column of the boards of board_type"""
+        return int(self.partitions[__boardTypes__.index(board_type)])
+
+    def boards(self, board_type):
+        """(slot number, first level column) of each board of board_type"""
+        return self.__boards[board_type]
+
+    def board_type(self, slotnum):
+        """board type in slot slotnum, or None if there is no board"""
+        if 0 <= slotnum < len(self.slot_board) and self.slot_board[slotnum] >= 0:
+            return __boardTypes__[self.slot_board[slotnum]]
+        return None
+
+    def level_index(self, slotnum, channel):
+        """level column of channel (counting from 0) of the board in slotnum"""
+        return int(self.slot_base[slotnum]) + channel
+
+    def slot_chan(self, column):
+        """slot number, channel (counting from 0) and board type of a level
+        column"""
+        return (
+            self.column_slot[column],
+            self.column_chan[column],
+            __boardTypes__[self.column_board[column]],
+        )
+
+
+class StateTable(object):
+    """Growable table of the unique states (the rows of UniqueStateArr) with
+    a hash index from the bytes of each row to its state ID.  Rows are stored
+    in an array whose capacity doubles as needed, so adding a state does not
+    copy the whole table, and finding a state is a dictionary lookup instead
+    of a comparison against every unique state."""
+
+    def __init__(self, states):
+        states = np.atleast_2d(np.asarray(states, dtype=float))
+        nstates, ncols = np.shape(states)
+        self.__rows = np.zeros((max(16, 2 * nstates), ncols))
+        self.__rows[:nstates, :] = states
+        self.__count = nstates
+        self.__index = {}
+        for ii in range(nstates):
+            self.__index.setdefault(self.key(states[ii]), ii)
+        self.states = self.__rows[: self.__count, :]
+
+    @staticmethod
+    def canonical(row):
+        """the state row with the levels of the channels it keeps, which the
+        Archon ignores, set to 0 (+0.0 folds -0.0 into 0.0)"""
+        row = np.array(row, dtype=float) + 0.0
+        row[0::2] = np.where(row[1::2] != 0, row[0::2], 0.0)
+        return row
+
+    @classmethod
+    def key(cls, row):
+        """canonical byte key of a state row"""
+        return cls.canonical(row).tobytes()
+
+    def find_or_add(self, row):
+        """return the state ID of row, adding it to the table if it is new"""
+        row = self.canonical(row)
+        key = row.tobytes()
+        state_ID = self.__index.get(key)
+        if state_ID is None:
+            if self.__count == np.size(self.__rows, 0):
+                rows = np.zeros((2 * self.__count, np.size(self.__rows, 1)))
+                rows[: self.__count, :] = self.__rows[: self.__count, :]
+                self.__rows = rows
+            state_ID = self.__count
+            self.__rows[state_ID, :] = row
+            self.__count += 1
+            self.__index[key] = state_ID
+            self.states = self.__rows[: self.__count, :]
+        return state_ID
+
+
+class EventStore(object):
+    """Columnar store of the events of a waveform: the time, the level column
+    index (see BoardLayout) and the value of every SET, in the order
+    they were read.  The columns are typed arrays that grow in place, so an
+    event costs three appends instead of a small numpy array of its own."""
+
+    def __init__(self):
+        self.time = array("q")
+        self.column = array("q")
+        self.value = array("d")
+
+    def __len__(self):
+        return len(self.time)
+
+    def append(self, time, column, value):
+        """add the event: column is set to value at time"""
+        self.time.append(time)
+        self.column.append(column)
+        self.value.append(value)
+
+    def arrays(self):
+        """return the (time, column, value) columns as numpy arrays"""
+        return (
+            np.frombuffer(self.time, dtype=np.int64),
+            np.frombuffer(self.column, dtype=np.int64),
+            np.frombuffer(self.value, dtype=float),
+        )
+
+
+def __segment_states__(time, chan, level, partitions):
+    """The states of one timing segment on its own, from the (time, column,
+    value) arrays of its events (see EventStore) and the partitions of the
+    level columns (see BoardLayout).  Returns the sorted periods with events,
+    the distinct rows of their states in the order they are first entered,
+    and the index into those of the row of each period.  It uses no global
+    state, so that the segments can be done in worker processes; merge_states
+    then numbers the rows in UniqueStateArr."""
+
+    n_chan = int(partitions[-1])
+    if len(time) == 0:
+        # if the levelchangematrix is all zeros
+        return (np.zeros(0, dtype=int), np.zeros((0, 2 * n_chan)), np.zeros(0, int))
+
+    # the first bit here is to handle multple entries in the waveform
+    # this takes the last value requested: the first occurrence of each
+    # (time, channel) pair in the reversed events.
+    keys = (time * n_chan + chan)[::-1]
+    uniq_j = len(keys) - np.unique(keys, return_index=True)[1] - 1
+    time = time[uniq_j]
+    chan = chan[uniq_j]
+    level = level[uniq_j]
+    # 0 <--> 1 for FAST flags (the odd driver channels)
+    fast = (chan < partitions[1]) & (np.mod(chan, 2) == 1)
+    level = np.where(fast, (level == 0).astype(float), level)
+
+    # GENERATE THE STATES #
+    # even columns are levels or slew rate switches, odd columns are CHANGE
+    # flags relative to Archon, I've inserted an extra change flag for
+    # driver to produce a more regular pattern
+    #
+    #   L1a K1a L2a K2a L3a K3a
+    #   L1b K1b L2b K2b L3b K3b
+    #   L1c K1c L2c K2c L3c K3c
+    #
+    # the rows of the periods with events: nevents X 2*nchannel
+    (times, row) = np.unique(time, return_inverse=True)
+    state_rows = np.zeros((len(times), 2 * n_chan))
+    state_rows[row, 2 * chan] = level
+    state_rows[row, 2 * chan + 1] = 1
+
+    # the distinct rows, compared as StateTable does (-0.0 is 0.0) but kept
+    # as first entered, in the order they are first entered
+    (_, first, inverse) = np.unique(
+        state_rows + 0.0, axis=0, return_index=True, return_inverse=True
+    )
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return (times, state_rows[first[order]], rank[np.ravel(inverse)])
+
+
+def __make_all_states__():
+    """Make the states of every timing segment in Catalog that has none yet.
+    The states of each segment are found on their own, in Workers processes
+    if there are enough events to be worth starting them, and are then
+    numbered in Catalog order, so the state IDs and the ACF do not depend on
+    the number of workers."""
+    todo = [TS for TS in Catalog if not hasattr(TS, "state_tt")]
+    partitions = __board_layout__().partitions
+    jobs = [TS.events.arrays() + (partitions,) for TS in todo]
+
+    local = None
+    workers = min(Workers or os.cpu_count() or 1, len(todo))
+    if workers > 1 and sum(len(TS.events) for TS in todo) >= __parallel_events__:
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            with ProcessPoolExecutor(workers) as pool:
+                chunksize = max(1, len(jobs) // (4 * workers))
+                local = list(
+                    pool.map(__segment_states__, *zip(*jobs), chunksize=chunksize)
+                )
+        except (OSError, BrokenProcessPool):
+            # no processes to be had here: do them all in this one
+            local = None
+    if local is None:
+        local = [__segment_states__(*job) for job in jobs]
+
+    for TS, states in zip(todo, local):
+        TS.merge_states(states)
+
+
+def __minimize_states__():
+    """Merge the states that differ only in channels that one of them sets
+    to the level the channel already has and the other keeps.  The level a
+    channel has when a state is entered is known where it was set earlier in
+    the same waveform, to the same level every time the state is entered.
+    Each state is replaced, where it is entered, by the first other state
+    that leaves every channel at the same level, the states are renumbered
+    and the state IDs of every timing segment remapped.  Returns the number
+    of states removed."""
+    global UniqueStateArr
+    global __stateTable__
+
+    nstates = np.size(UniqueStateArr, 0)
+    # only the channels that some state changes can tell states apart
+    active = np.any(UniqueStateArr[:, 1::2] != 0, axis=0)
+    level = UniqueStateArr[:, 0::2][:, active]
+    change = UniqueStateArr[:, 1::2][:, active] != 0
+    nchan = np.size(level, 1)
+
+    # the lowest and highest level each channel has when each state is
+    # entered, nan where it is not known
+    lowest = np.full((nstates, nchan), np.inf)
+    highest = np.full((nstates, nchan), -np.inf)
+    for TS in Catalog:
+        states = TS.state_IDs
+        if len(states) == 0:
+            continue
+        if len(TS.sequence_times) > 0:
+            # the subroutines it calls can change any channel
+            known = np.full((len(states), nchan), np.nan)
+        else:
+            # the state that last changed each channel before each state
+            last = np.where(change[states], np.arange(len(states))[:, None], -1)
+            last = np.maximum.accumulate(last, axis=0)
+            last = np.vstack((np.full((1, nchan), -1), last[:-1]))
+            known = level[states[np.maximum(last, 0)], np.arange(nchan)]
+            known = np.where(last >= 0, known, np.nan)
+        np.minimum.at(lowest, states, known)
+        np.maximum.at(highest, states, known)
+    entry = np.where(lowest == highest, lowest, np.nan)
+
+    # the states made last are merged first, each into the first state
+    # that fits it
+    alive = np.ones(nstates, dtype=bool)
+    target = np.arange(nstates)
+    for ss in range(nstates - 1, 0, -1):
+        known = ~np.isnan(entry[ss])
+        if not np.any(known):
+            continue
+        (cs, ls, es) = (change[ss], level[ss], entry[ss])
+        same = (change == cs) & (~cs | (level == ls))
+        redundant = known & np.where(cs, ~change & (es == ls), change & (level == es))
+        fits = np.all(same | redundant, axis=1) & alive
+        # the do-nothing state is never entered by the script
+        fits[[0, ss]] = False
+        if np.any(fits):
+            tt = np.argmax(fits)
+            target[ss] = tt
+            alive[ss] = False
+            # tt is now entered where ss was
+            entry[tt] = np.where(entry[tt] == entry[ss], entry[tt], np.nan)
+
+    removed = nstates - int(np.sum(alive))
+    if removed == 0:
+        return 0
+    while np.any(target != target[target]):
+        target = target[target]
+    renumber = (np.cumsum(alive) - 1)[target]
+    UniqueStateArr = UniqueStateArr[alive, :]
+    __stateTable__ = None
+    for TS in Catalog:
+        TS.state_IDs = renumber[TS.state_IDs]
+    return removed
+
+
+class StateRenderer(object):
+    """Renders the [CONFIG] STATE entries of the ACF for all the rows of a
+    state array (UniqueStateArr) at once.  Each board is rendered as a
+    column of strings, one per state, from whole-column operations on the
+    state array: the keep masks, the check that a bias board changes at most
+    one channel per state and the backplane CONTROL words are computed for
+    all the states together, and level values are formatted once per
+    distinct value.  Warnings are collected in self.messages, as
+    (state, text), and printed in state order by report()."""
+
+    # width of the channel groups of a low voltage bias board
+    n_LVBIAS = 30
+    n_LVDIO = 8
+
+    def __init__(self, states, layout):
+        self.states = np.atleast_2d(np.asarray(states, dtype=float))
+        self.nstates = np.size(self.states, 0) if np.size(self.states) else 0
+        self.layout = layout
+        self.messages = []
+
+    def levels(self, values, fmt="%g"):
+        """format an array of level values with __levelstr__, once for each
+        distinct value (-0.0 is kept apart from 0.0, as "%g" tells them
+        apart)"""
+        values = np.ascontiguousarray(values, dtype=float)
+        bits, inverse = np.unique(values.view(np.uint64), return_inverse=True)
+        strings = np.array(
+            [__levelstr__(value, fmt) for value in bits.view(float)], dtype=object
+        )
+        return strings[inverse.reshape(-1)].reshape(np.shape(values))
+
+    def cells(self, change, on_change, on_keep):
+        """object array of the on_keep string, with the on_change strings
+        where change is True"""
+        cells = np.full(np.shape(change), on_keep, dtype=object)
+        cells[change] = on_change
+        return cells
+
+    @staticmethod
+    def join(cells, sep=","):
+        """join the cells of each state (row)"""
+        return np.array([sep.join(row) for row in cells.tolist()], dtype=object)
+
+    def __level_change(self, offset, nchan):
+        """level and change columns of nchan channels from level column
+        index offset"""
+        columns = self.states[:, 2 * offset : 2 * (offset + nchan)]
+        return columns[:, 0::2], columns[:, 1::2]
+
+    def drvr(self, offset, slotnum):
+        """(level, fast, keep) triplets of a driver board"""
+        n_clk = __chan_per_board__["drvr"] // 2  # driver-speed-keep !!!!!
+        level, change = self.__level_change(offset, 2 * n_clk)
+        (fast, changeF) = (level[:, 1::2], change[:, 1::2])
+        (level, changeL) = (level[:, 0::2], change[:, 0::2])
+        # do not change anything UNLESS level and fast are both CHANGE
+        both = (changeL != 0) & (changeF != 0)
+        # in USA, 0==FAST 1==SLOW.  IN ACF, 1==FAST, 0==SLOW.
+        on_change = (
+            self.levels(level[both])
+            + np.where(fast[both] != 0, ",0,0", ",1,0").astype(object)
+        )
+        # write an error message if change flags don't agree.
+        for ii, clkchan in np.argwhere(~both & (changeL != changeF)):
+            indx = offset + 2 * clkchan
+            if indx in __SignalByIndx__:
+                thisSigName = __SignalByIndx__[indx]
+            else:
+                thisSigName = "%d:%d" % (slotnum, clkchan + 1)
+            self.messages.append(
+                (
+                    ii,
+                    "*** WARNING: Driver signal (%s) has "
+                    "inconsistent KEEP flags ***\n"
+                    "*** check signals or waveform input files for "
+                    "consistency  ***\n"
+                    "*** For clock waveforms, 'FAST' or 'SLOW' "
+                    "needs to be specified ***" % thisSigName,
+                )
+            )
+        return self.join(self.cells(both, on_change, ",1,1"))
+
+    def digital(self, offset, nchan, on_keep="1,1"):
+        """(level, keep) pairs of channels with integer levels (lvds, heater,
+        ad and the lvbias DIO's)"""
+        level, change = self.__level_change(offset, nchan)
+        change = change != 0
+        on_change = self.levels(level[change], "%d") + ",0"
+        return self.join(self.cells(change, on_change, on_keep))
+
+    def bias(self, offset, nchan, what):
+        """(!KEEP, chan, value) of a bias board group that changes at most one
+        of its nchan channels per state"""
+        level, change = self.__level_change(offset, nchan)
+        change = change.astype("bool")
+        nchange = np.sum(change, 1)
+        strings = np.full(self.nstates, "", dtype=object)
+        strings[nchange == 0] = "0,1,0"  # nothing changed
+        one = nchange == 1  # proper change
+        chan = np.argmax(change[one], 1)
+        strings[one] = (
+            np.char.mod("1,%d,", chan + 1).astype(object)
+            + self.levels(level[one, chan])
+        )
+        for ii in np.where(nchange > 1)[0]:
+            self.messages.append(
+                (ii, "Error in %s state call -- multiple changes in a state" % what)
+            )
+        return strings
+
+    def control(self, offset, n_back):
+        """hex words of the backplane levels and keeps"""
+        level, change = self.__level_change(offset, n_back)
+        bn = 2 ** np.arange(0, n_back)  # to convert backplane states to hex
+        level = np.sum(bn * level, 1)
+        keep = np.sum(bn * np.invert(change.astype("bool")).astype("int"), 1)
+        return np.array(
+            ["%X,%X" % (int(ll), int(kk)) for ll, kk in zip(level, keep)], dtype=object
+        )
+
+    def boards(self):
+        """returns the list of (key, strings) in the order they are written
+        in each state, where strings holds the value of the key for every
+        state"""
+        layout = self.layout
+        nxv = __chan_per_board__["xvbd"] // 2
+        entries = []
+        for clkslot, offset in layout.boards("drvr"):
+            entries.append(("MOD%d" % clkslot, self.drvr(offset, clkslot)))
+        for lvdsslot, offset in layout.boards("lvds"):
+            entries.append(
+                ("MOD%d" % lvdsslot, self.digital(offset, __chan_per_board__["lvds"]))
+            )
+        for htrslot, offset in layout.boards("htr"):
+            entries.append(
+                ("MOD%d" % htrslot, self.digital(offset, __chan_per_board__["htr"]))
+            )
+        for xvslot, offset in layout.boards("xvbd"):
+            # In the acf there are two entries, and they are
+            # (!pKEEP,pchan,pvalue,!nKeep,nchan,nvalue)
+            positive = self.bias(offset, nxv, "positive XVBD")
+            negative = self.bias(offset + nxv, nxv, "negative XVBD")
+            # a bad positive entry leaves out its comma too
+            comma = np.where(positive == "", "", ",").astype(object)
+            entries.append(("MOD%d" % xvslot, positive + comma + negative))
+        for adcslot, offset in layout.boards("adc"):
+            entries.append(("MOD%d" % adcslot, self.digital(offset, 1, "0,1")))
+        if True:  # Backplane
+            entries.append(
+                (
+                    "CONTROL",
+                    self.control(layout.partition("back"), __chan_per_board__["back"]),
+                )
+            )
+        for hvbdslot, offset in layout.boards("hvbd"):  # only one entry
+            strings = self.bias(offset, __chan_per_board__["hvbd"], "HVBD")
+            entries.append(("MOD%d" % hvbdslot, strings))
+        for lvbdslot, offset in layout.boards("lvbd"):
+            # the DIO's follow the voltages in the columns, but come first in
+            # the acf, followed by the "HVBD"-style voltages
+            dio = self.digital(offset + self.n_LVBIAS, self.n_LVDIO)
+            strings = self.bias(offset, self.n_LVBIAS, "LVBD")
+            entries.append(("MOD%d" % lvbdslot, dio + "," + strings))
+        return entries
+
+    def lines(self):
+        """returns the lines of the STATE entries of all states, followed by
+        the STATES count"""
+        lines = []
+        if self.nstates == 0:
+            lines.append("STATES=1\n")
+            return lines
+        entries = [(key + '="', strings + '"\n') for key, strings in self.boards()]
+        for ii in range(self.nstates):
+            # take out 2 \\'s if we don't need the double \
+            prefix = "STATE%d\\" % ii
+            lines.append(prefix + "NAME=STATE%03d\n" % ii)
+            for key, strings in entries:
+                lines.append(prefix + key + strings[ii])
+        lines.append("STATES=%d\n" % self.nstates)
+        return lines
+
+    def report(self):
+        """print the collected warnings in state order"""
+        for ii, text in sorted(self.messages, key=lambda message: message[0]):
+            print(text)
+
+
+class Timeline(object):
+    """Run-length encoded expansion of a timing segment (see
+    TimingSegment.timeline).  Each period in which a state other than the
+    do-nothing state (STATE000) is entered starts a run that lasts until the
+    next one, and the runs are kept as arrays of (start period, duration,
+    state ID).  The levels of the channels, from the initial level on, are
+    only worked out for the periods and channels asked for (see levels and
+    sample), so a whole frame takes memory in proportion to the number of
+    state changes instead of the number of clock periods."""
+
+    def __init__(self, times, states, nperiods, initialLevel):
+        """times are the periods in which the states are entered, in order,
+        out of nperiods"""
+        times = np.asarray(times, dtype=np.int64).reshape(-1)
+        states = np.asarray(states, dtype=int).reshape(-1)
+        # the do-nothing state only starts the first run
+        entered = states != 0
+        times = np.concatenate(([0], times[entered]))
+        states = np.concatenate(([0], states[entered]))
+        if len(times) > 1 and times[1] == 0:
+            (times, states) = (times[1:], states[1:])
+        self.start = times
+        self.duration = np.diff(np.append(times, nperiods))
+        self.state = states
+        self.nperiods = int(nperiods)
+        self.initial = np.array(initialLevel, dtype=float).reshape(-1)
+        self.__net = None
+
+    def __len__(self):
+        return len(self.start)
+
+    @classmethod
+    def join(cls, timelines):
+        """one Timeline of timelines that follow each other"""
+        offsets = np.cumsum([0] + [tl.nperiods for tl in timelines])
+        return cls(
+            np.concatenate([tl.start + offsets[jj] for jj, tl in enumerate(timelines)]),
+            np.concatenate([tl.state for tl in timelines]),
+            offsets[-1],
+            timelines[0].initial,
+        )
+
+    @staticmethod
+    def net_change(states, channels=None):
+        """returns (changed, level): the channels changed by any of the
+        states and the level that the last of them sets each one to"""
+        if channels is None:
+            channels = np.arange(np.size(UniqueStateArr, 1) // 2)
+        columns = UniqueStateArr[np.asarray(states, dtype=int), :]
+        change = columns[:, 2 * channels + 1].astype("bool")
+        level = columns[:, 2 * channels]
+        if len(change) == 0:
+            return np.zeros(len(channels), dtype="bool"), np.zeros(len(channels))
+        last = len(change) - 1 - np.argmax(change[::-1, :], 0)
+        return np.any(change, 0), level[last, np.arange(len(channels))]
+
+    def exit_level(self, initialLevel=None):
+        """level of all channels at the end, from initialLevel (default:
+        the initial level of the timeline), as a 1 x N array"""
+        if initialLevel is None:
+            initialLevel = self.initial
+        if self.__net is None:
+            self.__net = self.net_change(self.state)
+        (changed, level) = self.__net
+        return np.atleast_2d(np.where(changed, level, np.reshape(initialLevel, -1)))
+
+    def sample(self, periods, channels=None):
+        """levels in the given (sorted) periods of the given channels (default:
+        all), as a len(periods) x len(channels) array"""
+        periods = np.asarray(periods, dtype=np.int64).reshape(-1)
+        if channels is None:
+            channels = np.arange(len(self.initial))
+        channels = np.asarray(channels, dtype=int).reshape(-1)
+        if len(periods) == 0:
+            return np.zeros((0, len(channels)))
+        # run of each period
+        runs = np.searchsorted(self.start, periods, side="right") - 1
+        (first, last) = (runs[0], runs[-1] + 1)
+        # level on entering the first run asked for
+        (changed, level) = self.net_change(self.state[:first], channels)
+        entry = np.where(changed, level, self.initial[channels])
+        # levels after each run, forward filled from the last change
+        columns = UniqueStateArr[self.state[first:last], :]
+        level = columns[:, 2 * channels]
+        change = columns[:, 2 * channels + 1].astype("bool")
+        after = np.where(change, np.arange(last - first)[:, None], -1)
+        np.maximum.accumulate(after, axis=0, out=after)
+        filled = np.where(
+            after >= 0, level[np.maximum(after, 0), np.arange(len(channels))], entry
+        )
+        return filled[runs - first, :]
+
+    def levels(self, start=0, stop=None, channels=None):
+        """dense levels of the periods start to stop (default: the end) of the
+        given channels (default: all)"""
+        if stop is None:
+            stop = self.nperiods
+        return self.sample(np.arange(start, stop), channels)
+
+
 class TimingSegment(object):
     """general timing segment object (waveforms and sequences)
     to generate ACF states and script"""
@@ -478,50 +1123,22 @@ class TimingSegment(object):
 
         self.sequenceDef = []  # subroutine calls
 
-        # this is meant to replace self.XXXDef except sequenceDef.
-        global __chan_per_board__
-        self.events = {}
-        for kk in __chan_per_board__:
-            self.events.update({kk: []})
-            # initialize each type of board with sufficient channels
-            for jj in range(len(slot[kk]) * __chan_per_board__[kk]):
-                self.events[kk].append([])
+        # waveform events, see EventStore
+        self.events = EventStore()
 
         # create the do-nothing-state and insert it into UniqueStateArr
         # all levels = 0, all driver speeds = 1, all keeps = 1
         global UniqueStateArr
         if np.size(UniqueStateArr, 0) == 0:  # empty condition
+            signalPartitions = __board_layout__().partitions
             levels = np.hstack(
                 (
-                    np.array([[0, 0] * int(len(self.events["drvr"]) / 2)]),
-                    np.zeros(
-                        (
-                            1,
-                            len(self.events["lvds"])
-                            + len(self.events["htr"])
-                            + len(self.events["xvbd"])
-                            + len(self.events["adc"])
-                            + len(self.events["back"])
-                            + len(self.events["hvbd"])
-                            + len(self.events["lvbd"]),
-                        )
-                    ),
-                )
-            )
-            changes = np.zeros(
-                (
-                    1,
-                    # !driver-speed-keep
-                    len(self.events["drvr"])
-                    + len(self.events["lvds"])
-                    + len(self.events["htr"])
-                    + len(self.events["xvbd"])
-                    + len(self.events["adc"])
-                    + len(self.events["back"])
-                    + len(self.events["hvbd"])
-                    + len(self.events["lvbd"]),
+                    np.array([[0, 0] * int(signalPartitions[1] / 2)]),
+                    np.zeros((1, signalPartitions[-1] - signalPartitions[1])),
                 )
             )
+            # !driver-speed-keep
+            changes = np.zeros((1, signalPartitions[-1]))
             UniqueStateArr = np.reshape(np.vstack((levels, changes)), (1, -1), "F")
 
         # Default exit state and level (not necessarily consistent!)
@@ -537,174 +1154,66 @@ class TimingSegment(object):
             tmax = 1
         else:
             tmax = self.nperiods
-        for chan in range(len(self.events["drvr"])):
-            for tt in range(len(self.events["drvr"][chan])):
-                tmax = max(tmax, self.events["drvr"][chan][tt][0] + 1)
-        for chan in range(len(self.events["lvds"])):
-            for tt in range(len(self.events["lvds"][chan])):
-                tmax = max(tmax, self.events["lvds"][chan][tt][0] + 1)
-        for chan in range(len(self.events["htr"])):
-            for tt in range(len(self.events["htr"][chan])):
-                tmax = max(tmax, self.events["htr"][chan][tt][0] + 1)
-        for chan in range(len(self.events["xvbd"])):
-            for tt in range(len(self.events["xvbd"][chan])):
-                tmax = max(tmax, self.events["xvbd"][chan][tt][0] + 1)
-        for chan in range(len(self.events["adc"])):
-            for tt in range(len(self.events["adc"][chan])):
-                tmax = max(tmax, self.events["adc"][chan][tt][0] + 1)
-        for chan in range(len(self.events["back"])):
-            for tt in range(len(self.events["back"][chan])):
-                tmax = max(tmax, self.events["back"][chan][tt][0] + 1)
-        for chan in range(len(self.events["hvbd"])):
-            for tt in range(len(self.events["hvbd"][chan])):
-                tmax = max(tmax, self.events["hvbd"][chan][tt][0] + 1)
-        for chan in range(len(self.events["lvbd"])):
-            for tt in range(len(self.events["lvbd"][chan])):
-                tmax = max(tmax, self.events["lvbd"][chan][tt][0] + 1)
+        if len(self.events) > 0:
+            tmax = max(tmax, int(self.events.arrays()[0].max()) + 1)
         for tt in range(len(self.sequenceDef)):
             tmax = max(tmax, self.sequenceDef[tt][0] + 1)
         return tmax
 
-    def __fill_state(self, boardtype):  # subroutine of __make_states()
-        """fill level and boolean change arrays (row sparse format) for state
-        definition.  Called in __make_states() for each board type."""
-
-        events = self.events[boardtype]
-        n_chan = len(events)
-
-        row = []
-        col = []
-        val = []
-
-        for chan in range(n_chan):  # loop over channels
-            for jj in range(len(events[chan])):  # loop over entries
-                time = events[chan][jj][0]
-                if (boardtype == "drvr") and (np.mod(chan, 2) == 1):
-                    # 0 <--> 1 for FAST flags
-                    level = int(not events[chan][jj][1])
-                else:
-                    level = events[chan][jj][1]
-
-                # level info
-                col.append(2 * chan)
-                row.append(time)
-                val.append(level)
-
-                # change/keep info
-                col.append(2 * chan + 1)
-                row.append(time)
-                val.append(1)
-
-        if len(row) > 0:
-            # the first bit here is to handle multple entries in the waveform
-            # this takes the last value requested.
-            rc = np.array(row) + 1j * np.array(col)
-            # index of last unique element
-            uniq_j = len(rc) - np.unique(rc[::-1], return_index=True)[1] - 1
-            # only arrays can be indexed, not lists????
-            val = np.array(val)[uniq_j]
-            row = np.array(row)[uniq_j]
-            col = np.array(col)[uniq_j]
-            levelchangematrix = sparse.csc_matrix(
-                (val, (row, col)), shape=(self.nperiods, 2 * n_chan)
-            )
-        else:
-            # if the levelchangematrix is all zeros
-            levelchangematrix = sparse.csc_matrix((self.nperiods, 2 * n_chan))
-
-        return levelchangematrix
+    def local_states(self):
+        """the states of this segment on its own, see __segment_states__"""
+        (time, chan, level) = self.events.arrays()
+        return __segment_states__(time, chan, level, __board_layout__().partitions)
 
     def __make_states(self):
-        """Make the state array from the event array. In here are the initial
-        definitions of do_anything_tt, do_anything_dt, unique_state_ID.  Adds
-        new states to UniqueStateArr.
+        """Make the states of this segment from its events, numbering the
+        new ones after those in UniqueStateArr."""
+        self.merge_states(self.local_states())
+
+    def merge_states(self, local):
+        """Make the state array from the states of this segment on its own,
+        local, as returned by local_states(). In here are the initial
+        definitions of do_anything_tt, do_anything_dt, and of state_tt and
+        state_IDs, the periods in which states are entered and the states.
+        Adds new states to UniqueStateArr, in the order they are first
+        entered.
 
         """
         # enlarge nperiods, if necessary, to encompass all events
         self.nperiods = self.__tmax()
 
-        # these are all nperiods X nchannel arrays
-        drvr_level_change = self.__fill_state("drvr")
-        lvds_level_change = self.__fill_state("lvds")
-        htr_level_change = self.__fill_state("htr")
-        xvbd_level_change = self.__fill_state("xvbd")
-        adcs_level_change = self.__fill_state("adc")
-        back_level_change = self.__fill_state("back")
-        hvbd_level_change = self.__fill_state("hvbd")
-        lvbd_level_change = self.__fill_state("lvbd")
-
         # fill the sequence array (kept separate from STATEs for now)
         call_subroutine_tt = []
         for event in range(len(self.sequenceDef)):
             call_subroutine_tt.append(self.sequenceDef[event][0])
 
-        # GENERATE THE STATES #
-        # even columns are levels or slew rate switches, odd columns are CHANGE
-        # flags relative to Archon, I've inserted an extra change flag for
-        # driver to produce a more regular pattern
-        #
-        #   L1a K1a L2a K2a L3a K3a
-        #   L1b K1b L2b K2b L3b K3b
-        #   L1c K1c L2c K2c L3c K3c
-        #
-        state_arr = sparse.hstack(
-            (
-                drvr_level_change,
-                lvds_level_change,
-                htr_level_change,
-                xvbd_level_change,
-                adcs_level_change,
-                back_level_change,
-                hvbd_level_change,
-                lvbd_level_change,
-            ),
-            format="csc",
-        )
+        # the periods with events, the distinct rows of their states and the
+        # row of each period (see __segment_states__)
+        (times, distinct_rows, row_of_period) = local
 
-        # Find unique states in state_arr and store them in UniqueStateArr
-        # UNIQUE_STATE_ID will hold the row in UNIQUE_STATES for each time step
-
-        # unique_state_ID = np.zeros((self.nperiods,)).astype('int')
+        # Find the distinct rows in UniqueStateArr, adding the new ones.
+        # unique_state_IDs will hold the row in UniqueStateArr for each period
+        # with events.  They are never the do-nothing state, which has no
+        # change flags set.
         global UniqueStateArr
-        (times, chans, datas) = sparse.find(state_arr)
-        times = np.unique(times)
-        unique_state_IDs = []
-        for tt in times:
-            state_matches_ustate = np.where(
-                np.sum(
-                    np.abs(np.asarray(state_arr.getrow(tt).todense()) - UniqueStateArr),
-                    1,
-                )
-                == 0
-            )[0]
-            if len(state_matches_ustate) == 0:
-                # unique_state_ID[tt] = len(UniqueStateArr)
-                unique_state_IDs.append(len(UniqueStateArr))
-                UniqueStateArr = np.vstack(
-                    (UniqueStateArr, state_arr.getrow(tt).toarray())
-                )
-            elif len(state_matches_ustate) > 1:
-                print("problem: state matches multiple unique states")
-            else:
-                # unique_state_ID[tt] = state_matches_ustate[0]
-                unique_state_IDs.append(state_matches_ustate[0])
-
-        unique_state_ID = sparse.csc_matrix(
-            (unique_state_IDs, (np.zeros(np.shape(times)), times)),
-            shape=(1, self.nperiods),
-            dtype="int",
+        global __stateTable__
+        # (re)index UniqueStateArr if it was changed outside of this method
+        if __stateTable__ is None or __stateTable__.states is not UniqueStateArr:
+            __stateTable__ = StateTable(UniqueStateArr)
+        distinct_IDs = np.array(
+            [__stateTable__.find_or_add(row) for row in distinct_rows], dtype=int
         )
+        unique_state_IDs = distinct_IDs[row_of_period]
+        UniqueStateArr = __stateTable__.states
 
         # identify the time steps where something happens and calculate the
         # time gaps. Do_nothing_state = 0 # by definition in initialization of
-        # first TS## do_something_tt = mlab.find(unique_state_ID != do_nothing
-        # _state)
-        junk, do_something_tt, more_junk = sparse.find(unique_state_ID)
+        # first TS
         do_anything_tt = np.unique(
             np.hstack(
                 (
                     [0],  # start
-                    do_something_tt,  # states
+                    times,  # states
                     call_subroutine_tt,  # sub calls
                     self.nperiods - 1,
                 )
@@ -716,61 +1225,60 @@ class TimingSegment(object):
         self.sequence_times = np.array(call_subroutine_tt).astype("int")
         self.do_anything_tt = do_anything_tt.astype("int")
         self.do_anything_dt = do_anything_dt.astype("int")
-        self.unique_state_ID = unique_state_ID
+        self.state_tt = np.asarray(times, dtype=int)
+        self.state_IDs = np.asarray(unique_state_IDs, dtype=int)
 
         return
-        # end of __make_states
-
-    def script(self, outfile=sys.stdout):
-        """Append script to file or file handle, generates new unique states
-        as needed. Calculate time for time segment to complete, stores the
-        exit state and the parameters used in Catalog"""
-
-        if type(outfile) is str:
-            ofile = open(str(outfile), "a")
-        else:
-            ofile = outfile
-
-        if not hasattr(self, "unique_state_ID"):
+        # end of merge_states
+
+    def plan_script(self, index=None):
+        """Lay out the script of this timing segment, generating new unique
+        states as needed.  Each script line is stored in self.script_lines
+        as (state, text, pad, count, time, call): the state entered, the
+        text up to the comment, the width taken from the comment padding, the
+        line count and time at the end of the line (not counting the time
+        spent in subroutines) and the (command, name, iterations) of the
+        subroutine call made on the line, or None.  Registers the parameters
+        used in Parameters and widens __padmax__ to fit every line.  index
+        maps the names in Catalog to their indices (see __catalog_index__)"""
+
+        if not hasattr(self, "state_tt"):
             self.__make_states()
 
-        global Catalog
         global Parameters
         global __padmax__
 
-        if self.name != "":
-            ofile.write("%s: # %s\n" % (self.name, self.tstype))
+        if index is None:
+            index = __catalog_index__()
 
         do_anything_tt = self.do_anything_tt
         do_anything_dt = self.do_anything_dt
+        # the state entered in each period, the do-nothing state if none
+        state_at = dict(zip(self.state_tt.tolist(), self.state_IDs.tolist()))
 
+        lines = []
         count = -1
         time = 0
 
         if do_anything_dt[0] < 0:
             print("waveform definition error - event at t=0")
         for jj in range(len(do_anything_dt)):
-            pad = __padmax__  # column to start comment
+            pad = 0  # width taken from the comment padding
             EOL = False  # end of line flag
             count += 1
             time += 1
-            pad -= 11
-            this_state = self.unique_state_ID[0, do_anything_tt[jj]]
-            ofile.write("STATE%03d; " % this_state)
-            # overwrite the exit state if the unique_state_ID is nonzero
-            if this_state > 0:
-                self.ExitState = this_state
-                # until __make_waveform is run, this is the best guess
-                # for the exit levels
-                self.ExitLevel = UniqueStateArr[this_state : this_state + 1, 0::2]
+            pad += 11
+            this_state = state_at.get(do_anything_tt[jj], 0)
+            text = "STATE%03d; " % this_state
+            call = None
 
             seq_indx = np.where(self.sequence_times == do_anything_tt[jj])[0]
             # true condition means this is a subroutine call,
             # not a state change.
             if len(seq_indx):
                 this_sub_call = self.sequenceDef[seq_indx[0]][1]
-                pad -= len(this_sub_call)
-                ofile.write("%s" % this_sub_call)
+                pad += len(this_sub_call)
+                text += "%s" % this_sub_call
                 EOL = True
                 if this_sub_call[0:3].upper() == "IF ":
                     # get the first word after IF...
@@ -828,41 +1336,27 @@ class TimingSegment(object):
                                     # use 0 as default param value
                                     Parameters.update({this_param: 0})
                                 self.Params.update({this_param: Parameters[this_param]})
-                    SubName = [obj.name for obj in Catalog]
-                    if this_sub_name in SubName:
-                        this_sub_time = Catalog[__index_of__(this_sub_name)].time
-                        # there may be a cleaner implementation
-                        # for this_sub_time.
-                    else:
+                    if this_sub_name not in index:
                         # if the called subroutine has not been defined in
                         # Catalog, then insert a holder if the inputs are
                         # sensible, this code never gets excercised
-                        global __seq_ID__
-                        this_sub_time = np.nan
                         # initialize a timing segment with this name
                         TimingSegment(this_sub_name)
+                        index[this_sub_name] = len(Catalog) - 1
                         print("boo!")
-                    if this_sub_command.upper() == "CALL":
-                        # only add time if this is not a call to itself
-                        # (usually RETURN)
-                        time += this_sub_time * this_sub_iterations
-                        # update the exit state and level with that of
-                        # the subroutine
-                        if Catalog[__index_of__(this_sub_name)].ExitState != 0:
-                            self.ExitState = Catalog[
-                                __index_of__(this_sub_name)
-                            ].ExitState
-                            self.ExitLevel = Catalog[
-                                __index_of__(this_sub_name)
-                            ].ExitLevel
+                    call = (
+                        this_sub_command.upper(),
+                        this_sub_name,
+                        this_sub_iterations,
+                    )
             # END OF SUBROUTINE PARSING
             if do_anything_tt[jj] == self.nperiods - 1:
                 if self.endline == -1:
-                    pad -= 7 + len(self.name)
-                    ofile.write("RETURN %s" % self.name)
+                    pad += 7 + len(self.name)
+                    text += "RETURN %s" % self.name
                 elif 0 <= self.endline < len(Catalog):
-                    pad -= 6 + len(Catalog[self.endline].name)
-                    ofile.write("GOTO %s" % Catalog[self.endline].name)
+                    pad += 6 + len(Catalog[self.endline].name)
+                    text += "GOTO %s" % Catalog[self.endline].name
                     # SubName[self.endline]))
                 EOL = True
             if (do_anything_dt[jj] > 1) and not EOL:
@@ -870,99 +1364,305 @@ class TimingSegment(object):
                 # away, then print a DO_NOTHING
                 count += do_anything_dt[jj] - 1
                 time += do_anything_dt[jj] - 1
-                pad -= 8
-                ofile.write("STATE000")  # the do-nothing-state
+                pad += 8
+                text += "STATE000"  # the do-nothing-state
                 if do_anything_dt[jj] > 2:
                     # add the repeat counter if more than 1 are required.
-                    pad -= np.ceil(np.log10(do_anything_dt[jj] - 1)).astype(int) + 2
-                    ofile.write("(%d)" % (do_anything_dt[jj] - 1))
-            if pad < __padmax__:
-                # comment line with the counter, END LINE
-                if pad < 1:
-                    __padmax__ -= pad - 1
-                ofile.write("%s# %6d %8.0f\n" % (" " * pad, max(count, 0), time))
-        self.time = time
-        if ofile.name != "<stdout>":  # don't close stdout!
+                    pad += np.ceil(np.log10(do_anything_dt[jj] - 1)).astype(int) + 2
+                    text += "(%d)" % (do_anything_dt[jj] - 1)
+            # make room for the comment
+            if __padmax__ - pad < 1:
+                __padmax__ = pad + 1
+            lines.append((this_state, text, pad, count, time, call))
+        self.script_lines = lines
+        return lines
+
+    def compress_script(self, index=None):
+        """Shorten the script of this timing segment (see plan_script).  A
+        run of periods in one state is entered with a single repeated
+        STATEnnn(k), and a block of lines repeated k times becomes a CALL
+        of a loop waveform, made for the block and shared by every segment
+        that repeats it (see __loop_segment__).  The line before the block
+        makes the call, so that no period is added.  Only the lines that
+        enter a state and wait are changed.  The states entered in every
+        period stay as they were, which is checked by expanding the script
+        before and after.  Returns the loop waveforms used."""
+
+        if index is None:
+            index = __catalog_index__()
+
+        # the lines that enter a state and wait, as (first, state, repeats):
+        # one period of state first, then repeats periods of state, and
+        # (line, count and time taken) of the others
+        items = []
+        (count, time) = (-1, 0)
+        for line in self.script_lines:
+            periods = line[4] - time
+            plain = (line[0], 0, periods - 1)
+            if line[5] is None and periods > 0 and line[1] == __plain_line__(*plain)[0]:
+                items.append(("plain", plain))
+            else:
+                items.append(("fixed", line, line[3] - count, periods))
+            (count, time) = line[3:5]
+
+        tokens = []
+        used = []
+        jj = 0
+        while jj < len(items):
+            if items[jj][0] == "fixed":
+                tokens.append(items[jj])
+                jj += 1
+                continue
+            run = []
+            while jj < len(items) and items[jj][0] == "plain":
+                run.append(items[jj][1])
+                jj += 1
+            # fold the loops of the lines as they are, and as they are with
+            # each run of a state entered at once, and keep the shortest
+            periods = __periods__([("plain", line) for line in run])
+            candidates = []
+            for lines in (
+                run,
+                __encode_periods__(periods, wait_only=True),
+                __encode_periods__(periods),
+            ):
+                new = list(used)
+                folded = __fold_loops__(lines, new)
+                length = len(folded) + sum(
+                    __loop_cost__(body, used) for body in new[len(used) :]
+                )
+                candidates.append((length, folded, new))
+            (_, folded, new) = min(candidates, key=lambda candidate: candidate[0])
+            tokens += folded
+            used[:] = new
+
+        if not used and len(tokens) == len(items):
+            return []
+        if __periods__(tokens) != __periods__(items):
+            print("*** loop compression changed the timing of %s ***" % self.name)
+            return []
+
+        global __padmax__
+        lines = []
+        (count, time) = (-1, 0)
+        for token in tokens:
+            if token[0] == "fixed":
+                (_, line, dcount, dtime) = token
+                count += dcount
+                time += dtime
+                lines.append(line[:3] + (count, time, line[5]))
+                continue
+            if token[0] == "plain":
+                (first, state, repeats) = token[1]
+                (text, pad) = __plain_line__(first, state, repeats)
+                this_state = state if repeats > 0 and state > 0 else first
+                call = None
+            else:
+                (_, this_state, body, repeats) = token
+                loop = __loop_segment__(body, self.name, index)
+                text = "STATE%03d; CALL %s(%d)" % (this_state, loop.name, repeats)
+                pad = len(text) + 1
+                call = ("CALL", loop.name, repeats)
+                repeats = 0
+            count += 1 + repeats
+            time += 1 + repeats
+            if __padmax__ - pad < 1:
+                __padmax__ = pad + 1
+            lines.append((this_state, text, pad, count, time, call))
+        self.script_lines = lines
+        return [__loops__[body] for body in used]
+
+    def callees(self, index=None):
+        """returns the Catalog indices of the subroutines CALLed in the
+        script of this timing segment (see plan_script), in order"""
+        if index is None:
+            index = __catalog_index__()
+        called = []
+        for line in self.script_lines:
+            call = line[5]
+            if call is not None and call[0] == "CALL":
+                if index[call[1]] not in called:
+                    called.append(index[call[1]])
+        return called
+
+    def resolve_timing(self, index=None):
+        """Calculate the time for the timing segment to complete and its exit
+        state and level from its script (see plan_script) and the times and
+        exit states of the subroutines it calls, which should be resolved
+        first.  Returns the time of each script line."""
+
+        global Catalog
+
+        if index is None:
+            index = __catalog_index__()
+
+        sub_time = 0  # time spent in subroutines so far
+        times = []
+        for this_state, _, _, _, time, call in self.script_lines:
+            # overwrite the exit state if the state ID is nonzero
+            if this_state > 0:
+                self.ExitState = this_state
+                # until timeline() is run, this is the best guess
+                # for the exit levels
+                self.ExitLevel = UniqueStateArr[this_state : this_state + 1, 0::2]
+            # only add time if this is a CALL (not a GOTO or RETURN)
+            if call is not None and call[0] == "CALL":
+                sub = Catalog[index[call[1]]]
+                sub_time += sub.time * call[2]
+                # update the exit state and level with that of the subroutine
+                if sub.ExitState != 0:
+                    self.ExitState = sub.ExitState
+                    self.ExitLevel = sub.ExitLevel
+            times.append(time + sub_time)
+        self.time = times[-1]
+        return times
+
+    def script(self, outfile=sys.stdout, index=None):
+        """Append script to file or file handle, generates new unique states
+        as needed. Calculate time for time segment to complete, stores the
+        exit state and the parameters used in Catalog"""
+
+        if type(outfile) is str:
+            ofile = open(str(outfile), "a")
+        else:
+            ofile = outfile
+
+        if index is None:
+            index = __catalog_index__()
+        if not hasattr(self, "script_lines"):
+            self.plan_script(index)
+        times = self.resolve_timing(index)
+
+        output = []
+        if self.name != "":
+            output.append("%s: # %s\n" % (self.name, self.tstype))
+        for (_, text, pad, count, _, _), time in zip(self.script_lines, times):
+            # comment line with the counter, END LINE
+            output.append(
+                "%s%s# %6d %8.0f\n"
+                % (text, " " * (__padmax__ - pad), max(count, 0), time)
+            )
+        ofile.writelines(output)
+        if ofile is not outfile:  # only close what was opened here
             ofile.close()
 
         return True
 
-    def __make_waveform(self, initialLevel=None):
-        """generate a signal-level matrix from the state array.  called by
-        TimingSegment.plot() or by recursion"""
-        global UniqueStateArr
+    def timeline(self, initialLevel=None, cache=None):
+        """Expand the timing segment, running the segments it calls, into a
+        Timeline that starts from initialLevel (default: the exit level).
+        Updates the exit levels of this segment and of the segments called.
+        The timelines of called segments that do not decrement parameters
+        are memoized in cache."""
         global Catalog
-        # should be sparse?
-        state_arr = np.atleast_2d(
-            UniqueStateArr[np.squeeze(self.unique_state_ID.toarray()), :]
-        )
-        keep = np.invert(state_arr[:, 1::2].astype("bool"))
-        level = state_arr[:, 0::2]
+        if cache is None:
+            cache = {}
+        if not hasattr(self, "state_tt"):
+            self.__make_states()
 
         if initialLevel is None:
             initialLevel = self.ExitLevel
-
-        # true level should be generated incrementally with  calls to subs.
-        true_level = initialLevel
-        this_level = np.zeros(np.shape(true_level))
-        for tt in range(self.nperiods):
-            # keep
-            this_level[0, keep[tt, :]] = true_level[-1, keep[tt, :]]
-            # get new values
-            this_level[0, ~keep[tt, :]] = level[tt, ~keep[tt, :]]
-            true_level = np.vstack((true_level, this_level))
-
+        this_level = np.array(initialLevel, dtype=float).reshape(1, -1)
+
+        # periods where this segment enters a state, and the states
+        state_tt = self.state_tt
+        state_IDs = self.state_IDs
+        times = []
+        states = []
+        offset = 0  # periods spent in subs so far
+        start = 0
+        for tt in np.unique(self.sequence_times):
             seq_indx = np.where(self.sequence_times == tt)[0]
-            # true condition means this is a subroutine call,
-            # not a state change.
-            if len(seq_indx):
-                this_sub_call = self.sequenceDef[seq_indx[0]][1]
-                match = re.search(
-                    r"(IF\s+(?P<N0>!)?(?P<P0>\w+)(?P<D0>--)?\s+)?"
-                    + r"((?P<CMD>RETURN|GOTO|CALL)\s+(?P<TS>\w+)\(?)?"
-                    + r"(\(?(?P<P1>\w+)?(?P<D1>--)?)\)?",
-                    this_sub_call,
-                )
-                #  REGEX labels:
-                #  N0: negation of IF demo (!)
-                #  P0: IF demo parameter
-                #  D0: decrement of demo parameter (--)
-                #  CMD: branching command (RETURN, GOTO or CALL)
-                #  TS: Time segment to call
-                #  P1: Parameter
-                #  D1: Parameter decrement (--)
-                runcmd = True
-                if match.group("P0") is not None:
-                    runcmd = self.Params[match.group("P0")]
-                    if match.group("N0") == "!":
-                        runcmd = not runcmd
-                    # decrement P0
-                    if match.group("D0") == "--" and self.Params[match.group("P0")] > 0:
-                        self.Params[match.group("P0")] -= 1
-                if runcmd:
-                    if match.group("P1") is not None:
-                        if match.group("P1").isdigit():
-                            repeats = int(match.group("P1"))
-                        else:
-                            repeats = self.Params[match.group("P1")]
+            block = (state_tt >= start) & (state_tt <= tt)
+            times.append(state_tt[block] + offset)
+            states.append(state_IDs[block])
+            (changed, level) = Timeline.net_change(state_IDs[block])
+            this_level = np.where(changed, level, this_level)
+            start = tt + 1
+
+            # a subroutine call, not a state change.
+            this_sub_call = self.sequenceDef[seq_indx[0]][1]
+            match = re.search(
+                r"(IF\s+(?P<N0>!)?(?P<P0>\w+)(?P<D0>--)?\s+)?"
+                + r"((?P<CMD>RETURN|GOTO|CALL)\s+(?P<TS>\w+)\(?)?"
+                + r"(\(?(?P<P1>\w+)?(?P<D1>--)?)\)?",
+                this_sub_call,
+            )
+            #  REGEX labels:
+            #  N0: negation of IF demo (!)
+            #  P0: IF demo parameter
+            #  D0: decrement of demo parameter (--)
+            #  CMD: branching command (RETURN, GOTO or CALL)
+            #  TS: Time segment to call
+            #  P1: Parameter
+            #  D1: Parameter decrement (--)
+            runcmd = True
+            if match.group("P0") is not None:
+                runcmd = self.Params[match.group("P0")]
+                if match.group("N0") == "!":
+                    runcmd = not runcmd
+                # decrement P0
+                if match.group("D0") == "--" and self.Params[match.group("P0")] > 0:
+                    self.Params[match.group("P0")] -= 1
+            if runcmd:
+                if match.group("P1") is not None:
+                    if match.group("P1").isdigit():
+                        repeats = int(match.group("P1"))
                     else:
-                        repeats = 1
-                    # decrement P0
-                    if match.group("D1") == "--" and self.Params[match.group("P1")] > 0:
-                        self.Params[match.group("P1")] -= 1
-                    if match.group("CMD") == "CALL" and match.group("TS") is not None:
-                        print("calling %s" % match.group("TS"))
-                        TSindx = __index_of__(match.group("TS"))
-                        for jj in range(repeats):
-                            calledLevel = Catalog[TSindx].__make_waveform(this_level)
-                            true_level = np.vstack((true_level, calledLevel))
-                            this_level = true_level[-1:, :]
-
-        # chop off the initial condition.
-        true_level = true_level[1:, :]
+                        repeats = self.Params[match.group("P1")]
+                else:
+                    repeats = 1
+                # decrement P0
+                if match.group("D1") == "--" and self.Params[match.group("P1")] > 0:
+                    self.Params[match.group("P1")] -= 1
+                if match.group("CMD") == "CALL" and match.group("TS") is not None:
+                    print("calling %s" % match.group("TS"))
+                    sub = Catalog[__index_of__(match.group("TS"))]
+                    memoize = not sub.__decrements(cache)
+                    key = ("timeline", sub.label)
+                    for jj in range(repeats):
+                        if memoize and key in cache:
+                            called = cache[key]
+                        else:
+                            called = sub.timeline(this_level, cache)
+                            if memoize:
+                                cache[key] = called
+                        times.append(called.start + start + offset)
+                        states.append(called.state)
+                        this_level = called.exit_level(this_level)
+                        sub.ExitLevel = this_level
+                        offset += called.nperiods
+        block = state_tt >= start
+        times.append(state_tt[block] + offset)
+        states.append(state_IDs[block])
+
+        timeline = Timeline(
+            np.concatenate(times),
+            np.concatenate(states),
+            self.nperiods + offset,
+            initialLevel,
+        )
         # update the Exit level
-        self.ExitLevel = true_level[-1:, :]  # colon after -1 keeps the array 2D
-        return true_level
+        self.ExitLevel = timeline.exit_level()
+        return timeline
+
+    def __decrements(self, cache):
+        """True if running this timing segment decrements any of the
+        parameters of the segments, so its expansion cannot be memoized"""
+        key = ("decrements", self.label)
+        if key not in cache:
+            cache[key] = True  # until shown otherwise, also for CALL cycles
+            index = __catalog_index__()
+            decrements = False
+            for tt, this_sub_call in self.sequenceDef:
+                if "--" in this_sub_call:
+                    decrements = True
+                match = re.search(r"CALL\s+(\w+)", this_sub_call)
+                if match is not None and match.group(1) in index:
+                    sub = Catalog[index[match.group(1)]]
+                    decrements = decrements or sub.__decrements(cache)
+            cache[key] = decrements
+        return cache[key]
 
     def plot(self, cycles=2, initialLevel=None):
         """plot the states in the timing script. optionally takes an initial
@@ -973,34 +1673,34 @@ class TimingSegment(object):
         if self.tstype == "sequence":
             print("plt_waves is intended for waveforms. " "this object is a sequence")
             print("Warning: results may not make sense.")
-        if not hasattr(self, "unique_state_ID"):
+        if not hasattr(self, "state_tt"):
             self.__make_states()
 
         global UniqueStateArr
-        state_arr = np.atleast_2d(
-            UniqueStateArr[np.squeeze(self.unique_state_ID.toarray()), :]
-        )
+        # the states entered by this segment, and the do-nothing state
+        state_arr = np.atleast_2d(UniqueStateArr[np.append(self.state_IDs, 0), :])
         keep = np.invert(state_arr[:, 1::2].astype("bool"))
         level = state_arr[:, 0::2]
 
         if initialLevel is None:
             initialLevel = self.ExitLevel
-        true_level = np.zeros((0, np.shape(level)[1]))  # 0xN empty array
+        timelines = []
         for jj in range(cycles):
-            true_level = np.vstack((true_level, self.__make_waveform(initialLevel)))
+            timelines.append(self.timeline(initialLevel))
             initialLevel = self.ExitLevel
+        timeline = Timeline.join(timelines)
 
-        # find the static channels
-        nonstatic = np.asarray(
-            [x != y for x, y in zip(np.amax(true_level, 0), np.amin(true_level, 0))]
-        )
-        # nonstatic = np.amax(true_level, 0) != np.amin(true_level, 0)
+        # find the static channels, from the levels of each run
+        run_level = timeline.sample(timeline.start)
+        nonstatic = np.amax(run_level, 0) != np.amin(run_level, 0)
         # find the commanded channels
         commanded = np.amin(keep, 0) == 0
 
         print("--- %s" % self.name, end=" ")
 
         if sum(nonstatic):
+            import matplotlib.pyplot as plt
+
             # calculate the slot/channel numbers for the nonstatic traces.
             # drvr, lvds, adc, back, hvbd, lvbd
             signalID = np.where(nonstatic)[0]
@@ -1038,8 +1738,14 @@ class TimingSegment(object):
                 )
                 global period_ns
                 period_us = period_ns // 1000.0
-                time = np.arange(np.shape(true_level)[0]) * period_us
-                axes[kk].plot(time, true_level[:, thisSigID])
+                # the first and last period of each run trace the same
+                # lines as every period
+                periods = np.unique(
+                    np.hstack((timeline.start, timeline.start + timeline.duration - 1))
+                )
+                periods = periods[(periods >= 0) & (periods < timeline.nperiods)]
+                time = periods * period_us
+                axes[kk].plot(time, timeline.sample(periods, [thisSigID])[:, 0])
                 axes[kk].set_ylabel(
                     "%s\n%s\n(%d,%d)"
                     % (boardname, thisSigLabel, thisSlot, thisChan + 1)
@@ -1049,7 +1755,9 @@ class TimingSegment(object):
                 yy = axes[kk].set_ylim((yy[0] - 0.1 * dy, yy[1] + 0.1 * dy))
                 for nn in range(cycles):
                     axes[kk].plot(
-                        [len(time) / cycles * period_us * (nn + 1)] * 2, yy, "k--"
+                        [timeline.nperiods / cycles * period_us * (nn + 1)] * 2,
+                        yy,
+                        "k--",
                     )
                 axes[kk].grid("on")
                 if kk > 0:
@@ -1080,19 +1788,20 @@ class TimingSegment(object):
         return
 
 
+def __levelstr__(value, fmt="%g"):
+    """format a level value, substituting the const name if this
+    value is a registered SET...TO placeholder (see __constLevels__)"""
+    value = float(value)
+    name = __constLevels__.get(value)
+    return name if name is not None else fmt % value
+
+
 def state(outfile=None):
     """write states from the UniqueStateArr to the
     file or file handle specified"""
     global UniqueStateArr
     global __chan_per_board__
 
-    def levelstr(value, fmt="%g"):
-        """format a level value, substituting the const name if this
-        value is a registered SET...TO placeholder (see __constLevels__)"""
-        value = float(value)
-        name = __constLevels__.get(value)
-        return name if name is not None else fmt % value
-
     if outfile is None:
         ofile = sys.stdout
     elif type(outfile) is str:
@@ -1100,275 +1809,15 @@ def state(outfile=None):
     else:
         ofile = outfile
 
-    # write the script to /dev/null before writing states.
-    script("/dev/null", quiet=True)
-
-    ofile.write("[CONFIG]\n")
-    ii = 0
-    for ii in range(np.size(UniqueStateArr, 0)):
-        # take out 2 \\'s if we don't need the double \
-        prefix = "STATE%d\\" % ii
-        ofile.write(prefix + "NAME=STATE%03d\n" % ii)
-        offset = 0  # to keep track of position in array
-        for clkslot in slot["drvr"]:
-            ofile.write(prefix + 'MOD%d="' % clkslot)
-            statestring = ""
-            # driver-speed-keep !!!!!
-            for clkchan in range(int(__chan_per_board__["drvr"] / 2)):
-                jj_level = offset + 4 * clkchan + 0
-                jj_changeL = offset + 4 * clkchan + 1
-                jj_fast = offset + 4 * clkchan + 2
-                jj_changeF = offset + 4 * clkchan + 3
-                if not (
-                    UniqueStateArr[ii, jj_changeL] and UniqueStateArr[ii, jj_changeF]
-                ):
-                    # do not change anything UNLESS level and
-                    # fast are both CHANGE
-                    # this branch keeps everything the same.
-                    statestring += ",1,1,"
-                    if UniqueStateArr[ii, jj_changeL] != UniqueStateArr[ii, jj_changeF]:
-                        # write an error message if change flags don't agree.
-                        if jj_level / 2 in __SignalByIndx__:
-                            thisSigName = __SignalByIndx__[jj_level / 2]
-                        else:
-                            thisSigName = "%d:%d" % (clkslot, clkchan + 1)
-                        print(
-                            "*** WARNING: Driver signal (%s) has "
-                            "inconsistent KEEP flags ***" % thisSigName
-                        )
-                        print(
-                            "*** check signals or waveform input files for "
-                            "consistency  ***"
-                        )
-                        print(
-                            "*** For clock waveforms, 'FAST' or 'SLOW' "
-                            "needs to be specified ***"
-                        )
-                else:
-                    # in USA, 0==FAST 1==SLOW.  IN ACF, 1==FAST, 0==SLOW.
-                    statestring += "%s,%d,0," % (
-                        levelstr(UniqueStateArr[ii, jj_level]),
-                        int(not bool(UniqueStateArr[ii, jj_fast])),
-                    )
-
-            statestring = statestring[:-1] + '"'
-            ofile.write(statestring + "\n")
-            offset += 2 * __chan_per_board__["drvr"]  # !driver-speed-keep
-        for lvdsslot in slot["lvds"]:
-            ofile.write(prefix + 'MOD%d="' % lvdsslot)
-            statestring = ""
-            for lvdschan in range(__chan_per_board__["lvds"]):
-                jj_level = offset + 2 * lvdschan + 0
-                jj_change = offset + 2 * lvdschan + 1
-                if not UniqueStateArr[ii, jj_change]:
-                    statestring += "1,1,"
-                else:
-                    statestring += "%s,0," % (
-                        levelstr(UniqueStateArr[ii, jj_level], "%d")
-                    )
-            statestring = statestring[:-1] + '"'
-            ofile.write(statestring + "\n")
-            offset += 2 * __chan_per_board__["lvds"]
-        for htrslot in slot["htr"]:
-            ofile.write(prefix + 'MOD%d="' % htrslot)
-            statestring = ""
-            for htrchan in range(__chan_per_board__["htr"]):
-                jj_level = offset + 2 * htrchan + 0
-                jj_change = offset + 2 * htrchan + 1
-                if not UniqueStateArr[ii, jj_change]:
-                    statestring += "1,1,"
-                else:
-                    statestring += "%s,0," % (
-                        levelstr(UniqueStateArr[ii, jj_level], "%d")
-                    )
-            statestring = statestring[:-1] + '"'
-            ofile.write(statestring + "\n")
-            offset += 2 * __chan_per_board__["htr"]
-        for xvslot in slot["xvbd"]:  # this is similar to the hvbd states
-            # In teh acf there are two entries, and they are
-            # (!pKEEP,pchan,pvalue,!nKeep,nchan,nvalue)
-            ofile.write(prefix + 'MOD%d="' % xvslot)
-            statestring = ""
-            # Do like the hvbd processing, but on positive bits (first half)
-            # and then the negative bits (second half)
-            # really only want the first half of all xvbd states
-            n_xvbd_pos_X_2 = 2 * __chan_per_board__["xvbd"] // 2
-            pxvbdLevel = UniqueStateArr[ii, offset : offset + n_xvbd_pos_X_2 : 2]
-            pxvbdKeep = np.invert(
-                UniqueStateArr[ii, offset + 1 : offset + n_xvbd_pos_X_2 : 2].astype(
-                    "bool"
-                )
-            ).astype("int")
-            # Check that there is only one non-keep for the positive voltages
-            # in pxvbdKeep
-            pKeepSum = sum(pxvbdKeep)
-            # nothing changed and only first half of xvbd channels
-            if pKeepSum == (__chan_per_board__["xvbd"] / 2):
-                # need a comma at the end of string since negative bits will
-                # come after
-                statestring += "0,1,0,"
-            # proper change for positive voltage
-            elif (pKeepSum + 1) == (__chan_per_board__["xvbd"] / 2):
-                # 2. get the level corresponding to on the non-keep.
-                pxvbd_chan = np.where(pxvbdKeep == 0)[0]
-                # again need comma at end of pops string
-                statestring += "1,%d,%s," % (
-                    pxvbd_chan + 1,
-                    levelstr(pxvbdLevel[pxvbd_chan]),
-                )
-            else:
-                print(
-                    "Error in positive XVBD state call -- multiple changes "
-                    "in a state"
-                )
-            # Do just like hvbd processing, but now on the negative bits
-            # (second half)
-            # skip over the positive xvbd voltages
-            offset += 2 * __chan_per_board__["xvbd"] // 2
-            # really only want the second half of all xvbd states
-            n_xvbd_neg_X_2 = 2 * __chan_per_board__["xvbd"] // 2
-            nxvbdLevel = UniqueStateArr[ii, offset : offset + n_xvbd_neg_X_2 : 2]
-            nxvbdKeep = np.invert(
-                UniqueStateArr[ii, offset + 1 : offset + n_xvbd_neg_X_2 : 2].astype(
-                    "bool"
-                )
-            ).astype("int")
-            # Check that there is only one non-keep for the negative voltages
-            # in nxvbdKeep
-            nKeepSum = sum(nxvbdKeep)
-            # nothing changed and only second half of xvbd channels
-            if nKeepSum == (__chan_per_board__["xvbd"] / 2):
-                statestring += "0,1,0"
-            # proper change for positive voltage
-            elif (nKeepSum + 1) == (__chan_per_board__["xvbd"] / 2):
-                # 2. get the level corresponding to on the non-keep.
-                nxvbd_chan = np.where(nxvbdKeep == 0)[0]
-                statestring += "1,%d,%s" % (
-                    nxvbd_chan + 1,
-                    levelstr(nxvbdLevel[nxvbd_chan]),
-                )
-            else:
-                print(
-                    "Error in negative XVBD state call -- multiple changes "
-                    "in a state"
-                )
-            #            statestring = statestring[:-1] + '"'
-            ofile.write(statestring + '"\n')
-            # skip over the last half of the xvbd channels
-            offset += 2 * __chan_per_board__["xvbd"] // 2
-        for adcslot in slot["adc"]:
-            ofile.write(prefix + 'MOD%d="' % adcslot)
-            statestring = ""
-            jj_level = offset
-            jj_change = offset + 1
-            if not UniqueStateArr[ii, jj_change]:
-                statestring += "0,1,"
-            else:
-                statestring += "%s,0," % (
-                    levelstr(UniqueStateArr[ii, jj_level], "%d")
-                )
-            statestring = statestring[:-1] + '"'
-            ofile.write(statestring + "\n")
-            offset += 2
-        if True:  # Backplane
-            n_back = __chan_per_board__["back"]
-            bn = 2 ** np.arange(0, n_back)  # to convert backplane states to hex
-            level = sum(
-                bn * UniqueStateArr[ii, (offset + 0) : (offset + 2 * n_back) : 2]
-            )
-            keep = sum(
-                bn
-                * (
-                    np.invert(
-                        UniqueStateArr[
-                            ii, (offset + 1) : (offset + 2 * n_back) : 2
-                        ].astype("bool")
-                    ).astype("int")
-                )
-            )
-            ofile.write(prefix + 'CONTROL="%X,%X"\n' % (int(level), int(keep)))
-            offset += 2 * n_back
-        for hvbdslot in slot["hvbd"]:  # different from the other states,
-            # in the acf, there is only one entry, and it is
-            # (!KEEP, chan, value)
-            ofile.write(prefix + 'MOD%d="' % hvbdslot)
-            statestring = ""
-            n_hvbd_X_2 = 2 * __chan_per_board__["hvbd"]
-            hvbdLevel = UniqueStateArr[ii, offset : offset + n_hvbd_X_2 : 2]
-            hvbdKeep = np.invert(
-                UniqueStateArr[ii, offset + 1 : offset + n_hvbd_X_2 : 2].astype("bool")
-            ).astype("int")
-            # 1. check that there is only one non-keep in hvbdKeep
-            KeepSum = sum(hvbdKeep)
-            if KeepSum == __chan_per_board__["hvbd"]:  # nothing changed
-                statestring += "0,1,0"
-            elif (KeepSum + 1) == __chan_per_board__["hvbd"]:  # proper change
-                # 2. get the level corresponding to the non-keep.
-                hvbd_chan = int(np.where(hvbdKeep == 0)[0][0])
-                statestring += "1,%d,%s" % (
-                    hvbd_chan + 1,
-                    levelstr(hvbdLevel[hvbd_chan]),
-                )
-            else:
-                print("Error in HVBD state call -- multiple changes in a state")
-            ofile.write(statestring + '"\n')
-            offset += n_hvbd_X_2
-        for lvbdslot in slot["lvbd"]:
-            # this is an ugly amalgamation of lvds and hvbd...
-            ofile.write(prefix + 'MOD%d="' % lvbdslot)
-            statestring = ""
-            n_LVBIAS = 30
-            n_LVDIO = 8
-            # the "-30" in the for loop below is to exclude the 30 bias channels
-            # This will always evaluate to 0, maybe chan_per_board should be 38
-            # this loop is supposed to create the DIO states
-            # maybe we'll make it range(30:38) to put the DIO at the end
-            # and the voltages at the beginning, but as of now 7/23/2020 it's
-            # DIO then voltages Make the DIO the buts after the voltages, set
-            # offset = 8 move offset to past voltages
-            offset += 2 * (__chan_per_board__["lvbd"] - n_LVDIO)
-            for lvbdchan in range(__chan_per_board__["lvbd"] - n_LVBIAS):
-                jj_level = offset + 2 * lvbdchan + 0
-                jj_change = offset + 2 * lvbdchan + 1
-                if not UniqueStateArr[ii, jj_change]:
-                    statestring += "1,1,"
-                else:
-                    statestring += "%s,0," % (
-                        levelstr(UniqueStateArr[ii, jj_level], "%d")
-                    )
-
-            # move back to beginning of voltages
-            offset -= 2 * (__chan_per_board__["lvbd"] - n_LVDIO)
-            # move the offset past the 8 DIO's
-            # offset += 2*(__chan_per_board__['lvbd'] - n_LVBIAS)
-            # now for the "HVBD"-style part of this board
-            n_lvbd_X_2 = 2 * n_LVBIAS  # there are only 30 channels of voltages
-            # the offset will be
-            lvbdLevel = UniqueStateArr[ii, offset : offset + n_lvbd_X_2 : 2]
-            lvbdKeep = np.invert(
-                UniqueStateArr[ii, offset + 1 : offset + n_lvbd_X_2 : 2].astype("bool")
-            ).astype("int")
-            # 1. check that there is only one non-keep in lvbdKeep
-            KeepSum = sum(lvbdKeep)
-            # __chan_per_board__['lvbd']: # nothing changed
-            if KeepSum == n_LVBIAS:
-                statestring += "0,1,0"
-            # __chan_per_board__['lvbd']: # proper change
-            elif (KeepSum + 1) == n_LVBIAS:
-                # 2. get the level corresponding to the non-keep.
-                lvbd_chan = np.where(lvbdKeep == 0)[0]
-                statestring += "1,%d,%s" % (
-                    lvbd_chan + 1,
-                    levelstr(lvbdLevel[lvbd_chan]),
-                )
-            else:
-                print("Error in LVBD state call -- multiple changes in a state")
-            ofile.write(statestring + '"\n')
-            # offset += n_lvbd_X_2 # this is fine for voltages after DIO
-            # use for DIO after voltages
-            offset += 2 * (__chan_per_board__["lvbd"])
+    # lay out the scripts, generating their states, before writing states,
+    # unless script() has already done it: the states are numbered once
+    if not __resolved__:
+        __resolve_timing__(quiet=True)
 
-    ofile.write("STATES=%d\n" % (ii + 1))
+    renderer = StateRenderer(UniqueStateArr, __board_layout__())
+    lines = renderer.lines()
+    renderer.report()
+    ofile.writelines(["[CONFIG]\n"] + lines)
 
     global Catalog
     global Parameters
@@ -1409,10 +1858,259 @@ def state(outfile=None):
     #         maxrawlines = rawspace/(rawsamples_per_line*2)
     #         if maxrawlines < Parameters['Lines'] and maxrawlines > 0:
     #             ofile.write('RAWENDLINE=%d\n'%(maxrawlines-1))
-    if ofile.name != "<stdout>":  # don't close stdout!
+    if ofile is not outfile and ofile is not sys.stdout:  # don't close stdout!
         ofile.close()
 
 
+def __plain_line__(first, state=0, repeats=0):
+    """the text of the script line that enters state first, then state
+    repeats times, e.g. STATE005; STATE000(299), and its width (see
+    plan_script)"""
+    text = "STATE%03d; " % first
+    pad = 11
+    if repeats > 0:
+        text += "STATE%03d" % state
+        pad += 8
+        if repeats > 1:
+            text += "(%d)" % repeats
+            pad += np.ceil(np.log10(repeats)).astype(int) + 2
+    return (text, pad)
+
+
+def __periods__(tokens):
+    """the states entered by the lines of a script (see compress_script),
+    as a list of [state, periods] with the calls of loop waveforms expanded;
+    any other line is itself an item of the list"""
+    periods = []
+
+    def enter(state, repeats):
+        if repeats == 0:
+            return
+        if periods and periods[-1][0] == state:
+            periods[-1][1] += repeats
+        else:
+            periods.append([state, repeats])
+
+    for token in tokens:
+        if token[0] == "plain":
+            (first, state, repeats) = token[1]
+            enter(first, 1)
+            enter(state, repeats)
+        elif token[0] == "call":
+            (_, state, body, repeats) = token
+            enter(state, 1)
+            for _ in range(repeats):
+                for first, then, times in __loop_lines__(body):
+                    enter(first, 1)
+                    enter(then, times)
+        else:
+            periods.append(token[:2])
+    return periods
+
+
+def __encode_periods__(periods, wait_only=False):
+    """plain lines, (first, state, repeats), that enter the states in
+    periods (see __periods__): a line that enters a state once goes on to
+    the run of states after it, or only to a run of the do-nothing state if
+    wait_only, as plan_script does; a run of a state longer than a period
+    repeats it"""
+    lines = []
+    for state, count in periods:
+        if lines and lines[-1][2] == 0 and (state == 0 or not wait_only):
+            lines[-1] = (lines[-1][0], state, count)
+        elif count > 1:
+            lines.append((state, state, count - 1))
+        else:
+            lines.append((state, 0, 0))
+    return lines
+
+
+def __loop_lines__(body):
+    """the plain lines of the loop waveform of body, the last of which is
+    the RETURN, in the last period of the body"""
+    (first, state, repeats) = body[-1]
+    if repeats > 0:
+        return list(body[:-1]) + [(first, state, repeats - 1), (state, 0, 0)]
+    return list(body[:-1]) + [(first, 0, 0)]
+
+
+def __loop_cost__(body, used):
+    """the ACF lines taken by the loop waveform of body, with its label, or
+    none if it is in used or already made"""
+    if body in __loops__ or body in used:
+        return 0
+    return 1 + len(__loop_lines__(body))
+
+
+def __fold_loops__(lines, used):
+    """the tokens of compress_script for plain lines, with every block of
+    lines that is repeated often enough to save lines made a loop.  The
+    bodies of the loops used are added to used."""
+    tokens = []
+    jj = 0
+    while jj < len(lines):
+        best = (0, 0, 0)  # (lines saved, body length, repeats)
+        if tokens and tokens[-1][0] == "plain":
+            # the last line makes the call, in its last period if it waits
+            host = tokens[-1][1]
+            longest = min(__loop_body_max__, (len(lines) - jj) // 2)
+            for size in range(1, longest + 1):
+                body = tuple(lines[jj : jj + size])
+                repeats = 1
+                while (
+                    tuple(lines[jj + repeats * size : jj + (repeats + 1) * size])
+                    == body
+                ):
+                    repeats += 1
+                if repeats < 2:
+                    continue
+                saved = size * repeats - (host[2] > 0) - __loop_cost__(body, used)
+                if saved > best[0]:
+                    best = (saved, size, repeats)
+        if best[0] <= 0:
+            tokens.append(("plain", lines[jj]))
+            jj += 1
+            continue
+        (_, size, repeats) = best
+        body = tuple(lines[jj : jj + size])
+        (first, state, times) = tokens.pop()[1]
+        if times > 0:
+            tokens.append(("plain", (first, state, times - 1)))
+            first = state
+        tokens.append(("call", first, body, repeats))
+        if body not in used:
+            used.append(body)
+        jj += size * repeats
+    return tokens
+
+
+def __loop_segment__(body, parent, index):
+    """the loop waveform of body, a tuple of plain lines (see
+    compress_script), made if need be and named after the segment that first
+    uses it.  Its states are those of the body, for timeline and plot."""
+    loop = __loops__.get(body)
+    if loop is not None:
+        return loop
+
+    lines = __loop_lines__(body)
+    number = 0
+    while "%s_LOOP%d" % (parent, number) in index:
+        number += 1
+    name = "%s_LOOP%d" % (parent, number)
+    nperiods = sum(1 + line[2] for line in lines)
+    loop = TimingSegment(name, "waveform", nperiods, endline=-1)
+    index[name] = len(Catalog) - 1
+    loop.loop_lines = lines
+
+    script_lines = []
+    state_tt = []
+    state_IDs = []
+    time = 0
+    for first, state, repeats in lines:
+        if first > 0:
+            state_tt.append(time)
+            state_IDs.append(first)
+        if state > 0:
+            state_tt += range(time + 1, time + 1 + repeats)
+            state_IDs += [state] * repeats
+        (text, pad) = __plain_line__(first, state, repeats)
+        this_state = state if repeats > 0 and state > 0 else first
+        time += 1 + repeats
+        script_lines.append((this_state, text, pad, time - 1, time, None))
+    (this_state, text, pad, count, time, call) = script_lines[-1]
+    text += "RETURN %s" % name
+    script_lines[-1] = (this_state, text, 18 + len(name), count, time, call)
+    loop.script_lines = script_lines
+
+    loop.sequence_times = np.array([], dtype=int)
+    loop.state_tt = np.array(state_tt, dtype=int)
+    loop.state_IDs = np.array(state_IDs, dtype=int)
+    loop.do_anything_tt = np.unique(np.hstack(([0], state_tt, [nperiods - 1])))
+    loop.do_anything_tt = loop.do_anything_tt.astype("int")
+    loop.do_anything_dt = np.hstack((np.diff(loop.do_anything_tt), [0]))
+    __loops__[body] = loop
+    return loop
+
+
+def __compress_loops__(index):
+    """compress the scripts of all the timing segments (see compress_script)
+    and return the number of ACF lines saved"""
+
+    def length():
+        return sum(len(TS.script_lines) + (TS.name != "") for TS in Catalog)
+
+    before = length()
+    for TS in list(Catalog):
+        if not hasattr(TS, "loop_lines"):
+            TS.compress_script(index)
+    return before - length()
+
+
+def __resolve_timing__(quiet=False):
+    """Lay out the script of every timing segment and calculate the times
+    and exit states.  The call graph of the segments is walked depth first
+    so that each segment is resolved once, after the subroutines it CALLs.
+    Segments on a CALL cycle (and those that call them) are left with an
+    undefined (nan) time, and the cycles are reported unless quiet.
+    Returns True if all the times are defined."""
+    global Catalog
+    global __resolved__
+
+    index = __catalog_index__()
+    __make_all_states__()
+    if MinimizeStates:
+        removed = __minimize_states__()
+        if not quiet:
+            print("state minimization removed %d states" % removed)
+    # lay out the scripts in Catalog order, which is the order that new
+    # states are numbered in.  Undefined subroutines get a placeholder
+    # appended to Catalog, to be laid out in turn.
+    kk = 0
+    while kk < len(Catalog):
+        # loop waveforms keep the script they were made with
+        if not hasattr(Catalog[kk], "loop_lines"):
+            Catalog[kk].plan_script(index)
+        Catalog[kk].time = np.nan
+        kk += 1
+    if CompressLoops:
+        saved = __compress_loops__(index)
+        if not quiet:
+            print("loop compression saved %d script lines" % saved)
+
+    # resolve the segments in reverse topological order of the call graph
+    callees = [TS.callees(index) for TS in Catalog]
+    visited = [False] * len(Catalog)
+    cycles = []
+    for root in range(len(Catalog)):
+        if visited[root]:
+            continue
+        visited[root] = True
+        stack = [(root, iter(callees[root]))]
+        path = [root]
+        while stack:
+            (kk, todo) = stack[-1]
+            for jj in todo:
+                if not visited[jj]:
+                    visited[jj] = True
+                    stack.append((jj, iter(callees[jj])))
+                    path.append(jj)
+                    break
+                if jj in path:
+                    cycles.append(path[path.index(jj) :] + [jj])
+            else:
+                stack.pop()
+                path.pop()
+                Catalog[kk].resolve_timing(index)
+
+    if not quiet:
+        for cycle in cycles:
+            print(
+                "*** CALL cycle: %s ***" % " -> ".join(Catalog[jj].name for jj in cycle)
+            )
+    __resolved__ = True
+    return not np.any(np.isnan([obj.time for obj in Catalog]))
+
+
 def script(outfile=None, quiet=False):
     """generate ACF scripts and calculates times.  Reports state of
     Catalog if a consistent script cannot be generated"""
@@ -1420,19 +2118,7 @@ def script(outfile=None, quiet=False):
     global Parameters
     global Constants
 
-    jj_nocalc = np.where(np.isnan([obj.time for obj in Catalog]))[0]
-    N_nocalc = len(jj_nocalc)  # number of segments with uncalculated time
-    while N_nocalc > 0:
-        for kk in jj_nocalc:  # was reversed before
-            if Catalog[kk] is not None:
-                Catalog[kk].script("/dev/null")
-        N_old = N_nocalc
-        jj_nocalc = np.where(np.isnan([obj.time for obj in Catalog]))[0]
-        N_nocalc = len(jj_nocalc)
-        if N_nocalc == N_old:
-            break
-
-    if N_nocalc == 0:
+    if __resolve_timing__(quiet):
         # remove the existing file before writing to it.
         if outfile is None:
             outfilehandle = sys.stdout
@@ -1449,10 +2135,11 @@ def script(outfile=None, quiet=False):
             for const in Constants:
                 outfilehandle.write("%s=%f\n" % (const, Constants[const]))
         outfilehandle.write("[LINE#]\n")
-        if outfilehandle.name != "<stdout>":
-            outfilehandle.close()
+        index = __catalog_index__()
         for TS in Catalog:
-            TS.script(outfile)
+            TS.script(outfilehandle, index)
+        if outfilehandle is not outfile and outfilehandle is not sys.stdout:
+            outfilehandle.close()
     elif not quiet:
         print("Timing did not converge:")
         catalog()
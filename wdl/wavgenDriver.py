@@ -43,7 +43,6 @@ if __package__ != "wdl":
 else:
     from . import wavgen
 
-import matplotlib.pyplot as plt
 import sys
 
 sys.dont_write_bytecode = True
@@ -83,7 +82,10 @@ def main(source, toplot):
         wavgen.GenerateFigs = True
 
     wavgen.loadWDL(input_, output)
-    plt.show(block=True)
+    if wavgen.GenerateFigs:
+        import matplotlib.pyplot as plt
+
+        plt.show(block=True)
 
 
 # -----------------------------------------------------------------------------